@@ -0,0 +1,97 @@
+""" compares the time the engine needs to bring positions to their target depth when they are analysed in different orders
+(@see chessapp.controller.analysispolicy.order_candidates). each order is measured with a new engine process so that every order
+starts with an empty transposition table. the tree is not modified.
+
+run from the root folder of the repository, e.g.
+    python -m benchmarks.analysis_order --tree data/openings --positions 50 --engine-path /usr/bin/stockfish
+"""
+from argparse import ArgumentParser
+from chessapp.model.chesstree import ChessTree
+from chessapp.controller.engine import Engine, s_engine_number_of_threads
+from chessapp.controller.analysispolicy import find_candidates, order_candidates, get_target_depth, s_analysis_orders
+from chessapp.util.paths import get_openings_folder
+from chess import Board
+import statistics
+import json
+import time
+
+
+def measure(tree: ChessTree, fens: list[str], engine: Engine, time_limit: int) -> list[dict]:
+    """ analyses the positions in the given order up to their target depth
+
+    Args:
+        tree (ChessTree): the tree containing the positions
+        fens (list[str]): the positions in the order they are analysed
+        engine (Engine): the engine
+        time_limit (int): maximum seconds per position
+
+    Returns:
+        list[dict]: fen, target depth, reached depth and seconds of each position
+    """
+    measurements = []
+    for fen in fens:
+        target_depth = get_target_depth(tree.nodes[fen].source())
+        start_time = time.perf_counter()
+        _, depth, _ = engine.score(Board(fen=fen), time_limit, target_depth)
+        measurements.append({"fen": fen, "target_depth": target_depth, "depth": depth,
+                             "seconds": time.perf_counter() - start_time})
+    return measurements
+
+
+def summarize(order: str, measurements: list[dict]) -> str:
+    """
+    Args:
+        order (str): the order
+        measurements (list[dict]): the measurements of the order (@see measure)
+
+    Returns:
+        str: total, mean, median and 90th percentile of the seconds per position and how many positions reached their target depth
+    """
+    seconds = sorted(measurement["seconds"] for measurement in measurements)
+    reached = sum(1 for measurement in measurements if measurement["depth"]
+                  >= measurement["target_depth"])
+    return " ".join((order.ljust(12), "total", str(round(sum(seconds), 1)), "s, mean", str(round(statistics.mean(seconds), 2)),
+                     "s, median", str(round(statistics.median(seconds), 2)), "s, p90",
+                     str(round(seconds[int(len(seconds) * 0.9)], 2)), "s,", str(reached), "/", str(len(seconds)), "reached target depth"))
+
+
+def main():
+    parser = ArgumentParser(
+        description="benchmark of the order in which positions are analysed")
+    parser.add_argument("--tree", default=get_openings_folder(),
+                        help="folder containing position_eval.csv and moves.csv")
+    parser.add_argument("--engine-path", default=None,
+                        help="path to a uci engine executable (defaults to the bundled stockfish)")
+    parser.add_argument("--threads", type=int, default=s_engine_number_of_threads,
+                        help="number of threads of the engine")
+    parser.add_argument("--positions", type=int, default=50,
+                        help="amount of candidates to analyse per order")
+    parser.add_argument("--time-limit", type=int, default=120,
+                        help="maximum seconds per position")
+    parser.add_argument("--orders", nargs="+", choices=s_analysis_orders, default=list(s_analysis_orders),
+                        help="orders to compare")
+    parser.add_argument("--output", default=None,
+                        help="json file the measurements are written to")
+    args = parser.parse_args()
+    tree = ChessTree(args.tree)
+    tree.load()
+    candidates = find_candidates(tree, args.positions)
+    if len(candidates) == 0:
+        print("no positions need analysis")
+        return
+    results = {}
+    for order in args.orders:
+        engine = Engine(args.engine_path, args.threads)
+        try:
+            results[order] = measure(tree, order_candidates(
+                tree, candidates, order), engine, args.time_limit)
+        finally:
+            engine.close()
+        print(summarize(order, results[order]))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+""" compares painting the chessboard with and without the render cache of the ChessBoard (@see ChessBoard.use_render_cache). both paint
+the same frames into an offscreen image: a piece is dragged across the board from the start position, which repaints the whole board on
+every mouse move like ChessBoardWidget.mouseMoveEvent does. the first frame of the cached run renders the cache and is included.
+
+run from the root folder of the repository, e.g.
+    python -m benchmarks.board_rendering --size 800 --frames 500
+"""
+from argparse import ArgumentParser
+from os import environ
+import time
+
+# no window is shown, the frames are painted into an image
+environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtGui import QImage, QPainter
+from PyQt5.QtCore import QRect
+from chessapp.view.chessboard import ChessBoard
+from chessapp.view.pieces import load_pieces
+from chess import Board
+
+
+def paint_frames(board: ChessBoard, size: int, frames: int) -> float:
+    """ drags the knight on g1 (@see ChessBoard.select_piece) in a circle over the board and paints a frame per mouse position
+
+    Args:
+        board (ChessBoard): the chessboard
+        size (int): width and height of the board in pixels
+        frames (int): amount of painted frames
+
+    Returns:
+        float: the seconds it took
+    """
+    image = QImage(size, size, QImage.Format.Format_ARGB32_Premultiplied)
+    bound = QRect(0, 0, size, size)
+    x, y = board.square_to_coords("g1", size, size)
+    board.select_piece(x + size // 16, y + size // 16, size, size)
+    board.enable_piece_to_cursor = True
+    start_time = time.perf_counter()
+    for frame in range(frames):
+        board.mouse_x = (frame * 7) % size
+        board.mouse_y = (frame * 13) % size
+        qp = QPainter(image)
+        board.drawOn(qp, bound)
+        qp.end()
+    return time.perf_counter() - start_time
+
+
+def main():
+    parser = ArgumentParser(
+        description="benchmark of painting the chessboard with and without the render cache")
+    parser.add_argument("--size", type=int, default=800,
+                        help="width and height of the board in pixels")
+    parser.add_argument("--frames", type=int, default=500,
+                        help="amount of painted frames per method")
+    parser.add_argument("--pieces", default=None,
+                        help="folder of the piece images (defaults to the configured piece set)")
+    args = parser.parse_args()
+    qtapp = QApplication([])
+    load_pieces(args.pieces)
+    size = 8 * (args.size // 8)
+    for name, use_render_cache in (("uncached", False), ("render cache", True)):
+        board = ChessBoard()
+        board.legal_moves = list(Board().legal_moves)
+        board.use_render_cache = use_render_cache
+        seconds = paint_frames(board, size, args.frames)
+        print(" ".join((name.ljust(12), str(args.frames), "frames in", str(round(seconds, 3)), "s,",
+                        str(round(args.frames / seconds, 1)), "frames per second")))
+    qtapp.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+""" compares drawing moves by frequency with Node.random_move (which sums up the frequencies of all moves at every draw) and with the cached
+alias tables of the MoveSampler (@see chessapp.model.movesampler). both play the same amount of simulated games from the start position
+through the moves of an opening tree until a position without frequencies is reached. the tree is not modified.
+
+run from the root folder of the repository, e.g.
+    python -m benchmarks.move_sampling --tree data/opening_tree/white --games 10000 --seed 1
+"""
+from argparse import ArgumentParser
+from chessapp.model.chesstree import ChessTree
+from chessapp.model.movesampler import MoveSampler
+from chessapp.util.paths import get_opening_tree_folder
+from chessapp.util.fen import get_reduced_fen_from_board
+from chess import Board
+from os.path import join
+from random import Random
+import time
+
+
+def simulate(tree: ChessTree, games: int, random: Random, draw) -> tuple[int, float]:
+    """ plays games through the moves of the tree
+
+    Args:
+        tree (ChessTree): the tree
+        games (int): amount of games
+        random (Random): source of randomness
+        draw (callable): draws a move of a node (node, random) -> Move
+
+    Returns:
+        tuple[int, float]: the amount of drawn moves and the seconds it took
+    """
+    root = tree.get(get_reduced_fen_from_board(Board()))
+    # determined in advance so that only the draws are measured
+    with_frequency = set(
+        fen for fen, node in tree.snapshot().items() if node.has_frequency())
+    draws = 0
+    start_time = time.perf_counter()
+    for _ in range(games):
+        node = root
+        visited = set()
+        while node.state in with_frequency and not node.state in visited:
+            visited.add(node.state)
+            node = tree.nodes[draw(node, random).result]
+            draws += 1
+    return draws, time.perf_counter() - start_time
+
+
+def main():
+    parser = ArgumentParser(
+        description="benchmark of drawing opponent moves by frequency")
+    parser.add_argument("--tree", default=join(get_opening_tree_folder(), "white"),
+                        help="folder containing position_eval.csv and moves.csv of an opening tree")
+    parser.add_argument("--games", type=int, default=10000,
+                        help="amount of simulated games per method")
+    parser.add_argument("--seed", type=int, default=1,
+                        help="seed of the simulated games")
+    args = parser.parse_args()
+    tree = ChessTree(args.tree)
+    tree.load()
+    sampler = MoveSampler(tree)
+    for name, draw in (("Node.random_move", lambda node, random: node.random_move(random, True)),
+                       ("MoveSampler", lambda node, random: sampler.random_move(node, random, True))):
+        draws, seconds = simulate(tree, args.games, Random(args.seed), draw)
+        print(" ".join((name.ljust(16), str(draws), "moves in", str(round(seconds, 3)), "s,",
+                        str(round(seconds / max(1, draws) * 1e6, 2)), "us per move")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+""" compares the startup of the application with lazy resources (engine processes, opening trees and puzzles are created on first use)
+and with eager resources (@see chessapp.configuration.LAZY_RESOURCES). each run starts the application in a new process with the
+offscreen platform of Qt, waits until the startup is done (@see chessapp.util.startupreport) and measures the startup time and the
+resident memory (RSS) of the application and its child processes (the engines). the RSS is read from /proc and therefore only
+available on linux.
+
+run from the root folder of the repository, e.g.
+    python -m benchmarks.startup --runs 3
+"""
+from argparse import ArgumentParser
+from chessapp.util.paths import get_openings_folder
+from os import environ, listdir
+import statistics
+import subprocess
+import json
+import sys
+
+# code of a single run. it is executed in a new process so that every run starts from scratch.
+s_run_code = """
+import json, sys
+import chessapp.configuration
+chessapp.configuration.LAZY_RESOURCES = sys.argv[1] == "lazy"
+from chessapp.util.startupreport import get_startup_report
+from benchmarks.startup import get_rss_kilobytes
+from chessapp.chessapp import ChessApp
+from chessapp.model.chesstree import ChessTree
+from PyQt5.QtCore import QMetaObject, Qt
+result = {}
+
+def on_startup_done(lines):
+    result["seconds"] = get_startup_report().get_seconds()
+    result["rss_kilobytes"] = get_rss_kilobytes()
+    QMetaObject.invokeMethod(qtapp, "quit", Qt.QueuedConnection)
+
+get_startup_report().add_listener(on_startup_done)
+qtapp = ChessApp(ChessTree(sys.argv[2]), sys.argv[:1])
+qtapp.exec_()
+qtapp.close()
+print(json.dumps(result))
+"""
+
+
+def get_rss_kilobytes(pid: int = None) -> int:
+    """
+    Args:
+        pid (int, optional): Defaults to None. the process. if None, the current process is used.
+
+    Returns:
+        int: the resident memory in kilobytes of the process and all its descendants (e.g. engine processes)
+    """
+    pid = pid if pid else int(open("/proc/self/stat").read().split()[0])
+    children = {}
+    for name in listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open("/proc/" + name + "/stat") as file:
+                # the name of the process may contain spaces, the fields after it are separated by spaces
+                fields = file.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        children.setdefault(int(fields[1]), []).append(int(name))
+    rss = 0
+    stack = [pid]
+    while len(stack) > 0:
+        current = stack.pop()
+        try:
+            with open("/proc/" + str(current) + "/status") as file:
+                for line in file:
+                    if line.startswith("VmRSS:"):
+                        rss += int(line.split()[1])
+        except OSError:
+            continue
+        stack.extend(children.get(current, []))
+    return rss
+
+
+def run(mode: str, tree_folder: str) -> dict:
+    """ starts the application once and measures its startup
+
+    Args:
+        mode (str): "lazy" or "eager"
+        tree_folder (str): folder of the tree that is loaded
+
+    Returns:
+        dict: the startup time in seconds and the rss in kilobytes
+    """
+    environment = dict(environ)
+    environment.setdefault("QT_QPA_PLATFORM", "offscreen")
+    process = subprocess.run([sys.executable, "-c", s_run_code, mode, tree_folder], env=environment, capture_output=True, text=True)
+    if process.returncode != 0:
+        # e.g. QtMultimedia cannot be loaded without pulseaudio, the last line of the traceback says why
+        raise Exception("the application did not start (" + mode + "): " +
+                        (process.stderr.strip().splitlines() or ["no output"])[-1])
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = ArgumentParser(
+        description="benchmark of the startup with lazy and eager resources")
+    parser.add_argument("--tree", default=get_openings_folder(),
+                        help="folder containing position_eval.csv and moves.csv")
+    parser.add_argument("--runs", type=int, default=3,
+                        help="amount of runs per mode")
+    args = parser.parse_args()
+    for mode in ("eager", "lazy"):
+        results = [run(mode, args.tree) for _ in range(args.runs)]
+        print(" ".join((mode.ljust(6), "startup median", str(round(statistics.median(result["seconds"] for result in results), 2)),
+                        "s, rss median", str(round(statistics.median(result["rss_kilobytes"] for result in results) / 1024)), "MiB")))
+
+
+if __name__ == "__main__":
+    main()
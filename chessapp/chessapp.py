@@ -9,19 +9,28 @@ from chessapp.controller.analyser import Analyser
 from chessapp.controller.explorer import Explorer
 from chessapp.view.module import BaseModule
 from chessapp.controller.openingtree import OpeningTree
+from chessapp.controller.taskqueue import TaskQueue
+from chessapp.controller.taskmanager import TaskManager
 from chessapp.controller.puzzles import Puzzles
 from chessapp.sound.chessboardsound import register_all_sounds
+from chessapp.controller.scheduler import get_scheduler
+from chessapp.util.startupreport import get_startup_report
+from chessapp.view.pieces import load_pieces
 
 
 class ChessApp(QApplication):
     """ This is the main application and derives from QApplication. It handles the main window (View) and all the modules (Controller).
-    The app also has a threadpool that can be used to dispatch tasks on non-GUI threads.
+    The app also has a threadpool that can be used to dispatch tasks on non-GUI threads and a task manager that starts the tasks of
+    the modules on it (@see chessapp.controller.taskmanager.TaskManager).
     """
 
     changing_central_widget = pyqtSignal(QWidget)
 
     def __init__(self, tree: ChessTree, argv: list[str]):
         """ initialises the application. This should be called by the main method of the application and only by that method.
+        The window is shown immediately. The tree is loaded in the background afterwards with its progress shown in the status bar
+        and the "Tasks" module; modules wait for it where they need it (@see BaseModule.wait_until_ready). Once all startup steps
+        are done, the startup report is printed (@see chessapp.util.startupreport).
 
 
         Args:
@@ -29,29 +38,76 @@ class ChessApp(QApplication):
             argv (list[str]): arguments passed to the application by the command line/shell/operating system/parent process/...
         """
         super().__init__(argv)
+        report = get_startup_report()
+        report.add_listener(self.on_startup_done)
+        report.begin("application")
         # set this at the start so other parts of the program work already before this construtor is finished...
         self.is_closed = False
         self.threadpool = QThreadPool()
-        self.window = AppWindow(self)
-        self.window.showMaximized()
-        opening_tree = OpeningTree(self)
-        explorer = Explorer(self, tree)
-        self.modules: [BaseModule] = [
-            Analyser(self, tree),
-            explorer,
-            opening_tree,
-            Puzzles(self, explorer, tree),
-            Saver(self, tree),
-            Updater(self, tree),
-            Quiz(self, tree, opening_tree, explorer)
-        ]
-        self.widgets = []
-        self.changing_central_widget.connect(self.__set_central_widget)
-        # register modules
-        for module in self.modules:
-            module.init()
-            module.register()
-        register_all_sounds()
+        self.task_manager = TaskManager(self.threadpool)
+        with report.measure("window"):
+            self.window = AppWindow(self)
+            self.window.showMaximized()
+        with report.measure("modules"):
+            opening_tree = OpeningTree(self)
+            explorer = Explorer(self, tree)
+            self.modules: [BaseModule] = [
+                Analyser(self, tree, opening_tree),
+                explorer,
+                opening_tree,
+                Puzzles(self, explorer, tree),
+                Saver(self, tree),
+                Updater(self, tree),
+                Quiz(self, tree, opening_tree, explorer),
+                TaskQueue(self)
+            ]
+            self.widgets = []
+            self.changing_central_widget.connect(self.__set_central_widget)
+            # register modules
+            for module in self.modules:
+                module.init()
+                module.register()
+        with report.measure("sounds"):
+            register_all_sounds()
+        with report.measure("pieces"):
+            load_pieces()
+        report.begin("tree")
+        self.task_manager.start(lambda: self.load_tree(
+            tree), "Startup: load tree")
+        report.end("application")
+
+    def load_tree(self, tree: ChessTree):
+        """ loads the tree and shows the progress in the status bar and as progress of the task (this is the startup step "tree")
+
+        Args:
+            tree (ChessTree): the tree to load
+        """
+        last_percent = -1
+
+        def on_progress(read: int, total: int):
+            nonlocal last_percent
+            get_scheduler().report_progress(read, total)
+            percent = int(100 * read / total) if total > 0 else 100
+            if percent // 10 != last_percent // 10:
+                self.show_status_message(
+                    "loading tree... " + str(percent) + "%", 5000)
+            last_percent = percent
+        try:
+            tree.load(on_progress=on_progress)
+            self.show_status_message(
+                "tree loaded: " + str(len(tree.nodes)) + " positions")
+        finally:
+            get_startup_report().end("tree")
+
+    def on_startup_done(self, lines: list[str]):
+        """ prints the startup report once all startup steps are done (@see chessapp.util.startupreport.StartupReport)
+
+        Args:
+            lines (list[str]): the lines of the report
+        """
+        for line in lines:
+            print(line)
+        self.show_status_message(lines[-1], 5000)
 
     def unfocus_all_modules(self):
         """ call this method to assure that no module is focused. @See BaseModule.focus for more information.
@@ -98,6 +154,7 @@ class ChessApp(QApplication):
         if self.is_closed:
             return
         self.is_closed = True
+        self.task_manager.cancel_all()
         for module in self.modules:
             module.close()
         self.deleteLater()
@@ -11,3 +11,6 @@ QUIZ_ACCEPT_EVAL_DIFF_RELAXED: float = 0.35
 QUIZ_ACCEPT_RELAXED_SOURCES = [SourceType.THEORY_VIDEO,
                                SourceType.BOOK, SourceType.GM_GAME]
 PIECES_IMAGES_FOLDER_NAME: str = "default"
+# if True, heavy resources (engine processes, opening trees, puzzles) are created on first use instead of at startup
+# (@see benchmarks/startup.py)
+LAZY_RESOURCES: bool = True
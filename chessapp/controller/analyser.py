@@ -1,47 +1,81 @@
 from chessapp.model.chesstree import ChessTree
+from chessapp.configuration import LAZY_RESOURCES
 from chessapp.controller.engine import Engine
 from chessapp.model.sourcetype import SourceType
 from chess import Board, WHITE
 from chessapp.view.module import ChessboardAndLogModule, create_method_action
-from chessapp.model.node import Node
+from chessapp.controller.analysispolicy import get_target_depth, ORDER_BY_SOURCE, ORDER_BY_REACH, ORDER_DEPTH_FIRST
+from chessapp.controller.openingtree import OpeningTree
+from chessapp.controller.scheduler import get_scheduler, PRIORITY_BACKGROUND
+from chessapp.model.evalpropagation import EvalPropagator
+from chessapp.controller.batchanalyser import BatchAnalyser, s_analyse_desired_time_seconds, s_analyse_max_positions, s_checkpoint_interval_seconds
+from chessapp.controller.analysissession import AnalysisSession
+from chessapp.controller.enginemetrics import get_engine_metrics
+from chessapp.controller.timebudget import AdaptiveTimeBudget, TimeToDepthModel, s_adaptive_session_seconds
+from chessapp.util.paths import get_data_folder
+from os.path import join
 
-
-s_analyse_desired_depth = 20
-s_analyse_desired_time_seconds = 60
-s_analyse_max_positions = 1000
-s_analyse_break_every_position_amount = 10
-s_max_depth = 30
-s_source_to_depth_map = {
-    SourceType.BOOK: s_max_depth,
-    SourceType.THEORY_VIDEO: 28,
-    SourceType.QUIZ_EXPLORATION: 25,
-    SourceType.MANUAL_EXPLORATION: 23,
-    SourceType.MANUAL: 23,
-    SourceType.ENGINE_SYNTHETIC: -1,
-    SourceType.GM_GAME: 25
-}
+s_engine_metrics_file_path: str = join(get_data_folder(), "engine_metrics.json")
+# the order of analyse and analyse adaptive at startup. ORDER_DEPTH_FIRST makes the engine reuse its transposition table between
+# consecutive positions @see benchmarks/analysis_order.py
+s_analyse_order: str = ORDER_BY_SOURCE
+# the orders the action "Switch Order" cycles through. ORDER_BY_REACH needs the opening trees and has its own action.
+s_selectable_orders: tuple[str] = (ORDER_BY_SOURCE, ORDER_DEPTH_FIRST)
+# the analyses share one engine and tree, so only one of them runs at a time (@see chessapp.controller.taskmanager.TaskManager)
+s_analysis_task_key: str = "Analyser: analysis"
 
 
 class Analyser(ChessboardAndLogModule):
-    def __init__(self, app, tree: ChessTree):
-        """initialises the analyser with the given app and tree. the analyser has two actions: analyse and statistics.
+    def __init__(self, app, tree: ChessTree, opening_tree: OpeningTree):
+        """initialises the analyser with the given app and tree. the analyser has six actions: analyse, analyse adaptive, analyse by reach,
+        switch order, statistics and dump metrics.
 
         Args:
             app (chessapp.Chessapp): the main application
             tree (ChessTree): the tree to analyse
+            opening_tree (OpeningTree): the opening tree module whose move frequencies are used by analyse by reach
         """
         super().__init__(app, "Analyser", [
-            create_method_action(app, "Analyse", self.analyse),
-            create_method_action(app, "Statistics", self.print_statistics)])
+            create_method_action(
+                app, "Analyse", self.analyse, PRIORITY_BACKGROUND, s_analysis_task_key),
+            create_method_action(app, "Analyse Adaptive",
+                                 self.analyse_adaptive, PRIORITY_BACKGROUND, s_analysis_task_key),
+            create_method_action(app, "Analyse By Reach",
+                                 self.analyse_by_reach, PRIORITY_BACKGROUND, s_analysis_task_key),
+            create_method_action(app, "Switch Order", self.switch_order),
+            create_method_action(app, "Statistics", self.print_statistics),
+            create_method_action(app, "Dump Metrics", self.dump_metrics)])
         self.tree: ChessTree = tree
+        self.opening_tree: OpeningTree = opening_tree
         self.app = app
-        self.engine = Engine()
+        # the engine process is started by the first search (@see chessapp.configuration.LAZY_RESOURCES)
+        self.engine = Engine(lazy=LAZY_RESOURCES)
+        self.propagator = EvalPropagator(tree)
+        # the order of analyse and analyse adaptive (@see switch_order)
+        self.analyse_order: str = s_analyse_order
+        self.time_to_depth_model = TimeToDepthModel()
+        if AnalysisSession(tree).exists():
+            self.dispatch_threadpool(
+                self.resume, priority=PRIORITY_BACKGROUND, key=s_analysis_task_key, exclusive=True)
+
+    def switch_order(self):
+        """switches the order in which analyse and analyse adaptive visit the positions to the next order of s_selectable_orders
+        (@see chessapp.controller.analysispolicy.order_candidates). an analysis that is resumed keeps the order of its session.
+        """
+        index = s_selectable_orders.index(
+            self.analyse_order) if self.analyse_order in s_selectable_orders else -1
+        self.analyse_order = s_selectable_orders[(
+            index + 1) % len(s_selectable_orders)]
+        self.log_message("analysis order is now " + self.analyse_order)
 
     def print_statistics(self):
         """prints statistics about the tree to the log, specifically: the number of nodes in the tree;
         the number of nodes, average depth and number of nodes below preferred depth for each source;
-        the number of nodes with each depth; and the average depth of all nodes
+        the number of nodes with each depth; the average depth of all nodes; and the histograms of the engine metrics
+        (@see chessapp.controller.enginemetrics.EngineMetrics.format_report)
         """
+        if not self.wait_until_ready(self.tree.loaded, "the tree"):
+            return
         self.log_message("gathering data for statistics")
         depth_map = {}
         source_depth_total = {}
@@ -52,21 +86,20 @@ class Analyser(ChessboardAndLogModule):
             source_depth_total[source] = 0
             source_depth_amount[source] = 0
             source_depth_below_preferal[source] = 0
-            source_depth_preferal[source] = s_analyse_desired_depth
-            if source in s_source_to_depth_map:
-                source_depth_preferal[source] = s_source_to_depth_map[source]
+            source_depth_preferal[source] = get_target_depth(source)
+        nodes = self.tree.snapshot()
         self.log_message("number of nodes in tree: " +
-                         str(len(self.tree.nodes)))
-        for fen in self.tree.nodes:
-            node: Node = self.tree.nodes[fen]
-            if node.is_mate:
+                         str(len(nodes)))
+        for node in nodes.values():
+            evaluation = node.evaluation
+            if evaluation.is_mate:
                 continue
-            if not node.eval_depth in depth_map:
-                depth_map[node.eval_depth] = 0
-            depth_map[node.eval_depth] += 1
-            source_depth_total[node.source()] += node.eval_depth
+            if not evaluation.eval_depth in depth_map:
+                depth_map[evaluation.eval_depth] = 0
+            depth_map[evaluation.eval_depth] += 1
+            source_depth_total[node.source()] += evaluation.eval_depth
             source_depth_amount[node.source()] += 1
-            if node.eval_depth < source_depth_preferal[node.source()]:
+            if evaluation.eval_depth < source_depth_preferal[node.source()]:
                 source_depth_below_preferal[node.source()] += 1
         for source in SourceType:
             if source_depth_amount[source] == 0:
@@ -78,97 +111,90 @@ class Analyser(ChessboardAndLogModule):
         for depth in depth_map:
             self.log_message(
                 "there are " + str(depth_map[depth]) + " nodes with depth " + str(depth))
-            average_depth += depth_map[depth] * depth / len(self.tree.nodes)
+            average_depth += depth_map[depth] * depth / len(nodes)
         self.log_message("the average depth is " + str(average_depth))
+        self.propagator.propagate_all(self.about_to_close)
+        self.log_message("there are " + str(self.propagator.count_determined(lambda node: get_target_depth(node.source()))) +
+                         " nodes whose value is determined by the analysis of their children")
+        for line in get_engine_metrics().format_report():
+            self.log_message(line)
+
+    def dump_metrics(self):
+        """writes the engine metrics of this session as json to s_engine_metrics_file_path
+        """
+        get_engine_metrics().dump(s_engine_metrics_file_path)
+        self.log_message("engine metrics written to " +
+                         s_engine_metrics_file_path)
 
     def analyse(self):
         """analyses the tree up to the desired depth and time. the engine is given s_analyse_desired_time_seconds seconds to analyse each position.
+        positions whose value is already determined by the analysis of their children are skipped and endgame positions contained in the
+        tablebase are resolved without engine. the tree is saved every s_checkpoint_interval_seconds seconds and the state of the analysis
+        is persisted after each position, so an unfinished analysis is resumed on the next run. @see chessapp.controller.batchanalyser.BatchAnalyser
         """
+        if not self.wait_until_ready(self.tree.loaded, "the tree"):
+            return
         self.log_message("analysing...")
-        self.log_message(
-            " ".join(("analysing up to", str(s_analyse_max_positions), "positions")))
-        max_positions = s_analyse_max_positions
-        while max_positions > 0 and not self.about_to_close():
-            analyse_positions = min(
-                max_positions, s_analyse_break_every_position_amount)
-            analyed_positions = self.analyse_at_depth(
-                s_analyse_desired_time_seconds, analyse_positions)
-            # if no positions have been analysed or the engine aborted/closed
-            if analyed_positions == 0 or analyed_positions == None:
-                break
-            max_positions -= analyed_positions
-            self.log_message(
-                " ".join((str(max_positions), "remaining")))
+        BatchAnalyser(self.tree, [self.engine], s_analyse_desired_time_seconds, s_analyse_max_positions,
+                      checkpoint_interval_seconds=s_checkpoint_interval_seconds, log=self.log_message, about_to_close=self.about_to_close,
+                      on_position=self.display_position, propagator=self.propagator, tablebase=self.engine.tablebase,
+                      session=AnalysisSession(self.tree), order=self.analyse_order, scheduler=get_scheduler()).run()
+        self.log_message("analysing done")
 
+    def analyse_adaptive(self):
+        """analyses the tree within a session budget of s_adaptive_session_seconds seconds. the positions that are cheapest to bring to
+        their target depth are analysed first, each one is given the time it is estimated to need and searches that stall are stopped
+        early. the estimates improve with every search of this session. like analyse, the analysis is persisted and resumed.
+        @see chessapp.controller.timebudget.AdaptiveTimeBudget
+        """
+        if not self.wait_until_ready(self.tree.loaded, "the tree"):
+            return
+        self.log_message("analysing adaptively...")
+        BatchAnalyser(self.tree, [self.engine], max_positions=s_analyse_max_positions, checkpoint_interval_seconds=s_checkpoint_interval_seconds,
+                      log=self.log_message, about_to_close=self.about_to_close, on_position=self.display_position,
+                      propagator=self.propagator, tablebase=self.engine.tablebase,
+                      time_budget=AdaptiveTimeBudget(s_adaptive_session_seconds, model=self.time_to_depth_model),
+                      session=AnalysisSession(self.tree), order=self.analyse_order, scheduler=get_scheduler()).run()
         self.log_message("analysing done")
 
-    def analyse_at_depth(self, time_seconds: int, max_positions: int) -> int:
-        """ analyses up to max_positions positions at the given depth. only positions with a lower depth than the desired depth are analysed.
-        the depth of the position is updated if the engine finds a higher depth. the engine is given time_seconds seconds to analyse each position.
-        nodes of source ENGINE_SYNTHETIC are ignored.
+    def analyse_by_reach(self):
+        """analyses the positions first that are most likely to be reached in a game. the probabilities are computed from the move
+        frequencies of the opening trees (@see OpeningTree.get_reach_probabilities). otherwise the same as analyse.
+        """
+        if not self.wait_until_ready(self.tree.loaded, "the tree"):
+            return
+        self.log_message("computing reach probabilities...")
+        reach_probabilities = self.opening_tree.get_reach_probabilities()
+        self.log_message("analysing by reach probability...")
+        BatchAnalyser(self.tree, [self.engine], s_analyse_desired_time_seconds, s_analyse_max_positions,
+                      checkpoint_interval_seconds=s_checkpoint_interval_seconds, log=self.log_message, about_to_close=self.about_to_close,
+                      on_position=self.display_position, propagator=self.propagator, tablebase=self.engine.tablebase,
+                      session=AnalysisSession(self.tree), order=ORDER_BY_REACH, reach_probabilities=reach_probabilities,
+                      scheduler=get_scheduler()).run()
+        self.log_message("analysing done")
 
-        Args:
-            time_seconds (int): seconds the engine is given to analyse each position
-            max_positions (int): maximum amount of positions to analyse
+    def resume(self):
+        """resumes the analysis session that was interrupted when the app was closed (@see chessapp.controller.analysissession)
+        """
+        session = AnalysisSession(self.tree)
+        session.load()
+        self.log_message("resuming unfinished analysis session")
+        if session.session_seconds:
+            self.analyse_adaptive()
+        else:
+            self.analyse()
+
+    def display_position(self, board: Board):
+        """ displays the given board from the perspective of the turn player
 
-        Returns:
-            int: amount of positions analysed
+        Args:
+            board (Board): the board to display
         """
-        position_count = 0
-        # pre filter tree to avoid concurrent modification issues (RuntimeError: dictionary changed size during iteration)
-        viable_fens = []
-        for fen in self.tree.nodes:
-            if not (position_count < max_positions and not self.about_to_close()):
-                break
-            node: Node = self.tree.nodes[fen]
-            source = node.source()
-            if not node.is_mate and node.source() != SourceType.ENGINE_SYNTHETIC and ((source in s_source_to_depth_map and node.eval_depth < s_source_to_depth_map[source]) or (node.eval_depth < s_analyse_desired_depth)):
-                viable_fens.append(fen)
-            if len(viable_fens) >= max_positions - 1:
-                break
-        while position_count < max_positions and not self.about_to_close():
-            found_node: bool = False
-            for source in SourceType:
-                if not (position_count < max_positions and not self.about_to_close()):
-                    break
-                if source == SourceType.ENGINE_SYNTHETIC:
-                    continue
-                target_depth: int = s_analyse_desired_depth
-                if source in s_source_to_depth_map:
-                    target_depth = s_source_to_depth_map[source]
-                for fen in viable_fens:
-                    if not (position_count < max_positions and not self.about_to_close()):
-                        break
-                    node = self.tree.nodes[fen]
-                    if node.source() == source and node.eval_depth < target_depth and not node.is_mate:
-                        self.log_message(" ".join(("evaluating position", str(node.state), "(" + node.source(
-                        ).sformat() + ") at depth", str(target_depth), "for up to", str(time_seconds), "seconds")))
-                        board = Board(fen=node.state)
-                        if board.turn == WHITE:
-                            self.chess_board_widget.view_white()
-                        else:
-                            self.chess_board_widget.view_black()
-                        self.chess_board_widget.display(board)
-                        try:
-                            score_eval, score_depth, is_mate = self.engine.score(
-                                board, time_seconds, target_depth)
-                        except Exception as e:
-                            print("error while analysing position in analyse")
-                            print(e)
-                            return
-                        if is_mate or score_depth > node.eval_depth:
-                            self.log_message(" ".join(
-                                ("updating depth from", str(node.eval_depth), "to", str(score_depth), "and eval from", str(node.eval), "to", str(score_eval))))
-                            node.update(score_eval, score_depth, is_mate)
-                        else:
-                            self.log_message(" ".join(("new depth of", str(target_depth),
-                                                       "does not exceed", str(node.eval_depth))))
-                        found_node = True
-                        position_count += 1
-            if not found_node:
-                self.log_message("no node found, aborting")
-                break
-        return position_count
+        if board.turn == WHITE:
+            self.chess_board_widget.view_white()
+        else:
+            self.chess_board_widget.view_black()
+        self.chess_board_widget.display(board)
 
     def on_close(self):
         """closes the engine
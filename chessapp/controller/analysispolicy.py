@@ -0,0 +1,243 @@
+from chessapp.model.chesstree import ChessTree, read_batches
+from chessapp.model.sourcetype import SourceType
+from chessapp.model.node import Node
+from chessapp.model.evalpropagation import EvalPropagator
+from chessapp.controller.tablebase import Tablebase
+from chess import Board
+
+s_analyse_desired_depth = 20
+s_max_depth = 30
+s_source_to_depth_map = {
+    SourceType.BOOK: s_max_depth,
+    SourceType.THEORY_VIDEO: 28,
+    SourceType.QUIZ_EXPLORATION: 25,
+    SourceType.MANUAL_EXPLORATION: 23,
+    SourceType.MANUAL: 23,
+    SourceType.ENGINE_SYNTHETIC: -1,
+    SourceType.GM_GAME: 25
+}
+# candidates are ordered by their source (@see SourceType)
+ORDER_BY_SOURCE = "source"
+# candidates are ordered along the moves of the tree from parents to children so that each search starts with the transposition
+# table of the engine filled by the search of its predecessor
+ORDER_DEPTH_FIRST = "depth-first"
+# candidates are ordered by the probability to reach them in a game (@see chessapp.model.reachprobability)
+ORDER_BY_REACH = "reach"
+s_analysis_orders = (ORDER_BY_SOURCE, ORDER_DEPTH_FIRST, ORDER_BY_REACH)
+# source -> position of the source in ORDER_BY_SOURCE (@see get_source_rank)
+s_source_ranks = {source: index for index, source in enumerate(SourceType)}
+
+
+def get_target_depth(source: SourceType) -> int:
+    """ returns the depth up to which positions of the given source should be analysed. sources that are not contained in
+    s_source_to_depth_map are analysed up to s_analyse_desired_depth.
+
+    Args:
+        source (SourceType): the source of the position
+
+    Returns:
+        int: the target depth of the source
+    """
+    if source in s_source_to_depth_map:
+        return s_source_to_depth_map[source]
+    return s_analyse_desired_depth
+
+
+def needs_analysis(node: Node) -> bool:
+    """ checks whether the given node should be analysed by the engine. mate positions and nodes of source ENGINE_SYNTHETIC are
+    never analysed. all other nodes are analysed if their evaluation depth is below the target depth of their source.
+
+    Args:
+        node (Node): the node to check
+
+    Returns:
+        bool: True if the node should be analysed, False otherwise
+    """
+    evaluation = node.evaluation
+    if evaluation.is_mate:
+        return False
+    source = node.source()
+    if source == SourceType.ENGINE_SYNTHETIC:
+        return False
+    return evaluation.eval_depth < get_target_depth(source)
+
+
+def is_candidate(node: Node, propagator: EvalPropagator = None) -> bool:
+    """ checks whether the node needs analysis (@see needs_analysis) and its value is not already determined by the analysis of its
+    children (@see chessapp.model.evalpropagation.EvalPropagator.is_determined)
+
+    Args:
+        node (Node): the node to check
+        propagator (EvalPropagator, optional): Defaults to None. if None, the values of the children are not taken into account
+
+    Returns:
+        bool: True if the node should be analysed, False otherwise
+    """
+    if not needs_analysis(node):
+        return False
+    return propagator == None or not propagator.is_determined(node, get_target_depth(node.source()))
+
+
+def resolve_with_tablebase(tree: ChessTree, tablebase: Tablebase, about_to_close=lambda: False) -> int:
+    """ writes the exact tablebase result into every position of the tree that needs analysis (@see needs_analysis) and is contained
+    in the tablebase. the tablebase is probed on a snapshot without holding the write lock, the results are written afterwards in
+    batches of s_load_batch_size positions (@see ChessTree.write). run this before find_candidates, which only reads the tree.
+
+    Args:
+        tree (ChessTree): the tree
+        tablebase (Tablebase): the tablebase
+        about_to_close (callable, optional): callable that returns True if the resolution should be aborted
+
+    Returns:
+        int: amount of resolved positions
+    """
+    if not tablebase:
+        return 0
+    scores = []
+    # iterate a snapshot, other threads may add nodes in the meantime (@see ChessTree.snapshot)
+    for fen, node in tree.snapshot().items():
+        if about_to_close():
+            return 0
+        if not needs_analysis(node):
+            continue
+        board = Board(fen=fen)
+        if not tablebase.can_probe(board):
+            continue
+        score = tablebase.score(board)
+        if score:
+            scores.append((node, score))
+    for batch in read_batches(scores):
+        with tree.write():
+            for node, (eval, eval_depth, is_mate) in batch:
+                node.update(eval, eval_depth, is_mate)
+    return len(scores)
+
+
+def get_source_rank(source: SourceType) -> int:
+    """
+    Args:
+        source (SourceType): a source
+
+    Returns:
+        int: the position of the source in the analysis order of the sources (the order of SourceType), starting with 0
+    """
+    return s_source_ranks[source]
+
+
+def order_by_source(tree: ChessTree, fens: list[str]) -> list[str]:
+    """
+    Args:
+        tree (ChessTree): the tree containing the positions
+        fens (list[str]): the fens
+
+    Returns:
+        list[str]: the fens ordered by the source of their nodes in the order of SourceType (@see get_source_rank) and by their given
+        order within the same source
+    """
+    return sorted(fens, key=lambda fen: get_source_rank(tree.nodes[fen].source()))
+
+
+def order_depth_first(tree: ChessTree, fens: list[str]) -> list[str]:
+    """ orders the fens by a depth-first walk along Node.moves that starts at the positions without parents (@see Node.backlinks). a
+    position is visited before its children, so consecutive fens are usually a position and one of its successors, which the engine
+    has already searched as part of the previous search. fens that are not reached by the walk (e.g. positions that are only reachable
+    through cycles) are appended in their given order.
+
+    Args:
+        tree (ChessTree): the tree containing the positions
+        fens (list[str]): the fens
+
+    Returns:
+        list[str]: the ordered fens
+    """
+    remaining = set(fens)
+    ordered = []
+    visited = set()
+    # iterate a snapshot, other threads may add nodes in the meantime (@see ChessTree.snapshot)
+    roots = [fen for fen, node in tree.snapshot().items() if len(
+        node.backlinks) == 0]
+    for root in roots:
+        stack = [root]
+        while len(stack) > 0 and len(remaining) > 0:
+            fen = stack.pop()
+            if fen in visited or not fen in tree.nodes:
+                continue
+            visited.add(fen)
+            if fen in remaining:
+                remaining.remove(fen)
+                ordered.append(fen)
+            # reversed so that the first move is visited first
+            for move in reversed(tree.nodes[fen].moves):
+                if not move.result in visited:
+                    stack.append(move.result)
+    return ordered + [fen for fen in fens if fen in remaining]
+
+
+def order_by_reach(tree: ChessTree, fens: list[str], reach_probabilities: dict[str, float]) -> list[str]:
+    """
+    Args:
+        tree (ChessTree): the tree containing the positions
+        fens (list[str]): the fens
+        reach_probabilities (dict[str, float]): the probabilities to reach the positions (@see
+            chessapp.model.reachprobability.compute_reach_probabilities). unknown positions have probability 0.
+
+    Returns:
+        list[str]: the fens ordered by descending probability and by source (@see order_by_source) amongst equal probabilities
+    """
+    return sorted(order_by_source(tree, fens), key=lambda fen: reach_probabilities.get(fen, 0), reverse=True)
+
+
+def order_candidates(tree: ChessTree, fens: list[str], order: str = ORDER_BY_SOURCE, reach_probabilities: dict[str, float] = None) -> list[str]:
+    """
+    Args:
+        tree (ChessTree): the tree containing the positions
+        fens (list[str]): the fens
+        order (str, optional): Defaults to ORDER_BY_SOURCE. one of s_analysis_orders
+        reach_probabilities (dict[str, float], optional): Defaults to None. required by ORDER_BY_REACH
+
+    Raises:
+        Exception: if the order is unknown
+
+    Returns:
+        list[str]: the fens in the given order
+    """
+    if order == ORDER_BY_SOURCE:
+        return order_by_source(tree, fens)
+    if order == ORDER_DEPTH_FIRST:
+        return order_depth_first(tree, fens)
+    if order == ORDER_BY_REACH:
+        if reach_probabilities == None:
+            raise Exception("the order " + order +
+                            " requires reach probabilities")
+        return order_by_reach(tree, fens, reach_probabilities)
+    raise Exception("unknown analysis order " + str(order))
+
+
+def find_candidates(tree: ChessTree, max_positions: int, about_to_close=lambda: False, propagator: EvalPropagator = None,
+                    order: str = ORDER_BY_SOURCE, reach_probabilities: dict[str, float] = None, skip=None) -> list[str]:
+    """ finds up to max_positions fens of the tree that need to be analysed (@see is_candidate). the fens are ordered according to
+    order (@see order_candidates). with ORDER_BY_REACH all candidates are ordered before the most probable ones are selected, otherwise
+    the first max_positions candidates of the tree are selected. the tree is only read: resolve the positions contained in the tablebase
+    before (@see resolve_with_tablebase).
+
+    Args:
+        tree (ChessTree): the tree to search
+        max_positions (int): maximum amount of fens to return
+        about_to_close (callable, optional): callable that returns True if the search should be aborted
+        propagator (EvalPropagator, optional): Defaults to None. used to skip positions determined by their children
+        order (str, optional): Defaults to ORDER_BY_SOURCE. the order of the returned fens (one of s_analysis_orders)
+        reach_probabilities (dict[str, float], optional): Defaults to None. required by ORDER_BY_REACH
+        skip (callable, optional): Defaults to None. called with the fen and the node of each candidate. candidates for which it returns
+            True are not returned and do not count towards max_positions (e.g. positions that are already exported)
+
+    Returns:
+        list[str]: the fens of the positions that should be analysed
+    """
+    candidates = []
+    # iterate a snapshot, other threads may add nodes in the meantime (@see ChessTree.snapshot)
+    for fen, node in tree.snapshot().items():
+        if (len(candidates) >= max_positions and order != ORDER_BY_REACH) or about_to_close():
+            break
+        if is_candidate(node, propagator) and not (skip and skip(fen, node)):
+            candidates.append(fen)
+    return order_candidates(tree, candidates, order, reach_probabilities)[:max_positions]
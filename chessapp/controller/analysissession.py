@@ -0,0 +1,143 @@
+from chessapp.model.chesstree import ChessTree
+from chessapp.model.node import Node
+from chessapp.controller.workunits import write_json_atomic, read_json
+from os.path import join, exists
+from os import remove
+from threading import Lock
+
+s_session_file_name = "analysis_session.json"
+
+
+def get_session_file_path(tree: ChessTree) -> str:
+    """
+    Args:
+        tree (ChessTree): the tree
+
+    Returns:
+        str: path of the analysis session file of the tree (located next to the csv files of the tree)
+    """
+    return join(tree.save_folder_path, s_session_file_name)
+
+
+class AnalysisSession:
+    """ the persisted state of a batch analysis (@see chessapp.controller.batchanalyser.BatchAnalyser): the queue of positions that are
+    not done yet, the amount of completed positions, the results that are not contained in the saved tree yet and the budget spent. the
+    state is written to disk after every position so that an analysis that is interrupted (by closing the app, a crash or ctrl+c) can be
+    resumed without searching for candidates again and without losing results.
+    """
+
+    def __init__(self, tree: ChessTree, file_path: str = None):
+        """ creates an empty session. call resume to load a persisted session or start to begin a new one.
+
+        Args:
+            tree (ChessTree): the tree that is analysed
+            file_path (str, optional): Defaults to None. path of the session file. if None, get_session_file_path(tree) is used
+        """
+        self.tree: ChessTree = tree
+        self.file_path: str = file_path if file_path else get_session_file_path(
+            tree)
+        self.queue: list[str] = []
+        self.completed: int = 0
+        self.results: dict[str, list] = {}
+        self.spent_seconds: float = 0
+        self.session_seconds: float = None
+        self.lock = Lock()
+
+    def exists(self) -> bool:
+        """
+        Returns:
+            bool: True if a persisted session exists
+        """
+        return exists(self.file_path)
+
+    def start(self, queue: list[str], session_seconds: float = None):
+        """ begins a new session and persists it
+
+        Args:
+            queue (list[str]): the fens that should be analysed in this order
+            session_seconds (float, optional): Defaults to None. the budget of the session if it has one
+        """
+        with self.lock:
+            self.queue = list(queue)
+            self.completed = 0
+            self.results = {}
+            self.spent_seconds = 0
+            self.session_seconds = session_seconds
+            self.save()
+
+    def load(self):
+        """ loads the persisted session
+        """
+        with self.lock:
+            data = read_json(self.file_path)
+            self.queue = data["queue"]
+            self.completed = data["completed"]
+            self.results = data["results"]
+            self.spent_seconds = data["spent_seconds"]
+            self.session_seconds = data["session_seconds"]
+
+    def resume(self) -> int:
+        """ loads the persisted session and writes its results into the tree (results of positions that were analysed after the last
+        save of the tree would be lost otherwise)
+
+        Returns:
+            int: amount of results that were written into the tree
+        """
+        self.load()
+        applied = 0
+        for fen, (eval, eval_depth, is_mate) in self.results.items():
+            if self.tree.get(fen).update(eval, eval_depth, is_mate):
+                applied += 1
+        return applied
+
+    def complete(self, fen: str, node: Node = None, spent_seconds: float = 0):
+        """ removes the position from the queue and persists the session
+
+        Args:
+            fen (str): the fen of the position
+            node (Node, optional): Defaults to None. the analysed node whose evaluation is kept as result. None if the position was skipped.
+            spent_seconds (float, optional): Defaults to 0. budget spent on the position
+        """
+        with self.lock:
+            if fen in self.queue:
+                self.queue.remove(fen)
+            self.completed += 1
+            if node != None:
+                evaluation = node.evaluation
+                self.results[fen] = [evaluation.eval,
+                                     evaluation.eval_depth, evaluation.is_mate]
+            self.spent_seconds += spent_seconds
+            self.save()
+
+    def on_tree_saved(self):
+        """ drops the results because the saved tree contains them now and persists the session
+        """
+        with self.lock:
+            self.results = {}
+            self.save()
+
+    def save(self):
+        """ writes the session to disk. the caller must hold the lock.
+        """
+        write_json_atomic(self.file_path, {
+            "queue": self.queue,
+            "completed": self.completed,
+            "results": self.results,
+            "spent_seconds": self.spent_seconds,
+            "session_seconds": self.session_seconds
+        })
+
+    def is_done(self) -> bool:
+        """
+        Returns:
+            bool: True if the queue is empty
+        """
+        with self.lock:
+            return len(self.queue) == 0
+
+    def finish(self):
+        """ deletes the persisted session
+        """
+        with self.lock:
+            if exists(self.file_path):
+                remove(self.file_path)
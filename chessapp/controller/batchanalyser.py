@@ -0,0 +1,332 @@
+from chessapp.model.chesstree import ChessTree
+from chessapp.controller.engine import Engine
+from chessapp.controller.analysispolicy import find_candidates, get_target_depth, is_candidate, order_candidates, resolve_with_tablebase, ORDER_BY_SOURCE
+from chessapp.model.node import Node
+from chessapp.model.evalpropagation import EvalPropagator
+from chessapp.controller.tablebase import Tablebase
+from chessapp.controller.timebudget import AdaptiveTimeBudget
+from chessapp.controller.analysissession import AnalysisSession
+from chessapp.controller.scheduler import Scheduler
+from chess import Board
+from queue import Queue, Empty
+from threading import Thread, Lock
+import time
+import traceback
+
+s_analyse_desired_time_seconds = 60
+s_analyse_max_positions = 1000
+s_checkpoint_interval_seconds = 600
+
+
+class BatchAnalyser:
+    """ analyses the positions of a ChessTree that need analysis (@see chessapp.controller.analysispolicy) with a pool of engines.
+    each engine of the pool runs on its own thread and takes the next position from a shared queue. the tree is saved to disk
+    periodically (checkpoint) and once more after the analysis is done. this class does not depend on PyQt5 and can therefore be used
+    by the Analyser module as well as on headless machines (@see headless.py).
+    """
+
+    def __init__(self, tree: ChessTree, engines: list[Engine], time_seconds: int = s_analyse_desired_time_seconds,
+                 max_positions: int = s_analyse_max_positions, total_time_seconds: int = None,
+                 checkpoint_interval_seconds: int = s_checkpoint_interval_seconds, log=print, about_to_close=lambda: False,
+                 on_position=None, propagator: EvalPropagator = None, tablebase: Tablebase = None, time_budget: AdaptiveTimeBudget = None,
+                 session: AnalysisSession = None, order: str = ORDER_BY_SOURCE, reach_probabilities: dict[str, float] = None,
+                 scheduler: Scheduler = None):
+        """ initialises the batch analyser.
+
+        Args:
+            tree (ChessTree): the tree to analyse
+            engines (list[Engine]): the engine pool. each engine analyses one position at a time.
+            time_seconds (int, optional): Defaults to s_analyse_desired_time_seconds. seconds each engine is given per position
+            max_positions (int, optional): Defaults to s_analyse_max_positions. maximum amount of positions to analyse
+            total_time_seconds (int, optional): Defaults to None. no new position is started after this many seconds. None means no limit.
+            checkpoint_interval_seconds (int, optional): Defaults to s_checkpoint_interval_seconds. the tree is saved at least this often.
+                None or 0 disables checkpoints (the tree is then neither saved periodically nor at the end).
+            log (callable, optional): Defaults to print. receives log messages as str
+            about_to_close (callable, optional): callable that returns True if the analysis should be aborted
+            on_position (callable, optional): Defaults to None. called with the Board of each position before it is analysed
+            propagator (EvalPropagator, optional): Defaults to None. if given, positions whose value is already determined by the
+                analysis of their children are skipped (@see chessapp.model.evalpropagation.EvalPropagator.is_determined)
+            tablebase (Tablebase, optional): Defaults to None. if given, positions contained in the tablebase are resolved exactly and
+                not scheduled for engine analysis (@see chessapp.controller.analysispolicy.resolve_with_tablebase)
+            time_budget (AdaptiveTimeBudget, optional): Defaults to None. if given, time_seconds is ignored: the positions are ordered
+                and given time by the budget and searches that stall are stopped early (@see chessapp.controller.timebudget)
+            session (AnalysisSession, optional): Defaults to None. if given, the state of the analysis is persisted after every position
+                and a persisted session is resumed instead of searching for candidates (@see chessapp.controller.analysissession)
+            order (str, optional): Defaults to ORDER_BY_SOURCE. the order in which the candidates are analysed
+                (@see chessapp.controller.analysispolicy.order_candidates). ORDER_DEPTH_FIRST lets each search reuse the transposition
+                table of the previous one, which works best with a single engine since each engine of a pool has its own table.
+            reach_probabilities (dict[str, float], optional): Defaults to None. the probabilities to reach the positions in a game,
+                required by ORDER_BY_REACH (@see chessapp.model.reachprobability)
+            scheduler (Scheduler, optional): Defaults to None. if given and the analysis runs as background task, engine searches are
+                stopped when interactive work starts and repeated once it is done (@see chessapp.controller.scheduler.Scheduler). the
+                progress of the analysis is reported to the task and a cancelled task stops the analysis.
+        """
+        self.tree: ChessTree = tree
+        self.engines: list[Engine] = engines
+        self.time_seconds: int = time_seconds
+        self.max_positions: int = max_positions
+        self.total_time_seconds: int = total_time_seconds
+        self.checkpoint_interval_seconds: int = checkpoint_interval_seconds
+        self.log = log
+        self.about_to_close = about_to_close
+        self.on_position = on_position
+        self.propagator: EvalPropagator = propagator
+        self.tablebase: Tablebase = tablebase
+        self.time_budget: AdaptiveTimeBudget = time_budget
+        self.session: AnalysisSession = session
+        self.order: str = order
+        self.reach_probabilities: dict[str, float] = reach_probabilities
+        self.scheduler: Scheduler = scheduler
+        self.lock = Lock()
+        self.start_time: float = 0
+        self.last_checkpoint_time: float = 0
+        self.analysed_positions: int = 0
+        self.done_positions: int = 0
+        self.total_positions: int = 0
+        self.task = None
+
+    def find_candidates(self) -> list[str]:
+        """ resolves the positions contained in the tablebase (@see chessapp.controller.analysispolicy.resolve_with_tablebase), finds the
+        positions to analyse (@see chessapp.controller.analysispolicy.find_candidates) and, with a time budget, plans them
+        (@see chessapp.controller.timebudget.AdaptiveTimeBudget.plan)
+
+        Returns:
+            list[str]: the fens of the positions to analyse in order
+        """
+        if self.tablebase:
+            self.log(" ".join(("resolved", str(resolve_with_tablebase(self.tree, self.tablebase, self.about_to_close)),
+                               "positions with the tablebase")))
+        if self.propagator:
+            self.propagator.propagate_all(self.about_to_close)
+        candidates = find_candidates(
+            self.tree, self.max_positions, self.about_to_close, self.propagator, self.order, self.reach_probabilities)
+        self.log(" ".join(("found", str(len(candidates)), "candidates")))
+        if self.time_budget:
+            candidates = self.time_budget.plan(self.tree, candidates)
+            if self.order != ORDER_BY_SOURCE:
+                # the plan is ordered by cost, the cheapest first. restore the requested order amongst the planned positions.
+                candidates = order_candidates(
+                    self.tree, candidates, self.order, self.reach_probabilities)
+            self.log(" ".join(("planned", str(len(candidates)), "candidates within", str(round(self.time_budget.get_remaining_seconds())),
+                     "seconds, estimated branching factor", str(round(self.time_budget.model.get_branching_factor(), 2)))))
+        return candidates
+
+    def resume_session(self) -> list[str]:
+        """ resumes the persisted session: its results are written into the tree and the budget spent is restored. the search for
+        candidates and the propagation of evaluations are skipped so that the analysis continues immediately.
+
+        Returns:
+            list[str]: the fens of the session that are not done yet
+        """
+        applied = self.session.resume()
+        if self.time_budget:
+            if self.session.session_seconds:
+                self.time_budget.session_seconds = self.session.session_seconds
+            self.time_budget.spent_seconds = self.session.spent_seconds
+        self.log(" ".join(("resuming analysis session with", str(len(self.session.queue)), "positions left,", str(self.session.completed),
+                 "completed and", str(applied), "results restored")))
+        return list(self.session.queue)
+
+    def is_out_of_time(self) -> bool:
+        """
+        Returns:
+            bool: True if the total time budget is used up
+        """
+        return self.total_time_seconds != None and time.time() - self.start_time >= self.total_time_seconds
+
+    def should_stop(self) -> bool:
+        """
+        Returns:
+            bool: True if no further position should be started
+        """
+        return self.about_to_close() or self.is_out_of_time() or (self.time_budget != None and self.time_budget.is_exhausted())
+
+    def run(self) -> int:
+        """ finds the candidates (or resumes the persisted session) and analyses them with the engine pool. blocks until all candidates
+        are analysed, the time budget is used up or about_to_close returns True. the session is deleted once it is done and kept
+        otherwise.
+
+        Returns:
+            int: amount of positions analysed
+        """
+        self.start_time = time.time()
+        self.last_checkpoint_time = self.start_time
+        self.analysed_positions = 0
+        self.task = self.scheduler.get_current_task() if self.scheduler else None
+        self.log(" ".join(("analysing up to", str(self.max_positions), "positions with",
+                 str(len(self.engines)), "engine(s)")))
+        if self.session and self.session.exists():
+            candidates = self.resume_session()
+            self.done_positions = self.session.completed
+        else:
+            self.done_positions = 0
+            candidates = self.find_candidates()
+            if self.session:
+                self.session.start(
+                    candidates, self.time_budget.session_seconds if self.time_budget else None)
+        self.total_positions = self.done_positions + len(candidates)
+        self.report_progress()
+        queue = Queue()
+        for fen in candidates:
+            queue.put(fen)
+        if len(self.engines) == 1:
+            self.work(self.engines[0], queue)
+        else:
+            workers = [Thread(target=self.work, args=(engine, queue), daemon=True)
+                       for engine in self.engines]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+        if self.checkpoint_interval_seconds:
+            self.checkpoint()
+        if self.session:
+            if self.session.is_done() or (self.time_budget and self.time_budget.is_exhausted()):
+                self.session.finish()
+            else:
+                self.log("the analysis session is saved and will be resumed by the next analysis")
+        self.log(" ".join(("analysed", str(self.analysed_positions), "positions in",
+                 str(round(time.time() - self.start_time)), "seconds")))
+        return self.analysed_positions
+
+    def work(self, engine: Engine, queue: Queue):
+        """ analyses positions from the queue with the given engine until the queue is empty or should_stop returns True.
+
+        Args:
+            engine (Engine): the engine of this worker
+            queue (Queue): queue of fens
+        """
+        if self.task:
+            # lets the worker threads of an engine pool pause and stop with the task that runs the analysis
+            self.scheduler.set_current_task(self.task)
+        while not self.should_stop():
+            try:
+                fen = queue.get_nowait()
+            except Empty:
+                return
+            node: Node = self.tree.get(fen)
+            # the analysis of other positions of this run may have determined the value of this position in the meantime
+            if not is_candidate(node, self.propagator):
+                self.log(" ".join(("skipping position", fen,
+                         "because it is determined by its children")))
+                if self.session:
+                    self.session.complete(fen)
+                self.report_progress(1)
+                continue
+            start_time = time.time()
+            if not self.analyse_node(engine, node, get_target_depth(node.source())):
+                return
+            if self.session:
+                self.session.complete(fen, node, time.time() - start_time)
+            self.report_progress(1)
+            with self.lock:
+                self.analysed_positions += 1
+                if self.checkpoint_interval_seconds and time.time() - self.last_checkpoint_time >= self.checkpoint_interval_seconds:
+                    self.checkpoint()
+
+    def report_progress(self, done_positions: int = 0):
+        """ counts the done positions and reports the progress to the task that runs the analysis (if any)
+
+        Args:
+            done_positions (int, optional): Defaults to 0. amount of positions that were done since the last report
+        """
+        with self.lock:
+            self.done_positions += done_positions
+            if self.task:
+                self.scheduler.report_progress(
+                    self.done_positions, self.total_positions, self.task)
+
+    def analyse_node(self, engine: Engine, node: Node, target_depth: int) -> bool:
+        """ analyses the given node up to target_depth and updates it if the engine found a deeper evaluation or a mate. with a time
+        budget the search is given the time allocated by the budget and is stopped early if it stalls.
+
+        Args:
+            engine (Engine): the engine to use
+            node (Node): the node to analyse
+            target_depth (int): the depth the engine is given to analyse the position
+
+        Returns:
+            bool: False if the engine failed (which ends the worker), True otherwise
+        """
+        time_seconds = self.time_budget.allocate(
+            target_depth, node.eval_depth) if self.time_budget else self.time_seconds
+        self.log(" ".join(("evaluating position", str(node.state), "(" + node.source().sformat() + ") at depth",
+                 str(target_depth), "for up to", str(round(time_seconds, 1)), "seconds")))
+        board = Board(fen=node.state)
+        if self.on_position:
+            self.on_position(board)
+        try:
+            if self.time_budget or self.scheduler:
+                score_eval, score_depth, is_mate = self.score_streaming(
+                    engine, board, target_depth, time_seconds)
+            else:
+                score_eval, score_depth, is_mate = engine.score(
+                    board, time_seconds, target_depth)
+        except Exception:
+            print("error while analysing position in batch analyser")
+            print(traceback.format_exc())
+            return False
+        if is_mate or score_depth > node.eval_depth:
+            self.log(" ".join(("updating depth from", str(node.eval_depth), "to", str(
+                score_depth), "and eval from", str(node.eval), "to", str(score_eval))))
+            node.update(score_eval, score_depth, is_mate)
+        else:
+            self.log(" ".join(("new depth of", str(score_depth),
+                     "does not exceed", str(node.eval_depth))))
+        return True
+
+    def score_streaming(self, engine: Engine, board: Board, target_depth: int, time_seconds: float):
+        """ scores the board with a streamed search (@see chessapp.controller.engine.Engine.score_streaming). with a time budget the
+        search is stopped when it stalls and its time is booked in the budget. with a scheduler the search is stopped when interactive
+        work starts; the analysis then waits at its safe point (about_to_close) and repeats the search afterwards. a search of a
+        cancelled task is stopped immediately.
+
+        Args:
+            engine (Engine): the engine to use
+            board (Board): the board to score
+            target_depth (int): the depth the engine is given to analyse the position
+            time_seconds (float): the time the engine is given to analyse the position
+
+        Returns:
+            tuple: (eval, depth, is_mate) @see chessapp.controller.engine.Engine.score
+        """
+        while True:
+            detector = self.time_budget.create_stall_detector(
+                target_depth, time_seconds) if self.time_budget else None
+            interrupted = False
+
+            def should_stop(depth: int, elapsed: float) -> bool:
+                nonlocal interrupted
+                if self.scheduler and (self.scheduler.should_yield() or self.scheduler.is_cancelled()):
+                    interrupted = True
+                    return True
+                return detector != None and detector(depth, elapsed)
+            start_time = time.time()
+            try:
+                score = engine.score_streaming(
+                    board, time_seconds, target_depth, should_stop)
+            finally:
+                if detector:
+                    self.time_budget.finish(detector, time.time() - start_time)
+            if not interrupted:
+                if detector and detector.stalled:
+                    self.log(" ".join(("stopped search at depth", str(
+                        score[1]), "because it stalled")))
+                return score
+            if self.scheduler.is_cancelled():
+                return score
+            self.log(" ".join(("paused search at depth", str(
+                score[1]), "for interactive work")))
+            # blocks until the interactive work is done
+            if self.should_stop():
+                return score
+            self.log("resuming search")
+
+    def checkpoint(self):
+        """ saves the tree to disk
+        """
+        self.log("saving checkpoint")
+        self.tree.save()
+        if self.session:
+            self.session.on_tree_saved()
+        self.last_checkpoint_time = time.time()
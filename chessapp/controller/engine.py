@@ -2,11 +2,17 @@ from chess import Board
 from chess.engine import Limit, SimpleEngine
 from chessapp.model.chesstree import get_reduced_fen_from_board
 from chessapp.util.paths import get_stockfish_exe
+from chessapp.controller.tablebase import Tablebase, get_default_tablebase
+from chessapp.controller.enginemetrics import EngineMetrics, EngineCall, get_engine_metrics, get_stop_reason, STOP_REASON_TABLEBASE, STOP_REASON_STOPPED
+from threading import Lock
+import time as timer
 
 s_analyse_desired_time_seconds: int = 30
 s_analyse_desired_depth: int = 30
 s_engine_number_of_threads: int = 14
 s_multi_pv: int = 1
+# centipawn value of a mate in 0, only used to compare mate scores by sign
+s_mate_score: int = 100000
 
 
 class MoveDescriptor:
@@ -34,10 +40,82 @@ class Engine:
     """a wrapper for the stockfish engine
     """
 
-    def __init__(self) -> None:
+    def __init__(self, engine_path: str = None, number_of_threads: int = s_engine_number_of_threads, tablebase: Tablebase = None,
+                 metrics: EngineMetrics = None, lazy: bool = False) -> None:
         """ initializes the engine (e.g. opens stockfish)
+
+        Args:
+            engine_path (str, optional): Defaults to None. path to the uci engine executable. if None, get_stockfish_exe() is used.
+            number_of_threads (int, optional): Defaults to s_engine_number_of_threads. the number of threads the engine uses per search.
+            tablebase (Tablebase, optional): Defaults to None. positions contained in this tablebase are resolved without starting
+                a search. if None, the default tablebase is used if available (@see chessapp.controller.tablebase.get_default_tablebase)
+            metrics (EngineMetrics, optional): Defaults to None. receives the measurements of each call. if None, the shared registry
+                is used (@see chessapp.controller.enginemetrics.get_engine_metrics)
+            lazy (bool, optional): Defaults to False. if True, the engine process is not started before the first search
+                (@see get_process), so that an engine that is never used costs neither startup time nor memory.
+        """
+        self.engine_path: str = engine_path if engine_path else get_stockfish_exe()
+        self.engine: SimpleEngine = None
+        self.process_lock = Lock()
+        self.is_closed: bool = False
+        if not lazy:
+            self.get_process()
+        self.number_of_threads: int = number_of_threads
+        self.tablebase: Tablebase = tablebase if tablebase else get_default_tablebase()
+        self.metrics: EngineMetrics = metrics if metrics else get_engine_metrics()
+
+    def analyse(self, board: Board, time: int, depth: int, multipv: int, method: str):
+        """ runs a search and records its latency, reached depth, nodes, nps, hashfull and stop reason in the metrics
+
+        Args:
+            board (Board): the board to analyse
+            time (int): the time in seconds the engine is given to analyse the position
+            depth (int): the depth the engine is given to analyse the position
+            multipv (int): the number of principal variations
+            method (str): name of the calling method (recorded in the metrics)
+
+        Returns:
+            list[chess.engine.InfoDict]: the info of each principal variation, best first
+        """
+        start_time = timer.perf_counter()
+        result = self.get_process().analyse(board, Limit(
+            time=time, depth=depth), options={"Threads": self.number_of_threads}, multipv=multipv)
+        latency_seconds = timer.perf_counter() - start_time
+        info = result[0]
+        self.metrics.record(EngineCall(method, latency_seconds, time, depth, info.get("depth", 0), info.get("nodes", 0), info.get("nps", 0),
+                            info.get("hashfull", 0), self.number_of_threads, get_stop_reason(info, latency_seconds, time, depth)))
+        return result
+
+    def record_tablebase_hit(self, method: str, time: int, depth: int, tablebase_depth: int):
+        """ records a call that was answered by the tablebase in the metrics
+
+        Args:
+            method (str): name of the calling method
+            time (int): the time limit of the call
+            depth (int): the depth limit of the call
+            tablebase_depth (int): the depth of the tablebase result
+        """
+        self.metrics.record(EngineCall(method, 0, time, depth, tablebase_depth,
+                            0, 0, 0, self.number_of_threads, STOP_REASON_TABLEBASE))
+
+    def find_tablebase_moves(self, board: Board, multipv: int) -> [MoveDescriptor]:
+        """ finds the best moves for the given board in the tablebase
+
+        Args:
+            board (Board): the board to find the best moves for
+            multipv (int): the number of best moves to return
+
+        Returns:
+            [MoveDescriptor]: array of MoveDescriptor for the best moves. empty if the position is not contained in the tablebase.
         """
-        self.engine = SimpleEngine.popen_uci(get_stockfish_exe())
+        if not self.tablebase:
+            return []
+        best_moves = []
+        for move, score in self.tablebase.rank_moves(board)[:multipv]:
+            eval, depth, is_mate = score
+            best_moves.append(MoveDescriptor(
+                eval, depth, is_mate, [move], get_reduced_fen_from_board(board)))
+        return best_moves
 
     def find_best_moves(self, board: Board, time: int = s_analyse_desired_time_seconds, depth: int = s_analyse_desired_depth, multipv: int = s_multi_pv) -> [MoveDescriptor]:
         """finds the best moves for the given board
@@ -51,20 +129,17 @@ class Engine:
         Returns:
             [MoveDescriptor]: array of MoveDescriptor for the best moves
         """
-        result = self.engine.analyse(board, Limit(
-            time=time, depth=depth), options={"Threads": s_engine_number_of_threads}, multipv=multipv)
+        tablebase_moves = self.find_tablebase_moves(board, multipv)
+        if len(tablebase_moves) > 0:
+            self.record_tablebase_hit(
+                "find_best_moves", time, depth, tablebase_moves[0].depth)
+            return tablebase_moves
+        result = self.analyse(board, time, depth, multipv, "find_best_moves")
         best_moves = []
         for i in range(0, len(result)):
-            eval = 0
-            pov_score = result[i]["score"]
-            if pov_score.is_mate():
-                eval = float(100)
-                if not pov_score.turn:
-                    eval = -eval
-            else:
-                eval = pov_score.white().score() / 100.0
+            eval, eval_depth, is_mate = info_to_score(result[i])
             best_moves.append(MoveDescriptor(
-                eval, result[i]["depth"], pov_score.is_mate(), result[i]["pv"], get_reduced_fen_from_board(board)))
+                eval, eval_depth, is_mate, result[i]["pv"], get_reduced_fen_from_board(board)))
         return best_moves
 
     def score(self, board: Board, time: int = s_analyse_desired_time_seconds, depth: int = s_analyse_desired_depth):
@@ -78,26 +153,154 @@ class Engine:
         Returns:
             tuple: (eval, depth, is_mate) where eval is the evaluation of the board in centipawns/100 or as 100 if mate, depth is the depth of the evaluation and is_mate is whether the board is a mate
         """
-        result = self.engine.analyse(board, Limit(
-            time=time, depth=depth), options={"Threads": s_engine_number_of_threads}, multipv=s_multi_pv)
-        best_eval = 0
-        is_mate = False
-        for i in range(0, len(result)):
-            eval = 0
-            pov_score = result[i]["score"]
-            if pov_score.is_mate():
-                is_mate = True
-                eval = float(100)
-                if not pov_score.turn:
-                    eval = -eval
-            else:
-                eval = pov_score.white().score() / 100.0
-            # best move is first entry in result array
-            if i == 0:
-                best_eval = eval
-        return best_eval, result[0]["depth"], is_mate
+        if self.tablebase:
+            tablebase_score = self.tablebase.score(board)
+            if tablebase_score:
+                self.record_tablebase_hit(
+                    "score", time, depth, tablebase_score[1])
+                return tablebase_score
+        result = self.analyse(board, time, depth, s_multi_pv, "score")
+        # best move is first entry in result array
+        return info_to_score(result[0])
+
+    def score_streaming(self, board: Board, time: int = s_analyse_desired_time_seconds, depth: int = s_analyse_desired_depth, should_stop=None):
+        """scores the given board like score but follows the iterative deepening of the engine and stops the search as soon as
+        should_stop returns True. the result is the evaluation of the deepest completed iteration.
+
+        Args:
+            board (Board): the board to score
+            time (int, optional): Defaults to s_analyse_desired_time_seconds. the time in seconds the engine is given to analyse the position.
+            depth (int, optional): Defaults to s_analyse_desired_depth. the depth the engine is given to analyse the position.
+            should_stop (callable, optional): Defaults to None. called with the completed depth and the elapsed seconds for every info of
+                the engine (@see chessapp.controller.timebudget.StallDetector)
+
+        Returns:
+            tuple: (eval, depth, is_mate) @see score. (0.0, 0, False) if the search ended before an iteration was completed.
+        """
+        if self.tablebase:
+            tablebase_score = self.tablebase.score(board)
+            if tablebase_score:
+                self.record_tablebase_hit(
+                    "score_streaming", time, depth, tablebase_score[1])
+                return tablebase_score
+        info = self.analyse_streaming(
+            board, time, depth, should_stop, "score_streaming")
+        if not "score" in info:
+            # the search ended before it completed an iteration
+            return 0.0, 0, False
+        return info_to_score(info)
+
+    def find_best_move_streaming(self, board: Board, time: int = s_analyse_desired_time_seconds, depth: int = s_analyse_desired_depth,
+                                 should_stop=None) -> [MoveDescriptor]:
+        """finds the best move for the given board like find_best_moves (with multipv 1) but stops the search as soon as should_stop
+        returns True (@see score_streaming)
+
+        Args:
+            board (Board): the board to find the best move for
+            time (int, optional): Defaults to s_analyse_desired_time_seconds. the time in seconds the engine is given to analyse the position.
+            depth (int, optional): Defaults to s_analyse_desired_depth. the depth the engine is given to analyse the position.
+            should_stop (callable, optional): Defaults to None. called with the completed depth and the elapsed seconds for every info of
+                the engine
+
+        Returns:
+            [MoveDescriptor]: array with the MoveDescriptor of the best move of the deepest completed iteration. empty if the search was
+            stopped before the first iteration was completed.
+        """
+        tablebase_moves = self.find_tablebase_moves(board, 1)
+        if len(tablebase_moves) > 0:
+            self.record_tablebase_hit(
+                "find_best_move_streaming", time, depth, tablebase_moves[0].depth)
+            return tablebase_moves
+        info = self.analyse_streaming(
+            board, time, depth, should_stop, "find_best_move_streaming")
+        if not "pv" in info or len(info["pv"]) == 0:
+            return []
+        eval, eval_depth, is_mate = info_to_score(info)
+        return [MoveDescriptor(eval, eval_depth, is_mate, info["pv"], get_reduced_fen_from_board(board))]
+
+    def analyse_streaming(self, board: Board, time: int, depth: int, should_stop, method: str):
+        """ runs a search that follows the iterative deepening of the engine and is stopped as soon as should_stop returns True. the
+        search is recorded in the metrics like analyse, including the time each depth was completed at.
+
+        Args:
+            board (Board): the board to analyse
+            time (int): the time in seconds the engine is given to analyse the position
+            depth (int): the depth the engine is given to analyse the position
+            should_stop (callable): None or callable that is called with the completed depth and the elapsed seconds for every info
+            method (str): name of the calling method (recorded in the metrics)
+
+        Returns:
+            chess.engine.InfoDict: the info of the deepest completed iteration
+        """
+        start_time = timer.perf_counter()
+        depth_times = []
+        completed_info = None
+        stopped = False
+        with self.get_process().analysis(board, Limit(time=time, depth=depth), options={"Threads": self.number_of_threads}) as analysis:
+            for info in analysis:
+                elapsed = timer.perf_counter() - start_time
+                # an info with score and pv is sent when an iteration is completed, other infos only report progress
+                if "score" in info and "pv" in info and "depth" in info:
+                    completed_info = info
+                    if len(depth_times) == 0 or info["depth"] > depth_times[-1][0]:
+                        depth_times.append((info["depth"], elapsed))
+                if completed_info != None and should_stop != None and should_stop(completed_info["depth"], elapsed):
+                    stopped = True
+                    break
+            if completed_info == None:
+                analysis.wait()
+                completed_info = analysis.info
+        latency_seconds = timer.perf_counter() - start_time
+        stop_reason = STOP_REASON_STOPPED if stopped else get_stop_reason(
+            completed_info, latency_seconds, time, depth)
+        self.metrics.record(EngineCall(method, latency_seconds, time, depth, completed_info.get("depth", 0), completed_info.get("nodes", 0),
+                            completed_info.get("nps", 0), completed_info.get("hashfull", 0), self.number_of_threads, stop_reason, depth_times))
+        return completed_info
+
+    def get_process(self) -> SimpleEngine:
+        """ returns the engine process and starts it if it is not running yet
+
+        Raises:
+            Exception: if the engine is closed
+
+        Returns:
+            SimpleEngine: the engine process
+        """
+        with self.process_lock:
+            if self.is_closed:
+                raise Exception("the engine is closed")
+            if self.engine == None:
+                self.engine = SimpleEngine.popen_uci(self.engine_path)
+            return self.engine
+
+    def is_started(self) -> bool:
+        """
+        Returns:
+            bool: True if the engine process has been started
+        """
+        return self.engine != None
 
     def close(self):
-        """closes the engine (closes stockfish)
+        """closes the engine (closes stockfish) if it has been started
         """
-        self.engine.close()
+        with self.process_lock:
+            self.is_closed = True
+            if self.engine != None:
+                self.engine.close()
+
+
+def info_to_score(info) -> tuple:
+    """ converts the info of a principal variation to a score
+
+    Args:
+        info (chess.engine.InfoDict): the info
+
+    Returns:
+        tuple: (eval, depth, is_mate) where eval is the evaluation of the board in centipawns/100 (from the perspective of white) or
+        100 if white mates and -100 if black mates, depth is the depth of the evaluation and is_mate is whether the board is a mate
+    """
+    white_score = info["score"].white()
+    if white_score.is_mate():
+        # the sign is the side that mates, not the side to move. a mated side to move (mate 0) counts as mated.
+        return (float(100) if white_score.score(mate_score=s_mate_score) > 0 else float(-100)), info["depth"], True
+    return white_score.score() / 100.0, info["depth"], False
@@ -0,0 +1,243 @@
+from threading import Lock
+from collections import deque
+import json
+import math
+import time
+
+s_latency_bucket_seconds: float = 5
+s_nps_bucket: int = 1000000
+s_hashfull_bucket: int = 100
+s_histogram_bar_width: int = 40
+# a search that used at least this fraction of its time limit is considered to have been stopped by the time limit
+s_time_limit_tolerance: float = 0.95
+# the registry keeps the measurements of this many calls, older calls are only counted (@see EngineMetrics)
+s_max_recorded_calls: int = 10000
+
+STOP_REASON_DEPTH = "depth"
+STOP_REASON_TIME = "time"
+STOP_REASON_MATE = "mate"
+STOP_REASON_TABLEBASE = "tablebase"
+# the caller stopped the search (e.g. because it stalled or interactive work has priority)
+STOP_REASON_STOPPED = "stopped"
+STOP_REASON_OTHER = "other"
+
+
+class EngineCall:
+    """ the measurements of one call of the engine (@see chessapp.controller.engine.Engine.score and find_best_moves)
+    """
+
+    def __init__(self, method: str, latency_seconds: float, time_limit: float, target_depth: int, depth: int, nodes: int, nps: int,
+                 hashfull: int, threads: int, stop_reason: str, depth_times: list[tuple[int, float]] = None):
+        """ creates a new record
+
+        Args:
+            method (str): name of the engine method that was called
+            latency_seconds (float): wall-clock time of the call in seconds
+            time_limit (float): time limit of the search in seconds
+            target_depth (int): depth limit of the search
+            depth (int): depth the search reached
+            nodes (int): nodes searched as reported by the engine (0 if unknown)
+            nps (int): nodes per second as reported by the engine (0 if unknown)
+            hashfull (int): permille of the hash table that is in use as reported by the engine (0 if unknown)
+            threads (int): number of threads of the search
+            stop_reason (str): why the search stopped (one of the STOP_REASON_* constants)
+            depth_times (list[tuple[int, float]], optional): Defaults to None. the depths the search completed and the seconds it
+                needed to complete them (only known for streamed searches, @see chessapp.controller.engine.Engine.score_streaming)
+        """
+        self.method: str = method
+        self.latency_seconds: float = latency_seconds
+        self.time_limit: float = time_limit
+        self.target_depth: int = target_depth
+        self.depth: int = depth
+        self.nodes: int = nodes
+        self.nps: int = nps
+        self.hashfull: int = hashfull
+        self.threads: int = threads
+        self.stop_reason: str = stop_reason
+        self.depth_times: list[tuple[int, float]] = depth_times
+        self.timestamp: float = time.time()
+
+    def to_dict(self) -> dict:
+        """
+        Returns:
+            dict: the record as json serializable dict
+        """
+        return dict(self.__dict__)
+
+
+def get_stop_reason(info: dict, latency_seconds: float, time_limit: float, target_depth: int) -> str:
+    """ infers why a search stopped from its result since the uci protocol does not report it
+
+    Args:
+        info (dict): the info of the principal variation (@see chess.engine.InfoDict)
+        latency_seconds (float): wall-clock time of the search in seconds
+        time_limit (float): time limit of the search in seconds
+        target_depth (int): depth limit of the search
+
+    Returns:
+        str: one of the STOP_REASON_* constants
+    """
+    if "score" in info and info["score"].is_mate():
+        return STOP_REASON_MATE
+    if info.get("depth", 0) >= target_depth:
+        return STOP_REASON_DEPTH
+    if time_limit and latency_seconds >= time_limit * s_time_limit_tolerance:
+        return STOP_REASON_TIME
+    return STOP_REASON_OTHER
+
+
+def histogram(values, bucket_width: float) -> list[tuple[float, int]]:
+    """
+    Args:
+        values (iterable): the values
+        bucket_width (float): width of each bucket
+
+    Returns:
+        list[tuple[float, int]]: the lower bound and the amount of values of each non-empty bucket, ordered by lower bound
+    """
+    buckets = {}
+    for value in values:
+        bucket = math.floor(value / bucket_width) * bucket_width
+        buckets[bucket] = buckets.get(bucket, 0) + 1
+    return sorted(buckets.items())
+
+
+def format_histogram(title: str, buckets: list[tuple[float, int]], bucket_width: float = None) -> list[str]:
+    """ formats a histogram (@see histogram) as text lines with one bar per bucket
+
+    Args:
+        title (str): title of the histogram
+        buckets (list[tuple[float, int]]): the buckets
+        bucket_width (float, optional): Defaults to None. if given, the buckets are labelled as ranges, otherwise as values
+
+    Returns:
+        list[str]: the lines
+    """
+    lines = [title]
+    if len(buckets) == 0:
+        lines.append("  no data")
+        return lines
+    max_count = max(count for _, count in buckets)
+    for bucket, count in buckets:
+        label = str(bucket) if bucket_width == None else str(
+            bucket) + " - " + str(bucket + bucket_width)
+        bar = "#" * max(1, round(count * s_histogram_bar_width / max_count))
+        lines.append("  " + label.rjust(24) + " | " +
+                     bar + " " + str(count))
+    return lines
+
+
+class EngineMetrics:
+    """ collects the measurements of engine calls (@see EngineCall). all engines share one registry by default
+    (@see get_engine_metrics) so that the Analyser, the batch analysis and the other modules report into the same data. the
+    measurements of the last max_calls calls are kept, the amount of calls and their stop reasons are counted over all calls, so a
+    long running app does not grow the registry without bound. the registry is thread-safe.
+    """
+
+    def __init__(self, max_calls: int = s_max_recorded_calls):
+        """ creates an empty registry
+
+        Args:
+            max_calls (int, optional): Defaults to s_max_recorded_calls. amount of calls whose measurements are kept
+        """
+        self.calls: deque[EngineCall] = deque(maxlen=max_calls)
+        self.amount: int = 0
+        self.stop_reasons: dict[str, int] = {}
+        self.lock = Lock()
+
+    def record(self, call: EngineCall):
+        """ adds the measurements of a call. the measurements of the oldest call are dropped if max_calls are kept already.
+
+        Args:
+            call (EngineCall): the call
+        """
+        with self.lock:
+            self.calls.append(call)
+            self.amount += 1
+            self.stop_reasons[call.stop_reason] = self.stop_reasons.get(
+                call.stop_reason, 0) + 1
+
+    def get_calls(self) -> list[EngineCall]:
+        """
+        Returns:
+            list[EngineCall]: a copy of the kept calls, oldest first
+        """
+        with self.lock:
+            return list(self.calls)
+
+    def clear(self):
+        """ removes all recorded calls and counts
+        """
+        with self.lock:
+            self.calls.clear()
+            self.amount = 0
+            self.stop_reasons = {}
+
+    def get_amount(self) -> int:
+        """
+        Returns:
+            int: amount of all recorded calls, including the ones whose measurements were dropped
+        """
+        with self.lock:
+            return self.amount
+
+    def get_stop_reasons(self) -> dict[str, int]:
+        """
+        Returns:
+            dict[str, int]: amount of all recorded calls per stop reason
+        """
+        with self.lock:
+            return dict(self.stop_reasons)
+
+    def format_report(self) -> list[str]:
+        """ formats the histograms of latency, depth reached vs. target, nodes per second and hash usage as well as the stop reasons
+        of the kept engine searches (tablebase lookups are only counted as stop reason). the stop reasons are counted over all calls.
+
+        Returns:
+            list[str]: the lines of the report
+        """
+        calls = self.get_calls()
+        searches = [
+            call for call in calls if call.stop_reason != STOP_REASON_TABLEBASE]
+        lines = ["engine metrics of " + str(self.get_amount()) + " calls (histograms of the last " + str(len(calls)) + ")"]
+        for stop_reason, count in sorted(self.get_stop_reasons().items()):
+            lines.append("  stopped by " + stop_reason + ": " + str(count))
+        if len(searches) > 0:
+            lines.append("  average nps: " + str(round(sum(call.nps for call in searches) / len(searches))) + " with " +
+                         ", ".join(sorted(set(str(call.threads) for call in searches))) + " thread(s)")
+        lines += format_histogram("latency (seconds)", histogram(
+            [call.latency_seconds for call in searches], s_latency_bucket_seconds), s_latency_bucket_seconds)
+        lines += format_histogram("depth reached minus target depth", histogram(
+            [call.depth - call.target_depth for call in searches], 1))
+        lines += format_histogram("nodes per second", histogram(
+            [call.nps for call in searches], s_nps_bucket), s_nps_bucket)
+        lines += format_histogram("hashfull (permille)", histogram(
+            [call.hashfull for call in searches], s_hashfull_bucket), s_hashfull_bucket)
+        return lines
+
+    def to_dict(self) -> dict:
+        """
+        Returns:
+            dict: the amount of calls, the stop reasons and the kept calls as json serializable dict
+        """
+        return {"amount": self.get_amount(), "stop_reasons": self.get_stop_reasons(), "calls": [call.to_dict() for call in self.get_calls()]}
+
+    def dump(self, file_path: str):
+        """ writes the kept calls as json to the given file (@see to_dict)
+
+        Args:
+            file_path (str): path of the json file
+        """
+        with open(file_path, "w") as file:
+            json.dump(self.to_dict(), file, indent=1)
+
+
+s_engine_metrics: EngineMetrics = EngineMetrics()
+
+
+def get_engine_metrics() -> EngineMetrics:
+    """
+    Returns:
+        EngineMetrics: the registry shared by all engines
+    """
+    return s_engine_metrics
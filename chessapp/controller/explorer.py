@@ -3,18 +3,29 @@ from chessapp.view.chessboardwidget import PieceMovement
 from chess import Board
 import chess
 import chessapp.model.move
-from chessapp.view.module import ChessboardAndLogModule, create_method_action, MethodAction
+from chessapp.view.module import ChessboardAndLogModule, create_method_action
+from chessapp.controller.scheduler import PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND, get_scheduler
+from chessapp.configuration import LAZY_RESOURCES
 from chessapp.controller.engine import Engine, MoveDescriptor
 import traceback
 from chessapp.model.node import Node
 import chess
 from chessapp.model.sourcetype import SourceType
 from chessapp.util.fen import get_reduced_fen_from_board
+from threading import Lock
 
 s_eval_time_seconds = 60
 s_eval_depth = 20
 s_best_moves_eval_depth = 30
 s_best_moves_multipv = 3
+# speculative analysis of the positions that are likely to be displayed next (@see Explorer.prefetch)
+s_prefetch_enabled = True
+# same depth as the analysis of the displayed position so that a prefetched position does not need to be analysed again
+s_prefetch_eval_depth = 25
+# how many plies ahead of the displayed position are prefetched
+s_prefetch_plies = 1
+# how many moves per position are followed
+s_prefetch_max_children = 4
 
 
 class Explorer(ChessboardAndLogModule):
@@ -31,12 +42,15 @@ class Explorer(ChessboardAndLogModule):
             tree (ChessTree): _description_
         """
         super().__init__(app, "Explorer", [
-            create_method_action(app, "Analyse d=25", self.analyse_d25),
-            create_method_action(app, "Analyse d=30", self.analyse_d30),
-            create_method_action(app, "Analyse d=35", self.analyse_d35),
+            create_method_action(app, "Analyse d=25",
+                                 self.analyse_d25, PRIORITY_INTERACTIVE),
+            create_method_action(app, "Analyse d=30",
+                                 self.analyse_d30, PRIORITY_INTERACTIVE),
+            create_method_action(app, "Analyse d=35",
+                                 self.analyse_d35, PRIORITY_INTERACTIVE),
             create_method_action(app, "Back", self.on_back),
             create_method_action(app, "Find Best Moves: d=" + str(s_best_moves_eval_depth) +
-                                 ", multipv=" + str(s_best_moves_multipv), self.find_best_moves),
+                                 ", multipv=" + str(s_best_moves_multipv), self.find_best_moves, PRIORITY_INTERACTIVE),
             create_method_action(
                 app, "Flip Board", self.flip_board),
             create_method_action(app, "Reset", self.reset_board),
@@ -47,18 +61,44 @@ class Explorer(ChessboardAndLogModule):
         self.app = app
         self.tree = tree
         self.board = Board()
-        self.engine = Engine()
+        # the engine process is started by the first search (@see chessapp.configuration.LAZY_RESOURCES)
+        self.engine = Engine(lazy=LAZY_RESOURCES)
         self.previous_node = None
         self.last_move = None
+        # the engine process handles one search at a time
+        self.engine_lock = Lock()
+        # incremented whenever another position is displayed, outdated prefetches stop when it changes
+        self.prefetch_generation = 0
+        # the displayed position is only analysed once the user used the explorer (first focus or navigation), so that a lazy engine
+        # is not started at startup (@see on_register)
+        self.analysis_started: bool = False
 
     def on_register(self):
-        """ @see ChessboardAndLogModule.on_register
+        """ @see ChessboardAndLogModule.on_register. the start position is displayed without analysis, it is analysed on the first
+        focus (@see on_focus).
         """
-        self.reset_board()
+        self.reset_board(perform_analysis=False)
         self.chess_board_widget.view_white()
         self.chess_board_widget.eval_bar.is_visible = True
         self.chess_board_widget.board.show_best_move = True
 
+    def on_focus(self):
+        """ @see ChessboardAndLogModule.on_focus. analyses the displayed position when the explorer is focused for the first time.
+        """
+        super().on_focus()
+        if not self.analysis_started:
+            self.start_analysis()
+
+    def start_analysis(self):
+        """ analyses the displayed position and prefetches the positions that are likely to be displayed next (@see prefetch)
+        """
+        self.analysis_started = True
+        self.dispatch_threadpool(
+            self.analyse_d25, priority=PRIORITY_INTERACTIVE)
+        if s_prefetch_enabled:
+            self.dispatch_threadpool(
+                self.prefetch, "Explorer: prefetch", PRIORITY_BACKGROUND)
+
     def flip_board(self):
         """ Flips the board
         """
@@ -67,14 +107,17 @@ class Explorer(ChessboardAndLogModule):
     def find_best_moves(self):
         """ Finds the best moves for the current position and adds them to the tree.
         """
+        if not self.wait_until_ready(self.tree.loaded, "the tree"):
+            return
         base_fen = get_reduced_fen_from_board(self.board)
         base_board = Board(base_fen)
         node: Node = self.tree.get(base_fen)
         self.log_message("finding up to " + str(s_best_moves_multipv) + " best moves for position " +
                          str(node.state) + " at depth " + str(s_best_moves_eval_depth))
         try:
-            best_moves = self.engine.find_best_moves(
-                base_board, s_eval_time_seconds, s_best_moves_eval_depth, multipv=s_best_moves_multipv)
+            with self.engine_lock:
+                best_moves = self.engine.find_best_moves(
+                    base_board, s_eval_time_seconds, s_best_moves_eval_depth, multipv=s_best_moves_multipv)
         except Exception as e:
             print("error while analysing position in explorer")
             print(e)
@@ -108,11 +151,12 @@ class Explorer(ChessboardAndLogModule):
         """
         self.analyse_position(35)
 
-    def consume_move_descriptor(self, move_descriptor: MoveDescriptor):
+    def consume_move_descriptor(self, move_descriptor: MoveDescriptor, verbose: bool = True):
         """ Tries to update the tree based on the given move descriptor.
 
         Args:
             move_descriptor (MoveDescriptor): _description_
+            verbose (bool, optional): Defaults to True. Whether to log the found move.
         """
         copy_board = Board(move_descriptor.origin_fen)
         san: str = copy_board.san(move_descriptor.pv[0])
@@ -128,6 +172,8 @@ class Explorer(ChessboardAndLogModule):
         move = chessapp.model.move.Move(self.tree, san, fen_result,
                                         source=SourceType.ENGINE_SYNTHETIC)
         origin_node.add(move)
+        if not verbose:
+            return
         self.log_message("found move " + san + " with score " + str(move_descriptor.eval) +
                          " and cp loss " + str(origin_node.get_cp_loss(move)) + " at depth " + str(origin_node.eval_depth) + (
             " (which is a forced mate)" if origin_node.is_mate else "")
@@ -139,14 +185,17 @@ class Explorer(ChessboardAndLogModule):
         Args:
             depth (int, optional): Defaults to s_eval_depth. The depth to analyse the position at.
         """
+        if not self.wait_until_ready(self.tree.loaded, "the tree"):
+            return
         base_fen = get_reduced_fen_from_board(self.board)
         base_board = Board(base_fen)
         node: Node = self.tree.get(base_fen)
         if (node.eval_depth < depth or len(node.moves) == 0) and not node.is_mate:
             self.log_message("analysing position")
             try:
-                best_moves = self.engine.find_best_moves(
-                    base_board, s_eval_time_seconds, depth, multipv=1)
+                with self.engine_lock:
+                    best_moves = self.engine.find_best_moves(
+                        base_board, s_eval_time_seconds, depth, multipv=1)
                 for best_move in best_moves:
                     self.consume_move_descriptor(best_move)
             except Exception as e:
@@ -164,7 +213,7 @@ class Explorer(ChessboardAndLogModule):
         """
         if not board:
             return
-        self.reset_board()
+        self.reset_board(perform_analysis=False)
         self.board = board.copy()
         self.display()
 
@@ -180,8 +229,109 @@ class Explorer(ChessboardAndLogModule):
         node = self.tree.get(get_reduced_fen_from_board(self.board))
         self.chess_board_widget.display(
             self.board, node, self.previous_node, self.last_move, play_sound=play_sound)
+        self.prefetch_generation += 1
         if perform_analysis:
-            self.app.threadpool.start(MethodAction(self.analyse_d25))
+            self.start_analysis()
+
+    def rank_prefetch_moves(self, node: Node) -> list[chessapp.model.move.Move]:
+        """ ranks the moves of the node by how likely they are played next: the best move of the engine first, then by frequency
+        and by source (e.g. moves of the opening repertoire before engine moves)
+
+        Args:
+            node (Node): the node
+
+        Returns:
+            list[chessapp.model.move.Move]: the first s_prefetch_max_children moves of the ranking
+        """
+        best_move = node.get_best_move()
+        moves = sorted(node.moves, key=lambda move: (
+            move != best_move, -move.frequency, -move.source.value))
+        return moves[:s_prefetch_max_children]
+
+    def get_prefetch_positions(self, board: Board) -> list[str]:
+        """ collects the positions up to s_prefetch_plies plies ahead of the given board, nearest and most likely positions first
+
+        Args:
+            board (Board): the displayed board
+
+        Returns:
+            list[str]: the fens of the positions
+        """
+        positions = []
+        visited = set([get_reduced_fen_from_board(board)])
+        level = list(visited)
+        for _ in range(s_prefetch_plies):
+            next_level = []
+            for fen in level:
+                if not fen in self.tree.nodes:
+                    continue
+                for move in self.rank_prefetch_moves(self.tree.nodes[fen]):
+                    if not move.result in visited:
+                        visited.add(move.result)
+                        next_level.append(move.result)
+            positions.extend(next_level)
+            level = next_level
+        return positions
+
+    def prefetch(self):
+        """ speculatively analyses the positions that are likely to be displayed next (@see get_prefetch_positions) at depth
+        s_prefetch_eval_depth, so that the evaluation is already in the tree when the user plays the move. prefetching runs at
+        background priority: it pauses while interactive work runs and its searches are stopped as soon as interactive work starts.
+        it ends when another position is displayed.
+        """
+        generation = self.prefetch_generation
+        if not self.wait_until_ready(self.tree.loaded, "the tree"):
+            return
+
+        def is_outdated() -> bool:
+            return generation != self.prefetch_generation or self.is_closing or self.is_closed or get_scheduler().is_cancelled()
+
+        yielded = [False]
+
+        def should_stop(depth: int, elapsed: float) -> bool:
+            yielded[0] = get_scheduler().should_yield()
+            return is_outdated() or yielded[0]
+
+        positions = self.get_prefetch_positions(self.board.copy())
+        index = 0
+        while index < len(positions):
+            # pauses while interactive work (e.g. the analysis of the displayed position) runs
+            if self.about_to_close() or is_outdated():
+                return
+            fen = positions[index]
+            node: Node = self.tree.get(fen)
+            if (node.eval_depth >= s_prefetch_eval_depth and len(node.moves) > 0) or node.is_mate:
+                index += 1
+                continue
+            yielded[0] = False
+            try:
+                with self.engine_lock:
+                    if is_outdated():
+                        return
+                    best_moves = self.engine.find_best_move_streaming(
+                        Board(fen), s_eval_time_seconds, s_prefetch_eval_depth, should_stop)
+            except Exception as e:
+                print("error while prefetching position in explorer")
+                print(e)
+                return
+            # the result of a search that was stopped early is not written into the tree, the tree is saved and would keep the
+            # shallow evaluation
+            if is_outdated():
+                return
+            # a search that was stopped by interactive work is repeated, the transposition table of the engine keeps most of it
+            if yielded[0]:
+                continue
+            index += 1
+            best_moves = [best_move for best_move in best_moves
+                          if best_move.depth >= s_prefetch_eval_depth]
+            if len(best_moves) == 0:
+                self.log_message("prefetching position " + fen +
+                                 " did not reach depth " + str(s_prefetch_eval_depth))
+                continue
+            for best_move in best_moves:
+                self.consume_move_descriptor(best_move, verbose=False)
+            self.log_message("prefetched position " +
+                             fen + " at depth " + str(node.eval_depth))
 
     def show_fen(self):
         """ Shows the fen of the current board state.
@@ -235,13 +385,16 @@ class Explorer(ChessboardAndLogModule):
         self.last_move = None
         self.previous_node = None
 
-    def reset_board(self):
+    def reset_board(self, perform_analysis: bool = True):
         """ Resets the board to the initial state.
+
+        Args:
+            perform_analysis (bool, optional): Defaults to True. Whether to analyse the initial position (@see display).
         """
         self.board = Board()
         self.reset_last_move()
         self.chess_board_widget.reset()
-        self.display()
+        self.display(perform_analysis)
 
     def on_close(self):
         """ closes the engine. @see ChessboardAndLogModule.on_close
@@ -1,9 +1,19 @@
 from chessapp.model.chesstree import ChessTree
 from chessapp.view.module import LogModule, create_method_action
+from chessapp.controller.scheduler import PRIORITY_BACKGROUND
 from chessapp.controller.updater import import_pgn_from_folder_path
 from chessapp.model.sourcetype import SourceType
 from chessapp.util.paths import get_opening_tree_folder
+from chessapp.util.polyglot import PolyglotBook, export_polyglot, is_book_up_to_date
+from chessapp.model.reachprobability import compute_reach_probabilities, combine_reach_probabilities
+from chessapp.util.startupreport import get_startup_report
+from chessapp.configuration import LAZY_RESOURCES
 from os.path import join
+from os import replace
+from threading import Event, Lock
+from random import Random
+from chess import Board
+import chess
 
 s_source_data_folder_path: str = join(get_opening_tree_folder(), "source_data")
 s_white_source_folder_path: str = s_source_data_folder_path + "/white"
@@ -12,6 +22,8 @@ s_white_opening_tree_folder_path: str = join(
     get_opening_tree_folder(), "white")
 s_black_opening_tree_folder_path: str = join(
     get_opening_tree_folder(), "black")
+s_white_book_file_path: str = join(get_opening_tree_folder(), "white.bin")
+s_black_book_file_path: str = join(get_opening_tree_folder(), "black.bin")
 
 
 class OpeningTree(LogModule):
@@ -19,31 +31,77 @@ class OpeningTree(LogModule):
     """
 
     def __init__(self, app):
-        """initializes the opening tree module and imports the opening tree from the source data folder. the only action is import.
+        """initializes the opening tree module and imports the opening tree from the source data folder. the actions are import and
+        export polyglot.
 
         Args:
             app (ChessApp): the main application
         """
         super().__init__(app, "OpeningTree", [
-            create_method_action(app, "Import", self.import_opening_tree)])
+            create_method_action(app, "Import", self.import_opening_tree,
+                                 PRIORITY_BACKGROUND),
+            create_method_action(app, "Export Polyglot", self.export_polyglot_books)])
         self.white_opening_tree: ChessTree = ChessTree(
             s_white_opening_tree_folder_path)
         self.black_opening_tree: ChessTree = ChessTree(
             s_black_opening_tree_folder_path)
+        self.books: dict[str, PolyglotBook] = {}
+        # guards books: opening, reading, closing and replacing a book file (@see choose_book_move)
+        self.book_lock = Lock()
         self.app = app
-        self.dispatch_threadpool(self.load)
+        # set once both opening trees are loaded
+        self.loaded = Event()
+        self.load_requested: bool = False
+        self.load_lock = Lock()
+        if not LAZY_RESOURCES:
+            get_startup_report().begin("opening trees")
+            self.request_load()
+
+    def request_load(self):
+        """ dispatches load unless the opening trees are loading or loaded already. with LAZY_RESOURCES the opening trees are loaded
+        when they are needed first (@see wait_until_loaded) or when the module is focused, otherwise at startup.
+        """
+        with self.load_lock:
+            if self.load_requested:
+                return
+            self.load_requested = True
+        self.dispatch_threadpool(self.load, priority=PRIORITY_BACKGROUND)
+
+    def wait_until_loaded(self) -> bool:
+        """ requests the opening trees to be loaded and blocks until they are loaded (@see BaseModule.wait_until_ready)
+
+        Returns:
+            bool: True if the opening trees are loaded, False if the module is about to close
+        """
+        self.request_load()
+        return self.wait_until_ready(self.loaded, "the opening trees")
+
+    def on_focus(self):
+        """ loads the opening trees when the module is focused the first time (@see request_load)
+        """
+        super().on_focus()
+        self.request_load()
 
     def load(self):
-        """loads the opening tree from disk (usually once called on startup of the application)
+        """loads the opening tree from disk (once, at startup or on first use @see request_load. at startup this is the startup step
+        "opening trees") and sets loaded afterwards
         """
         self.log_message("loading opening tree...", 60000)
-        self.white_opening_tree.load()
-        self.black_opening_tree.load()
+        try:
+            self.white_opening_tree.load(
+                on_progress=lambda read, total: self.report_progress(read, 2 * total))
+            self.black_opening_tree.load(
+                on_progress=lambda read, total: self.report_progress(total + read, 2 * total))
+            self.loaded.set()
+        finally:
+            get_startup_report().end("opening trees")
         self.log_message("loading opening done")
 
     def import_opening_tree(self):
         """imports the opening tree from the source data folder (this may take a while and should only dispatched on a threadpool)
         """
+        if not self.wait_until_loaded():
+            return
         self.log_message("importing white opening tree...")
         self.white_opening_tree.clear()
         import_pgn_from_folder_path(self.app, self.white_opening_tree, SourceType.AMATEUR_GAME,
@@ -56,3 +114,89 @@ class OpeningTree(LogModule):
                                     s_black_source_folder_path, self.about_to_close, True)
         self.black_opening_tree.save()
         self.log_message("importing black opening tree done")
+
+    def get_reach_probabilities(self) -> dict[str, float]:
+        """ computes the probability to reach each position in a game from the move frequencies of the white and the black opening tree
+        (@see chessapp.model.reachprobability)
+
+        Returns:
+            dict[str, float]: the probabilities of the positions
+        """
+        if not self.wait_until_loaded():
+            return {}
+        return combine_reach_probabilities(compute_reach_probabilities(self.white_opening_tree, about_to_close=self.about_to_close),
+                                           compute_reach_probabilities(self.black_opening_tree, about_to_close=self.about_to_close))
+
+    def get_book(self, color: str) -> PolyglotBook | None:
+        """returns the polyglot book exported from the opening tree of the given color (@see export_polyglot_books). the book is opened
+        on first use and closed as soon as the opening tree is saved after the export (@see chessapp.util.polyglot.is_book_up_to_date).
+        the caller has to hold book_lock while it uses the book.
+
+        Args:
+            color (str): "white" or "black"
+
+        Returns:
+            PolyglotBook | None: the book or None if it has not been exported yet or is older than the opening tree
+        """
+        file_path = s_white_book_file_path if color == "white" else s_black_book_file_path
+        tree = self.white_opening_tree if color == "white" else self.black_opening_tree
+        if not is_book_up_to_date(file_path, tree):
+            if color in self.books:
+                self.books.pop(color).close()
+            return None
+        if not color in self.books:
+            self.books[color] = PolyglotBook(file_path)
+        return self.books[color]
+
+    def choose_book_move(self, color: str, board: Board, random: Random) -> chess.Move | None:
+        """ chooses a move of the position from the polyglot book of the given color by proportion of the weights of the known moves
+        (@see chessapp.util.polyglot.PolyglotBook.weighted_choice)
+
+        Args:
+            color (str): "white" or "black"
+            board (Board): the position
+            random (Random): source of randomness
+
+        Returns:
+            chess.Move | None: the chosen move or None if there is no up-to-date book or the book knows no move for the position
+        """
+        with self.book_lock:
+            book = self.get_book(color)
+            if not book:
+                return None
+            return book.weighted_choice(board, random)
+
+    def close_books(self):
+        """closes all opened polyglot books
+        """
+        with self.book_lock:
+            for book in self.books.values():
+                book.close()
+            self.books = {}
+
+    def export_polyglot_books(self):
+        """exports the white and black opening tree as polyglot books (white.bin and black.bin in the opening tree folder) with the
+        frequencies of the moves as weights. other tools and engines can read these books and the quiz uses them for opponent moves.
+        each book is written to a temporary file first and replaces the old book under book_lock, so the quiz never reads a partially
+        written book.
+        """
+        if not self.wait_until_loaded():
+            return
+        for color, tree, file_path in (("white", self.white_opening_tree, s_white_book_file_path),
+                                       ("black", self.black_opening_tree, s_black_book_file_path)):
+            self.log_message("exporting " + color + " polyglot book...")
+            entries = export_polyglot(
+                tree, file_path + ".tmp", about_to_close=self.about_to_close)
+            if self.about_to_close():
+                return
+            with self.book_lock:
+                if color in self.books:
+                    self.books.pop(color).close()
+                replace(file_path + ".tmp", file_path)
+            self.log_message("exported " + str(entries) + " entries")
+
+    def on_close(self):
+        """closes the polyglot books
+        """
+        super().on_close()
+        self.close_books()
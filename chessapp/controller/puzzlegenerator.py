@@ -0,0 +1,289 @@
+from chessapp.model.chesstree import ChessTree, find_line
+from chessapp.model.node import Node
+from chessapp.controller.engine import Engine, MoveDescriptor
+from chessapp.controller.scheduler import Scheduler
+from chessapp.controller.workunits import write_json_atomic
+from chessapp.util.paths import get_puzzles_folder
+from chessapp.configuration import STR_DEFAULT_ENCODING
+from chess import Board
+from hashlib import sha1
+from os import makedirs
+from os.path import join, exists
+from queue import Queue, Empty
+from threading import Thread, Lock
+import heapq
+import time
+import traceback
+
+# generated puzzles are written into this subfolder of the puzzles folder
+s_generated_puzzles_folder: str = join(get_puzzles_folder(), "generated")
+# the best move must be at least this many pawns better for the player than the second best move
+s_min_gap: float = 2.0
+# the player must not be lost after the best move (in pawns from the point of view of the player)
+s_min_best_value: float = -1.0
+# moves of the tree are only compared if they are evaluated at least this deep
+s_min_eval_depth: int = 15
+# maximum amount of candidates that are verified by the engine, the candidates with the largest gaps are kept
+s_max_candidates: int = 200
+# positions further from the start position than this many plies are not turned into puzzles
+s_max_line_plies: int = 60
+# maximum amount of moves of the player in a puzzle
+s_max_solution_moves: int = 3
+s_verify_time_seconds: int = 10
+s_verify_depth: int = 22
+
+
+def get_player_value(eval: float, white_to_move: bool) -> float:
+    """
+    Args:
+        eval (float): an evaluation from the point of view of white
+        white_to_move (bool): True if white is the player
+
+    Returns:
+        float: the evaluation from the point of view of the player
+    """
+    return eval if white_to_move else -eval
+
+
+def get_tree_gap(node: Node) -> float:
+    """ compares the evaluated moves of the node in the tree
+
+    Args:
+        node (Node): the position
+
+    Returns:
+        float: the amount of pawns the best move is better for the player than the second best move or None if the node has fewer than
+        two moves evaluated at least s_min_eval_depth deep or the player is lost after the best move (@see s_min_best_value)
+    """
+    white_to_move = node.is_white_turn()
+    values = sorted((get_player_value(move.eval(), white_to_move) for move in node.moves
+                     if move.eval_depth() >= s_min_eval_depth), reverse=True)
+    if len(values) < 2 or values[0] < s_min_best_value:
+        return None
+    return values[0] - values[1]
+
+
+def get_puzzle_file_name(fen: str) -> str:
+    """
+    Args:
+        fen (str): reduced fen of the position of the puzzle
+
+    Returns:
+        str: the name of the file the puzzle of the position is written to. generating a puzzle of the same position again overwrites it.
+    """
+    return sha1(fen.encode(STR_DEFAULT_ENCODING)).hexdigest() + ".json"
+
+
+class PuzzleGenerator:
+    """ mines puzzles from the evaluated positions of a ChessTree. the scan selects positions in which the best known move is clearly better
+    than the second best (@see get_tree_gap) and keeps the s_max_candidates positions with the largest gaps, so the memory does not grow with
+    the tree. each candidate is verified with a pool of engines: a single MultiPV search of the two best moves checks that the best move is
+    unique, and the solution is extended with the reply of the opponent as long as the next move of the player is unique as well. verified
+    puzzles are written in the format of the Puzzles module (@see chessapp.controller.puzzles.Puzzles), one file per puzzle with the game
+    line from the start position as pgn. like the BatchAnalyser this class does not depend on PyQt5.
+    """
+
+    def __init__(self, tree: ChessTree, engines: list[Engine], output_folder: str = s_generated_puzzles_folder,
+                 max_candidates: int = s_max_candidates, min_gap: float = s_min_gap, time_seconds: int = s_verify_time_seconds,
+                 depth: int = s_verify_depth, total_time_seconds: int = None, log=print, about_to_close=lambda: False,
+                 scheduler: Scheduler = None):
+        """ initialises the puzzle generator
+
+        Args:
+            tree (ChessTree): the tree to mine
+            engines (list[Engine]): the engine pool. each engine verifies one candidate at a time.
+            output_folder (str, optional): Defaults to s_generated_puzzles_folder. folder the puzzle files are written to
+            max_candidates (int, optional): Defaults to s_max_candidates. maximum amount of candidates verified by the engines
+            min_gap (float, optional): Defaults to s_min_gap. minimum amount of pawns the best move must be better than the second best
+            time_seconds (int, optional): Defaults to s_verify_time_seconds. seconds of each verification search
+            depth (int, optional): Defaults to s_verify_depth. depth of each verification search
+            total_time_seconds (int, optional): Defaults to None. no new candidate is verified after this many seconds. None means no limit.
+            log (callable, optional): Defaults to print. receives log messages as str
+            about_to_close (callable, optional): callable that returns True if the generation should be aborted
+            scheduler (Scheduler, optional): Defaults to None. if given, the progress is reported to the task that runs the generation
+        """
+        self.tree: ChessTree = tree
+        self.engines: list[Engine] = engines
+        self.output_folder: str = output_folder
+        self.max_candidates: int = max_candidates
+        self.min_gap: float = min_gap
+        self.time_seconds: int = time_seconds
+        self.depth: int = depth
+        self.total_time_seconds: int = total_time_seconds
+        self.log = log
+        self.about_to_close = about_to_close
+        self.scheduler: Scheduler = scheduler
+        self.lock = Lock()
+        self.start_time: float = 0
+        self.generated_puzzles: int = 0
+        self.done_candidates: int = 0
+        self.total_candidates: int = 0
+        self.task = None
+
+    def should_stop(self) -> bool:
+        """
+        Returns:
+            bool: True if no further candidate should be verified
+        """
+        return self.about_to_close() or (self.total_time_seconds != None and time.time() - self.start_time >= self.total_time_seconds)
+
+    def find_candidates(self) -> list[str]:
+        """ scans the tree for positions with a large gap between the best and the second best move. positions that already have a
+        generated puzzle file are skipped.
+
+        Returns:
+            list[str]: the fens of up to max_candidates positions, the largest gap first
+        """
+        heap = []
+        # iterate a snapshot, other threads may add nodes in the meantime (@see ChessTree.snapshot)
+        for fen, node in self.tree.snapshot().items():
+            if self.about_to_close():
+                break
+            gap = get_tree_gap(node)
+            if gap == None or gap < self.min_gap or exists(join(self.output_folder, get_puzzle_file_name(fen))):
+                continue
+            if len(heap) < self.max_candidates:
+                heapq.heappush(heap, (gap, fen))
+            elif gap > heap[0][0]:
+                heapq.heapreplace(heap, (gap, fen))
+        candidates = [fen for _, fen in sorted(heap, reverse=True)]
+        self.log(" ".join(("found", str(len(candidates)), "puzzle candidates")))
+        return candidates
+
+    def run(self) -> int:
+        """ finds the candidates and verifies them with the engine pool. blocks until all candidates are verified, the time is used up or
+        about_to_close returns True.
+
+        Returns:
+            int: amount of puzzles written
+        """
+        self.start_time = time.time()
+        self.generated_puzzles = 0
+        self.done_candidates = 0
+        self.task = self.scheduler.get_current_task() if self.scheduler else None
+        makedirs(self.output_folder, exist_ok=True)
+        candidates = self.find_candidates()
+        self.total_candidates = len(candidates)
+        self.report_progress()
+        queue = Queue()
+        for fen in candidates:
+            queue.put(fen)
+        if len(self.engines) == 1:
+            self.work(self.engines[0], queue)
+        else:
+            workers = [Thread(target=self.work, args=(engine, queue), daemon=True)
+                       for engine in self.engines]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+        self.log(" ".join(("generated", str(self.generated_puzzles), "puzzles from", str(self.done_candidates), "candidates in",
+                 str(round(time.time() - self.start_time)), "seconds")))
+        return self.generated_puzzles
+
+    def work(self, engine: Engine, queue: Queue):
+        """ verifies candidates from the queue with the given engine until the queue is empty or should_stop returns True
+
+        Args:
+            engine (Engine): the engine of this worker
+            queue (Queue): queue of fens
+        """
+        if self.task:
+            self.scheduler.set_current_task(self.task)
+        while not self.should_stop():
+            try:
+                fen = queue.get_nowait()
+            except Empty:
+                return
+            try:
+                if self.generate(engine, fen):
+                    with self.lock:
+                        self.generated_puzzles += 1
+            except Exception:
+                print("error while generating puzzle of position " + fen)
+                print(traceback.format_exc())
+            self.report_progress(1)
+
+    def report_progress(self, done_candidates: int = 0):
+        """ counts the done candidates and reports the progress to the task that runs the generation (if any)
+
+        Args:
+            done_candidates (int, optional): Defaults to 0. amount of candidates that were done since the last report
+        """
+        with self.lock:
+            self.done_candidates += done_candidates
+            if self.task:
+                self.scheduler.report_progress(
+                    self.done_candidates, self.total_candidates, self.task)
+
+    def find_unique_move(self, engine: Engine, board: Board) -> MoveDescriptor:
+        """ searches the two best moves of the board in one MultiPV search
+
+        Args:
+            engine (Engine): the engine to use
+            board (Board): the board
+
+        Returns:
+            MoveDescriptor: the best move if it is at least min_gap pawns better for the player than the second best move, None otherwise
+        """
+        best_moves = engine.find_best_moves(
+            board, self.time_seconds, self.depth, multipv=2)
+        if len(best_moves) < 2:
+            # a forced move is no puzzle
+            return None
+        white_to_move = board.turn
+        gap = get_player_value(best_moves[0].eval, white_to_move) - \
+            get_player_value(best_moves[1].eval, white_to_move)
+        if gap < self.min_gap or get_player_value(best_moves[0].eval, white_to_move) < s_min_best_value:
+            return None
+        return best_moves[0]
+
+    def generate(self, engine: Engine, fen: str) -> bool:
+        """ verifies the candidate and writes its puzzle
+
+        Args:
+            engine (Engine): the engine to use
+            fen (str): reduced fen of the candidate
+
+        Returns:
+            bool: True if a puzzle was written
+        """
+        line = find_line(self.tree, fen, s_max_line_plies)
+        if line == None or len(line) == 0:
+            self.log("skipping position " + fen +
+                     " because it is not reached from the start position")
+            return False
+        board = Board()
+        for san in line:
+            board.push_san(san)
+        pgn = Board().variation_san(board.move_stack)
+        puzzle_fen = board.fen()
+        moves = []
+        themes = ["generated"]
+        player_moves = 0
+        best_move = self.find_unique_move(engine, board)
+        while best_move != None:
+            if best_move.is_mate and not "mate" in themes:
+                themes.append("mate")
+            moves.append(board.san(best_move.pv[0]))
+            board.push(best_move.pv[0])
+            player_moves += 1
+            if player_moves >= s_max_solution_moves or board.is_game_over() or len(best_move.pv) < 2 or self.should_stop():
+                break
+            # the reply of the opponent is only part of the solution if the player has another unique move afterwards
+            reply_san = board.san(best_move.pv[1])
+            board.push(best_move.pv[1])
+            best_move = self.find_unique_move(engine, board)
+            if best_move != None:
+                moves.append(reply_san)
+        if len(moves) == 0:
+            self.log("rejected position " + fen +
+                     " because its best move is not unique")
+            return False
+        write_json_atomic(join(self.output_folder, get_puzzle_file_name(fen)), {
+            "pgn": pgn,
+            "puzzles": [{"fen": puzzle_fen, "moves": " ".join(moves), "themes": themes}]
+        })
+        self.log(" ".join(("generated puzzle of position", fen,
+                 "with solution", " ".join(moves))))
+        return True
@@ -0,0 +1,296 @@
+from chessapp.util.pgn import extract_lines
+from chessapp.controller.workunits import write_json_atomic, read_json
+from chessapp.util.fen import get_reduced_fen_from_board, reduce_fen
+from chessapp.util.paths import get_data_folder, get_puzzles_folder
+from chess import Board, WHITE, BLACK, PIECE_SYMBOLS, KING
+from os.path import isdir, isfile, join, exists, getmtime, getsize, relpath
+from os import listdir
+import traceback
+import hashlib
+import json
+
+s_puzzle_index_file_path: str = join(get_data_folder(), "puzzle_index.json")
+# increment when the format of the records changes, an index of another version is rebuilt
+s_puzzle_index_version: int = 4
+# the positions of this many plies of the game line of a puzzle are indexed as the opening the puzzle arises from
+s_opening_plies: int = 20
+
+
+def find_puzzle_line(pgn: str, fen: str, about_to_close=lambda: False) -> list[str]:
+    """ finds the moves of the game of the pgn that lead to the position of the puzzle
+
+    Args:
+        pgn (str): pgn of the game the puzzle is extracted from
+        fen (str): fen of the board at the start of the puzzle
+        about_to_close (callable, optional): callable that returns True if the extraction should be aborted
+
+    Raises:
+        Exception: if the pgn does not contain exactly one line
+        Exception: if the fen is never reached from the moves in the pgn
+
+    Returns:
+        list[str]: the moves in uci format from the start position to the position of the puzzle
+    """
+    fen = reduce_fen(fen)
+    lines = extract_lines(pgn, about_to_close)
+    if len(lines) != 1:
+        raise Exception(
+            "number of lines found in puzzle file is not 1: " + pgn)
+    board = Board()
+    for san in lines[0]:
+        if get_reduced_fen_from_board(board) == fen:
+            break
+        board.push_san(san)
+    if get_reduced_fen_from_board(board) != fen:
+        raise Exception("fen " + fen +
+                        " never reached from moves in pgn " + pgn)
+    return [move.uci() for move in board.move_stack]
+
+
+def get_uci_moves(fen: str, moves: list[str]) -> list[str]:
+    """
+    Args:
+        fen (str): fen of the board the moves are played on
+        moves (list[str]): moves in san format
+
+    Returns:
+        list[str]: the moves in uci format
+    """
+    board = Board(fen)
+    return [board.push_san(san).uci() for san in moves]
+
+
+def get_san_moves(fen: str, moves: list[str]) -> list[str]:
+    """
+    Args:
+        fen (str): fen of the board the moves are played on
+        moves (list[str]): moves in uci format
+
+    Returns:
+        list[str]: the moves in san format
+    """
+    board = Board(fen)
+    sans = []
+    for uci in moves:
+        move = board.parse_uci(uci)
+        sans.append(board.san(move))
+        board.push(move)
+    return sans
+
+
+def get_material_signature(board: Board) -> str:
+    """
+    Args:
+        board (Board): the board
+
+    Returns:
+        str: the pieces (without kings) of white and black, e.g. "QRRBPPPPPvQRNPPPPPP"
+    """
+    sides = []
+    for color in (WHITE, BLACK):
+        sides.append("".join(PIECE_SYMBOLS[piece_type].upper() * len(board.pieces(piece_type, color))
+                             for piece_type in range(KING - 1, 0, -1)))
+    return "v".join(sides)
+
+
+def get_position_key(fen: str) -> int:
+    """ a stable 64 bit hash of a position. the records of the index keep the keys of their opening positions instead of the fens
+    because there are s_opening_plies + 1 of them per puzzle.
+
+    Args:
+        fen (str): reduced fen of the position
+
+    Returns:
+        int: the key of the position
+    """
+    return int.from_bytes(hashlib.blake2b(fen.encode(), digest_size=8).digest(), "big")
+
+
+def get_puzzle_features(fen: str, moves: list[str], line: list[str]) -> dict:
+    """ computes the features of a puzzle that puzzles can be selected by (@see chessapp.controller.puzzleselection.PuzzleFilter)
+
+    Args:
+        fen (str): fen of the board at the start of the puzzle
+        moves (list[str]): expected moves in san format
+        line (list[str]): moves in uci format from the starting position to the start of the puzzle
+
+    Returns:
+        dict: the side to move, the amount of moves of the player, the material signature (@see get_material_signature) and the
+        keys (@see get_position_key) of the positions of the first s_opening_plies plies of the game line (@see s_opening_plies)
+    """
+    board = Board(fen)
+    openings = set([get_position_key(get_reduced_fen_from_board(Board()))])
+    line_board = Board()
+    for uci in line[:s_opening_plies]:
+        line_board.push_uci(uci)
+        openings.add(get_position_key(
+            get_reduced_fen_from_board(line_board)))
+    return {
+        "side_to_move": "white" if board.turn == WHITE else "black",
+        "solution_length": (len(moves) + 1) // 2,
+        "material": get_material_signature(board),
+        "openings": sorted(openings)
+    }
+
+
+def compile_puzzle_file(file_path: str, folder: str, about_to_close=lambda: False) -> list[dict]:
+    """ compiles the puzzles of a puzzle json file (a pgn and a list of puzzles with fen and moves, @see chessapp.controller.puzzles.Puzzles)
+    into records that can be materialized without reading the file or parsing the pgn (@see chessapp.controller.puzzles.Puzzle.from_record).
+    the moves of a record are stored compactly as a single string of uci moves. puzzles that cannot be compiled are skipped.
+
+    Args:
+        file_path (str): path of the puzzle file
+        folder (str): the puzzles folder, the records contain the path of the file relative to it
+        about_to_close (callable, optional): callable that returns True if the compilation should be aborted
+
+    Returns:
+        list[dict]: one record per puzzle with the start fen, the solution (uci moves separated by spaces), the line from the start
+        position to the puzzle (uci moves separated by spaces), the file, the index of the puzzle in the file, the features of the puzzle
+        (@see get_puzzle_features) and the optional themes of the puzzle (e.g. "fork")
+    """
+    try:
+        with open(file_path, mode="r") as f:
+            data = json.loads(f.read())
+    except:
+        print("error while loading puzzle " + file_path)
+        print(traceback.format_exc())
+        return []
+    records = []
+    for index, puzzle in enumerate(data["puzzles"]):
+        if about_to_close():
+            break
+        try:
+            moves = puzzle["moves"].split(" ")
+            line = find_puzzle_line(data["pgn"], puzzle["fen"], about_to_close)
+            record = {
+                "fen": reduce_fen(puzzle["fen"]),
+                "solution": " ".join(get_uci_moves(puzzle["fen"], moves)),
+                "line": " ".join(line),
+                "file": relpath(file_path, folder),
+                "index": index
+            }
+            record.update(get_puzzle_features(puzzle["fen"], moves, line))
+            record["themes"] = puzzle.get("themes", [])
+            records.append(record)
+        except:
+            print("error while loading puzzle " +
+                  file_path + " with fen " + puzzle["fen"])
+            print(traceback.format_exc())
+    return records
+
+
+def find_puzzle_files(folder: str) -> list[str]:
+    """
+    Args:
+        folder (str): the puzzles folder
+
+    Returns:
+        list[str]: paths of all json files in the folder and its subfolders
+    """
+    file_paths = []
+    for name in listdir(folder):
+        path: str = join(folder, name)
+        if isdir(path):
+            file_paths.extend(find_puzzle_files(path))
+        elif isfile(path) and path.endswith(".json"):
+            file_paths.append(path)
+    return file_paths
+
+
+class PuzzleIndex:
+    """ the compiled puzzles of the puzzles folder in a single file. a puzzle file is compiled once (@see compile_puzzle_file) and only
+    compiled again when its modification time or size changes, so loading the puzzles neither parses pgns nor replays games.
+    """
+
+    def __init__(self, folder: str = get_puzzles_folder(), index_file_path: str = s_puzzle_index_file_path):
+        """ creates an empty index. call update to load and refresh it.
+
+        Args:
+            folder (str, optional): Defaults to get_puzzles_folder(). the puzzles folder
+            index_file_path (str, optional): Defaults to s_puzzle_index_file_path. path of the compiled index
+        """
+        self.folder: str = folder
+        self.index_file_path: str = index_file_path
+        # relative path of each puzzle file -> {"mtime": float, "size": int, "puzzles": [record]}
+        self.files: dict[str, dict] = {}
+        self.records: list[dict] = []
+
+    def load(self):
+        """ loads the compiled index from disk. an index that does not exist, cannot be read or has another version is ignored.
+        """
+        self.files = {}
+        if exists(self.index_file_path):
+            try:
+                data = read_json(self.index_file_path)
+                if data.get("version") == s_puzzle_index_version:
+                    self.files = data["files"]
+            except:
+                print("error while loading puzzle index " +
+                      self.index_file_path)
+                print(traceback.format_exc())
+        self.update_records()
+
+    def update(self, about_to_close=lambda: False) -> int:
+        """ loads the index and compiles the puzzle files that are new or changed since they were compiled. files that do not exist
+        anymore are removed. the index is written to disk if anything changed.
+
+        Args:
+            about_to_close (callable, optional): callable that returns True if the update should be aborted
+
+        Returns:
+            int: amount of compiled files
+        """
+        self.load()
+        compiled = 0
+        current_files = set()
+        for file_path in find_puzzle_files(self.folder) if exists(self.folder) else []:
+            if about_to_close():
+                return compiled
+            key = relpath(file_path, self.folder)
+            current_files.add(key)
+            mtime = getmtime(file_path)
+            size = getsize(file_path)
+            entry = self.files.get(key)
+            if entry != None and entry["mtime"] == mtime and entry["size"] == size:
+                continue
+            records = compile_puzzle_file(
+                file_path, self.folder, about_to_close)
+            if about_to_close():
+                # the records of the file may be incomplete
+                return compiled
+            self.files[key] = {"mtime": mtime,
+                               "size": size, "puzzles": records}
+            compiled += 1
+        removed = [key for key in self.files if not key in current_files]
+        for key in removed:
+            del self.files[key]
+        if compiled > 0 or len(removed) > 0:
+            self.save()
+        self.update_records()
+        return compiled
+
+    def save(self):
+        """ writes the compiled index to disk
+        """
+        write_json_atomic(self.index_file_path, {
+                          "version": s_puzzle_index_version, "files": self.files})
+
+    def update_records(self):
+        """ collects the records of all files in a stable order
+        """
+        self.records = [record for key in sorted(self.files)
+                        for record in self.files[key]["puzzles"]]
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+
+def get_puzzle_key(record: dict) -> str:
+    """
+    Args:
+        record (dict): a record of the puzzle index
+
+    Returns:
+        str: a key of the puzzle that stays the same when other puzzle files change (file and index in the file)
+    """
+    return record["file"] + "#" + str(record["index"])
@@ -1,20 +1,23 @@
-from os.path import isdir, isfile, join
-from os import listdir
 from chessapp.view.module import ChessboardAndLogModule, create_method_action
 from chessapp.controller.explorer import Explorer
 from chessapp.model.chesstree import get_reduced_fen_from_board
 from chess import Board
 from chessapp.view.chessboardwidget import PieceMovement
-import json
-from chessapp.controller.updater import extract_lines
-from chessapp.util.fen import get_reduced_fen_from_board, reduce_fen
-from chessapp.util.paths import get_puzzles_folder
-from random import choice
-import traceback
+from chessapp.util.fen import get_reduced_fen_from_board
 import chessapp.model.move
 import chess
-from time import sleep
 from chessapp.sound.chessboardsound import ChessboardSound
+from chessapp.util.startupreport import get_startup_report
+from chessapp.controller.puzzleindex import PuzzleIndex, get_puzzle_key, get_san_moves
+from chessapp.controller.puzzleselection import PuzzleHistory, PuzzleFilter, PuzzleSelector
+from chessapp.controller.puzzlegenerator import PuzzleGenerator
+from chessapp.controller.engine import Engine
+from chessapp.controller.scheduler import get_scheduler, PRIORITY_BACKGROUND
+from chessapp.configuration import LAZY_RESOURCES
+from threading import Event, Lock
+
+# the opponent answers after this delay so that the player can follow the moves
+s_opponent_move_delay_milliseconds = 500
 
 
 class PuzzleNode:
@@ -42,26 +45,37 @@ class Puzzle:
     move of the current node). Use perform_next_move to perform the next move (without specificying the move).
     """
 
-    def __init__(self, pgn: str, fen: str, moves: [], about_to_close) -> None:
-        """ Initializes a puzzle. The pgn is the pgn of the game the puzzle is extracted from. The fen is the fen of the board at the start of the puzzle.
-        moves is a list of moves in san format. about_to_close is a function that returns True if the application is about to close (this is used for
-        the extraction of the lines from the pgn, @see extract_lines in updater.py)
+    def __init__(self, fen: str, moves: list[str], line: list[str]) -> None:
+        """ Initializes a puzzle, usually from a compiled record (@see from_record). The fen is the fen of the
+        board at the start of the puzzle, moves are the expected moves in san format and line are the moves of the game (in uci format) that
+        lead from the starting position to the fen.
 
         Args:
-            pgn (str): pgn of the game the puzzle is extracted from
             fen (str): fen of the board at the start of the puzzle
-            moves ([str]): expected moves in san format
-            about_to_close (() -> bool): function that returns True if the application is about to close 
+            moves (list[str]): expected moves in san format
+            line (list[str]): moves in uci format from the starting position to the start of the puzzle
         """
-        self.about_to_close = about_to_close
-        self.pgn: str = pgn
-        self.fen: str = reduce_fen(fen)
+        self.fen: str = fen
         self.puzzle_nodes = []
         self.board = Board()
-        self.moves = moves.split(" ")
+        self.moves: list[str] = moves
+        self.line: list[str] = line
         self.current_node: PuzzleNode = None
         self.reset()
 
+    @staticmethod
+    def from_record(record: dict):
+        """ materializes the puzzle of a record of the puzzle index (@see chessapp.controller.puzzleindex.compile_puzzle_file)
+
+        Args:
+            record (dict): the record
+
+        Returns:
+            Puzzle: the puzzle
+        """
+        return Puzzle(record["fen"], get_san_moves(record["fen"], record["solution"].split(" ")),
+                      record["line"].split(" ") if record["line"] else [])
+
     def is_done(self) -> bool:
         """ checks if the puzzle is done
 
@@ -104,21 +118,14 @@ class Puzzle:
         on the ChessBoardWidget, @see display in ChessBoardWidget.
 
         Raises:
-            Exception: if the pgn of the puzzle does not contain exactly one line
-            Exception: if the fen of the puzzle is never reached from the moves in the pgn
+            Exception: if the line of the puzzle does not lead to the fen of the puzzle
         """
-        lines = extract_lines(self.pgn, self.about_to_close)
-        if len(lines) != 1:
-            raise Exception(
-                "number of lines found in puzzle file is not 1: " + self.pgn)
         self.board = Board()
-        for san in lines[0]:
-            if get_reduced_fen_from_board(self.board) == self.fen:
-                break
-            self.board.push_san(san)
+        for uci in self.line:
+            self.board.push_uci(uci)
         if get_reduced_fen_from_board(self.board) != self.fen:
             raise Exception("fen " + self.fen +
-                            " never reached from moves in pgn " + self.pgn)
+                            " is not reached by the line of the puzzle")
         first_move = self.board.pop()
         first_move_san = self.board.san(first_move)
         base_node = PuzzleNode(get_reduced_fen_from_board(self.board), first_move_san)
@@ -142,10 +149,12 @@ class Puzzles(ChessboardAndLogModule):
     in the puzzles folder. The json file must contain a list of puzzles and a pgn. Each puzzle must contain a fen and a list of moves. 
     The fen is the state of the board at the start of the puzzle. The moves are the moves that must be played to solve the puzzle (the player always has the
     first move and the oppenents move are automatically played by the application). The pgn is the pgn of the game the puzzle is extracted from.
+    The puzzle files are compiled into a puzzle index once and compiled again only when they change (@see chessapp.controller.puzzleindex).
     """
 
     def __init__(self, app, explorer: Explorer, tree):
-        """ initializes the puzzles module with the given explorer and tree. it has the following actions: explore, retry, and start
+        """ initializes the puzzles module with the given explorer and tree. it has the following actions: explore, retry, start,
+        start from explorer position, start unsolved and generate from tree
 
         Args:
             app (chessapp.chessapp.Chessapp): the main application
@@ -155,62 +164,97 @@ class Puzzles(ChessboardAndLogModule):
         super().__init__(app, "Puzzles", [
             create_method_action(app, "Explore", self.explore),
             create_method_action(app, "Retry", self.retry),
-            create_method_action(app, "Start", self.start)
+            create_method_action(app, "Start", self.start),
+            create_method_action(app, "Start From Explorer Position",
+                                 self.start_from_explorer_position),
+            create_method_action(app, "Start Unsolved", self.start_unsolved),
+            create_method_action(app, "Generate From Tree",
+                                 self.generate_from_tree, PRIORITY_BACKGROUND)
         ])
         self.is_started = False
         self.explorer = explorer
-        self.puzzles = []
+        self.puzzle_index = PuzzleIndex()
+        self.puzzle_history = PuzzleHistory()
+        self.puzzle_selector = PuzzleSelector(
+            self.puzzle_index, self.puzzle_history)
         self.current_puzzle: Puzzle = None
+        # key of the current puzzle (@see chessapp.controller.puzzleindex.get_puzzle_key) and whether it was failed in this attempt
+        self.current_key: str = None
+        self.current_failed: bool = False
         self.tree = tree
+        # set once the puzzles are loaded (@see load_all_puzzles)
+        self.puzzles_loaded = Event()
+        self.load_requested: bool = False
+        self.load_lock = Lock()
+        # only used to verify generated puzzles, the process is started with the first generation
+        self.engine = Engine(lazy=True)
 
     def on_register(self):
         """ @see ChessboardAndLogModule.on_register
-        this method calls load_puzzles in a threadpool
+        unless LAZY_RESOURCES is set, this method calls load_all_puzzles in a threadpool
         """
         super().on_register()
-        self.dispatch_threadpool(self.load_puzzles)
+        if not LAZY_RESOURCES:
+            get_startup_report().begin("puzzles")
+            self.request_load()
 
-    def load_puzzle(self, file_path: str):
-        """loads a puzzle from the given file path
+    def on_focus(self):
+        """ @see ChessboardAndLogModule.on_focus
+        loads the puzzles when the module is focused the first time (@see request_load)
+        """
+        super().on_focus()
+        self.request_load()
 
-        Args:
-            file_path (str): path to the puzzle file
+    def request_load(self):
+        """ dispatches load_all_puzzles unless the puzzles are loading or loaded already
+        """
+        with self.load_lock:
+            if self.load_requested:
+                return
+            self.load_requested = True
+        self.dispatch_threadpool(self.load_all_puzzles)
+
+    def load_all_puzzles(self):
+        """ loads the compiled puzzle index and compiles the puzzle files of the puzzles folder that are new or changed (this is the
+        startup step "puzzles", @see chessapp.controller.puzzleindex.PuzzleIndex.update), loads the solve history, indexes the puzzles
+        by their features (@see chessapp.controller.puzzleselection.PuzzleSelector) and sets puzzles_loaded afterwards. the puzzles
+        themselves are only materialized when they are selected (@see start).
         """
         try:
-            with open(file_path, mode="r") as f:
-                data = json.loads(f.read())
-        except:
-            print("error while loading puzzle " + file_path)
-            print(traceback.format_exc())
+            compiled = self.puzzle_index.update(self.about_to_close)
+            self.puzzle_history.load()
+            self.puzzle_selector.rebuild()
+            self.log_message("loaded " + str(len(self.puzzle_index)) +
+                             " puzzles (" + str(compiled) + " files compiled)")
+            self.puzzles_loaded.set()
+        finally:
+            get_startup_report().end("puzzles")
+
+    def generate_from_tree(self):
+        """ mines puzzles from the evaluated positions of the tree, verifies them with the engine and loads them afterwards
+        (@see chessapp.controller.puzzlegenerator.PuzzleGenerator)
+        """
+        self.request_load()
+        if not self.wait_until_ready(self.tree.loaded, "the tree") or not self.wait_until_ready(self.puzzles_loaded, "the puzzles"):
             return
-        for puzzle in data["puzzles"]:
-            try:
-                loaded_puzzle = Puzzle(
-                    data["pgn"], puzzle["fen"], puzzle["moves"], self.about_to_close)
-            except:
-                print("error while loading puzzle " +
-                      file_path + " with fen " + puzzle["fen"])
-                print(traceback.format_exc())
-                continue
-            self.puzzles.append(loaded_puzzle)
-
-    def load_puzzles(self, folder=get_puzzles_folder()):
-        """loads all puzzles from the given folder (and its subfolders). the default folder is the puzzles folder, @see chessapp.util.paths.get_puzzles_folder()
+        self.log_message("generating puzzles...")
+        PuzzleGenerator(self.tree, [self.engine], log=self.log_message,
+                        about_to_close=self.about_to_close, scheduler=get_scheduler()).run()
+        self.load_all_puzzles()
 
-        Args:
-            folder (Path|str, optional): Defaults to get_puzzles_folder(). path to the folder containing the puzzles
+    def on_close(self):
+        """closes the engine
         """
-        for name in listdir(folder):
-            path: str = join(folder, name)
-            if isdir(path):
-                self.load_puzzles(path)
-            elif isfile(path) and path.endswith(".json"):
-                self.load_puzzle(path)
+        super().on_close()
+        self.engine.close()
 
     def finish_puzzle(self):
-        """called when a puzzle is done. prepares the puzzles module for a new puzzle
+        """called when a puzzle is done. records the puzzle as solved unless a wrong move was played and prepares the puzzles module
+        for a new puzzle
         """
         self.log_message("puzzle done")
+        if not self.current_failed:
+            self.record_attempt(solved=True)
         self.is_started = False
         ChessboardSound.GAME_END.play()
 
@@ -225,7 +269,6 @@ class Puzzles(ChessboardAndLogModule):
         if not self.is_started:
             return
         if not self.current_puzzle.is_done():
-            sleep(0.5)
             san: str = self.current_puzzle.perform_next_move()
             self.log_message("opponent played: " + san)
             self.display(play_sound=True,
@@ -250,10 +293,24 @@ class Puzzles(ChessboardAndLogModule):
         if self.current_puzzle.apply_move(san):
             self.log_message("correct move: " + san)
             self.display(play_sound=True, last_move_is_opponent_move=False)
-            self.dispatch_threadpool(self.apply_next_move)
+            self.dispatch_threadpool_delayed(
+                self.apply_next_move, s_opponent_move_delay_milliseconds)
         else:
             self.log_message("wrong move: " + san)
             ChessboardSound.RESULT_BAD.play()
+            if not self.current_failed:
+                self.current_failed = True
+                self.record_attempt(solved=False)
+
+    def record_attempt(self, solved: bool):
+        """ records an attempt of the current puzzle in the solve history and saves the history in a threadpool
+
+        Args:
+            solved (bool): True if the puzzle was solved, False if it was failed
+        """
+        if self.current_key:
+            self.puzzle_history.record(self.current_key, solved)
+            self.dispatch_threadpool(self.puzzle_history.save)
 
     def retry(self):
         """retries the current puzzle if there is one
@@ -263,19 +320,44 @@ class Puzzles(ChessboardAndLogModule):
         else:
             self.log_message("no puzzle to retry")
 
-    def start(self, keep_puzzle: bool = False):
+    def start_from_explorer_position(self):
+        """ starts a new puzzle that arises from the position of the explorer (@see chessapp.controller.puzzleselection.PuzzleFilter)
+        """
+        self.start(puzzle_filter=PuzzleFilter(
+            position_fen=get_reduced_fen_from_board(self.explorer.board)))
+
+    def start_unsolved(self):
+        """ starts a new puzzle that was never solved
+        """
+        self.start(puzzle_filter=PuzzleFilter(unsolved_only=True))
+
+    def start(self, keep_puzzle: bool = False, puzzle_filter: PuzzleFilter = None):
         """ starts a new puzzle. if keep_puzzle is True and the current puzzle is not None, the current puzzle is kept.
-        otherwise a new puzzle is chosen from the puzzles list. the board is set to the fen of the puzzle. the display is updated. a sound is played.
-        After calling this method the user can interact with the puzzle (and solve it).
+        otherwise a new puzzle that matches the filter is drawn (@see chessapp.controller.puzzleselection.PuzzleSelector.sample). the board is
+        set to the fen of the puzzle. the display is updated. a sound is played. After calling this method the user can interact with the puzzle
+        (and solve it).
 
         Args:
-            keep_puzzle (bool, optional): Defaults to False. if True, the current puzzle is kept (if possible). if False, a new puzzle is chosen from the puzzles list.
+            keep_puzzle (bool, optional): Defaults to False. if True, the current puzzle is kept (if possible). if False, a new puzzle is drawn.
+            puzzle_filter (PuzzleFilter, optional): Defaults to None. the features of the new puzzle. if None, any puzzle may be drawn.
         """
         if self.is_started:
             return
+        self.request_load()
+        if not self.wait_until_ready(self.puzzles_loaded, "the puzzles"):
+            return
         self.focus()
         if not self.current_puzzle or not keep_puzzle:
-            self.current_puzzle = choice(self.puzzles)
+            if len(self.puzzle_index) == 0:
+                self.log_message("no puzzles found")
+                return
+            record = self.puzzle_selector.sample(puzzle_filter)
+            if record == None:
+                self.log_message("no puzzles match the selection")
+                return
+            self.current_puzzle = Puzzle.from_record(record)
+            self.current_key = get_puzzle_key(record)
+        self.current_failed = False
         self.current_puzzle.reset()
         if 'w' in self.current_puzzle.current_node.fen:
             self.chess_board_widget.view_white()
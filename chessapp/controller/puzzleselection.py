@@ -0,0 +1,395 @@
+from chessapp.controller.puzzleindex import PuzzleIndex, get_puzzle_key, get_position_key
+from chessapp.controller.workunits import write_json_atomic, read_json
+from chessapp.util.paths import get_data_folder
+from os.path import join, exists
+from random import Random
+from threading import Lock
+from collections import OrderedDict
+import traceback
+import time
+
+s_puzzle_history_file_path: str = join(get_data_folder(), "puzzle_history.json")
+# puzzles that were never attempted are drawn with this weight
+s_unseen_weight: float = 4.0
+# puzzles that were attempted are drawn with this weight times (1 + failed) / (1 + solved)
+s_attempted_weight: float = 2.0
+# samplers of this many filters are cached, the least recently used one is dropped first (@see PuzzleSelector.get_sampler)
+s_max_cached_samplers: int = 8
+
+
+class PuzzleHistory:
+    """ the solve history of the puzzles. each puzzle (@see chessapp.controller.puzzleindex.get_puzzle_key) has the amount of attempts,
+    of solved and of failed attempts and the time of the last attempt.
+    """
+
+    def __init__(self, file_path: str = s_puzzle_history_file_path):
+        """ creates an empty history. call load to read it from disk.
+
+        Args:
+            file_path (str, optional): Defaults to s_puzzle_history_file_path. path of the history file
+        """
+        self.file_path: str = file_path
+        # key of the puzzle -> {"attempts": int, "solved": int, "failed": int, "last": float}
+        self.entries: dict[str, dict] = {}
+        self.listeners = []
+        self.lock = Lock()
+
+    def add_listener(self, listener):
+        """
+        Args:
+            listener (callable): called with the key of a puzzle after an attempt of the puzzle is recorded
+        """
+        self.listeners.append(listener)
+
+    def load(self):
+        """ loads the history from disk. a history that does not exist or cannot be read is ignored.
+        """
+        entries = {}
+        if exists(self.file_path):
+            try:
+                entries = read_json(self.file_path)
+            except:
+                print("error while loading puzzle history " + self.file_path)
+                print(traceback.format_exc())
+        with self.lock:
+            self.entries = entries
+
+    def save(self):
+        """ writes the history to disk
+        """
+        with self.lock:
+            entries = dict(self.entries)
+        write_json_atomic(self.file_path, entries)
+
+    def get(self, key: str) -> dict:
+        """
+        Args:
+            key (str): key of the puzzle
+
+        Returns:
+            dict: the history of the puzzle or None if it was never attempted
+        """
+        return self.entries.get(key)
+
+    def is_solved(self, key: str) -> bool:
+        """
+        Args:
+            key (str): key of the puzzle
+
+        Returns:
+            bool: True if the puzzle was solved at least once
+        """
+        entry = self.entries.get(key)
+        return entry != None and entry["solved"] > 0
+
+    def get_weight(self, key: str) -> float:
+        """
+        Args:
+            key (str): key of the puzzle
+
+        Returns:
+            float: the weight the puzzle is drawn with. puzzles that were never attempted or failed often are drawn more often than
+            puzzles that were solved often (@see s_unseen_weight and s_attempted_weight).
+        """
+        entry = self.entries.get(key)
+        if entry == None:
+            return s_unseen_weight
+        return s_attempted_weight * (1 + entry["failed"]) / (1 + entry["solved"])
+
+    def record(self, key: str, solved: bool):
+        """ records an attempt of a puzzle and notifies the listeners. the history is not saved (@see save).
+
+        Args:
+            key (str): key of the puzzle
+            solved (bool): True if the puzzle was solved, False if it was failed
+        """
+        with self.lock:
+            entry = dict(self.entries.get(
+                key, {"attempts": 0, "solved": 0, "failed": 0}))
+            entry["attempts"] += 1
+            entry["solved" if solved else "failed"] += 1
+            entry["last"] = time.time()
+            self.entries[key] = entry
+        for listener in self.listeners:
+            listener(key)
+
+
+class PuzzleFilter:
+    """ the features a puzzle must have to be selected (@see chessapp.controller.puzzleindex.get_puzzle_features). features that are
+    None are not filtered.
+    """
+
+    def __init__(self, position_fen: str = None, theme: str = None, side_to_move: str = None, min_length: int = None,
+                 max_length: int = None, material: str = None, unsolved_only: bool = False):
+        """
+        Args:
+            position_fen (str, optional): Defaults to None. reduced fen of a position of the tree. only puzzles whose game passed the
+            position within the first plies (@see chessapp.controller.puzzleindex.s_opening_plies) are selected, i.e. puzzles that
+            arise from this opening.
+            theme (str, optional): Defaults to None. a theme the puzzle must have
+            side_to_move (str, optional): Defaults to None. "white" or "black"
+            min_length (int, optional): Defaults to None. minimum amount of moves of the player
+            max_length (int, optional): Defaults to None. maximum amount of moves of the player
+            material (str, optional): Defaults to None. the material signature of the puzzle (@see
+            chessapp.controller.puzzleindex.get_material_signature)
+            unsolved_only (bool, optional): Defaults to False. if True, puzzles that were solved are not selected
+        """
+        self.position_fen: str = position_fen
+        # the records keep the keys of their opening positions (@see chessapp.controller.puzzleindex.get_position_key)
+        self.position_key: int = get_position_key(
+            position_fen) if position_fen != None else None
+        self.theme: str = theme
+        self.side_to_move: str = side_to_move
+        self.min_length: int = min_length
+        self.max_length: int = max_length
+        self.material: str = material
+        self.unsolved_only: bool = unsolved_only
+
+    def key(self) -> tuple:
+        """
+        Returns:
+            tuple: the features of the filter. filters with the same key select the same puzzles.
+        """
+        return (self.position_fen, self.theme, self.side_to_move, self.min_length, self.max_length, self.material, self.unsolved_only)
+
+    def matches(self, record: dict) -> bool:
+        """
+        Args:
+            record (dict): a record of the puzzle index
+
+        Returns:
+            bool: True if the record has the features of the filter (the history is not checked, @see unsolved_only)
+        """
+        if self.position_key != None and not self.position_key in record["openings"]:
+            return False
+        if self.theme != None and not self.theme in record["themes"]:
+            return False
+        if self.side_to_move != None and record["side_to_move"] != self.side_to_move:
+            return False
+        if self.min_length != None and record["solution_length"] < self.min_length:
+            return False
+        if self.max_length != None and record["solution_length"] > self.max_length:
+            return False
+        if self.material != None and record["material"] != self.material:
+            return False
+        return True
+
+
+class WeightTree:
+    """ a binary indexed tree (fenwick tree) of weights. changing a weight and drawing an index with a probability proportional to its
+    weight take O(log n).
+    """
+
+    def __init__(self, weights: list[float]):
+        """
+        Args:
+            weights (list[float]): the initial weights
+        """
+        self.size: int = len(weights)
+        self.weights: list[float] = list(weights)
+        self.sums: list[float] = [0.0] * (self.size + 1)
+        for i, weight in enumerate(weights, 1):
+            self.sums[i] += weight
+            parent = i + (i & -i)
+            if parent <= self.size:
+                self.sums[parent] += self.sums[i]
+        self.top_bit: int = 1 << (self.size.bit_length() - 1) if self.size > 0 else 0
+
+    def total(self) -> float:
+        """
+        Returns:
+            float: the sum of all weights
+        """
+        total = 0.0
+        i = self.size
+        while i > 0:
+            total += self.sums[i]
+            i -= i & -i
+        return total
+
+    def set(self, index: int, weight: float):
+        """
+        Args:
+            index (int): index of the weight
+            weight (float): the new weight
+        """
+        delta = weight - self.weights[index]
+        self.weights[index] = weight
+        i = index + 1
+        while i <= self.size:
+            self.sums[i] += delta
+            i += i & -i
+
+    def find(self, value: float) -> int:
+        """
+        Args:
+            value (float): a value in [0, total())
+
+        Returns:
+            int: the index whose weight contains the value when the weights are laid out one after another
+        """
+        position = 0
+        step = self.top_bit
+        while step > 0:
+            next_position = position + step
+            if next_position <= self.size and self.sums[next_position] <= value:
+                position = next_position
+                value -= self.sums[next_position]
+            step >>= 1
+        # rounding may step past the last positive weight
+        while position > 0 and (position >= self.size or self.weights[position] <= 0):
+            position -= 1
+        return position
+
+
+class PuzzleSelector:
+    """ selects puzzles of a puzzle index (@see chessapp.controller.puzzleindex.PuzzleIndex) by their features (@see PuzzleFilter) and
+    draws them weighted by their solve history (@see PuzzleHistory.get_weight). the records are indexed by each feature once, so finding
+    the candidates of a filter starts with the smallest matching bucket instead of scanning all records. the candidates of a filter are
+    cached with their weights in a WeightTree, so a draw takes O(log n) and a recorded attempt updates the weight of the puzzle in each
+    cached filter in O(log n). only the s_max_cached_samplers most recently used filters are cached.
+    """
+
+    def __init__(self, index: PuzzleIndex, history: PuzzleHistory, random: Random = None):
+        """ creates a selector and registers it as listener of the history. call rebuild after the index is updated.
+
+        Args:
+            index (PuzzleIndex): the puzzle index
+            history (PuzzleHistory): the solve history
+            random (Random, optional): Defaults to None. the random number generator, e.g. Random(seed) for reproducible draws
+        """
+        self.index: PuzzleIndex = index
+        self.history: PuzzleHistory = history
+        self.random: Random = random if random else Random()
+        self.records: list[dict] = []
+        self.ids: dict[str, int] = {}
+        self.buckets: dict[tuple, list[int]] = {}
+        # key of a filter -> (candidates, weights, position of each candidate in candidates)
+        self.samplers: OrderedDict[tuple, tuple] = OrderedDict()
+        self.lock = Lock()
+        history.add_listener(self.on_history_changed)
+
+    def rebuild(self):
+        """ indexes the records of the puzzle index by opening positions, themes, side to move, solution length and material
+        """
+        records = list(self.index.records)
+        buckets: dict[tuple, list[int]] = {}
+        for i, record in enumerate(records):
+            for position_key in record["openings"]:
+                buckets.setdefault(("position_key", position_key), []).append(i)
+            for theme in set(record["themes"]):
+                buckets.setdefault(("theme", theme), []).append(i)
+            buckets.setdefault(
+                ("side_to_move", record["side_to_move"]), []).append(i)
+            buckets.setdefault(
+                ("solution_length", record["solution_length"]), []).append(i)
+            buckets.setdefault(
+                ("material", record["material"]), []).append(i)
+        with self.lock:
+            self.records = records
+            self.ids = {get_puzzle_key(record): i for i,
+                        record in enumerate(records)}
+            self.buckets = buckets
+            self.samplers = OrderedDict()
+
+    def find_candidates(self, puzzle_filter: PuzzleFilter) -> list[int]:
+        """
+        Args:
+            puzzle_filter (PuzzleFilter): the filter
+
+        Returns:
+            list[int]: the ids of the records that match the features of the filter
+        """
+        options = []
+        for feature in ("position_key", "theme", "side_to_move", "material"):
+            value = getattr(puzzle_filter, feature)
+            if value != None:
+                options.append(self.buckets.get((feature, value), []))
+        if len(options) == 0:
+            candidates = range(len(self.records))
+        else:
+            candidates = min(options, key=len)
+        return [i for i in candidates if puzzle_filter.matches(self.records[i])]
+
+    def get_weight(self, record: dict, puzzle_filter: PuzzleFilter) -> float:
+        """
+        Args:
+            record (dict): a record of the puzzle index
+            puzzle_filter (PuzzleFilter): the filter
+
+        Returns:
+            float: the weight of the record in the filter (0 if it is excluded by the solve history)
+        """
+        key = get_puzzle_key(record)
+        if puzzle_filter.unsolved_only and self.history.is_solved(key):
+            return 0.0
+        return self.history.get_weight(key)
+
+    def get_sampler(self, puzzle_filter: PuzzleFilter) -> tuple:
+        """ internal method that returns the cached sampler of the filter or creates it. creating a sampler drops the least recently
+        used one if s_max_cached_samplers are cached. must be called with the lock held.
+
+        Args:
+            puzzle_filter (PuzzleFilter): the filter
+
+        Returns:
+            tuple: the candidates, their WeightTree, the position of each candidate and the filter
+        """
+        sampler = self.samplers.get(puzzle_filter.key())
+        if sampler != None:
+            self.samplers.move_to_end(puzzle_filter.key())
+        else:
+            candidates = self.find_candidates(puzzle_filter)
+            weights = WeightTree([self.get_weight(
+                self.records[i], puzzle_filter) for i in candidates])
+            sampler = (candidates, weights, {i: position for position,
+                       i in enumerate(candidates)}, puzzle_filter)
+            self.samplers[puzzle_filter.key()] = sampler
+            if len(self.samplers) > s_max_cached_samplers:
+                self.samplers.popitem(last=False)
+        return sampler
+
+    def count(self, puzzle_filter: PuzzleFilter) -> int:
+        """
+        Args:
+            puzzle_filter (PuzzleFilter): the filter
+
+        Returns:
+            int: the amount of puzzles that can be drawn with the filter
+        """
+        with self.lock:
+            _, weights, _, _ = self.get_sampler(puzzle_filter)
+            return sum(1 for weight in weights.weights if weight > 0)
+
+    def sample(self, puzzle_filter: PuzzleFilter = None) -> dict:
+        """ draws a puzzle that matches the filter with a probability proportional to its weight
+
+        Args:
+            puzzle_filter (PuzzleFilter, optional): Defaults to None. the filter. if None, all puzzles can be drawn.
+
+        Returns:
+            dict: the record of the puzzle or None if no puzzle matches the filter
+        """
+        puzzle_filter = puzzle_filter if puzzle_filter else PuzzleFilter()
+        with self.lock:
+            candidates, weights, _, _ = self.get_sampler(puzzle_filter)
+            total = weights.total()
+            if total <= 0:
+                return None
+            return self.records[candidates[weights.find(self.random.random() * total)]]
+
+    def on_history_changed(self, key: str):
+        """ updates the weight of the puzzle in all cached filters
+
+        Args:
+            key (str): key of the puzzle whose history changed
+        """
+        with self.lock:
+            i = self.ids.get(key)
+            if i == None:
+                return
+            for _, weights, positions, puzzle_filter in self.samplers.values():
+                position = positions.get(i)
+                if position != None:
+                    weights.set(position, self.get_weight(
+                        self.records[i], puzzle_filter))
@@ -1,9 +1,7 @@
-import random
-from PyQt5.QtCore import QRunnable
+from random import Random
 from chess import Board
-from chessapp.model.chesstree import ChessTree
+from chessapp.model.chesstree import ChessTree, find_line, follow_line
 from chessapp.view.chessboardwidget import PieceMovement
-import time
 import chess
 from chessapp.model.move import Move
 from chessapp.model.sourcetype import SourceType
@@ -11,24 +9,40 @@ from chessapp.view.module import ChessboardAndLogModule, create_method_action
 from chessapp.controller.openingtree import OpeningTree
 from chessapp.controller.explorer import Explorer
 from chessapp.model.node import Node
+from chessapp.model.acceptablemoves import AcceptableMoveIndex
+from chessapp.model.movesampler import MoveSampler
+from chessapp.model.repertoire import analyse_repertoire
 from chessapp.sound.chessboardsound import ChessboardSound
 from chessapp.util.pgn import moves_to_pgn
 from chessapp.util.fen import get_reduced_fen_from_board
+from chessapp.controller.scheduler import PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+from chessapp.controller.repetition import RepetitionStore, RESULT_CORRECT, RESULT_INCORRECT, RESULT_EXPLORED
+from threading import Lock
+import time
 
 s_starting_position = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq -"
+# the opponent answers after this delay so that the player can follow the moves
+s_opponent_move_delay_milliseconds = 700
+# seed of the random choices of the quiz (colors and opponent moves). None seeds from the system, an int makes quizzes reproducible.
+s_random_seed: int = None
+# a due position is only started from if it is reached from the start position within this many plies of the tree
+s_max_due_line_plies: int = 60
+# a due position that cannot be reached is due again after this many seconds
+s_unreachable_postpone_seconds: float = 24 * 60 * 60
 
 
 class Quiz(ChessboardAndLogModule):
     """ this module is an interactive quiz in which the player has to find acceptable moves (given by the position evaluations) for given positions.
-    usually the opening tree of the opening tree module (@see chessapp.controller.OpeningTree) is used to find opponent moves played with a
+    usually the polyglot book or the opening tree of the opening tree module (@see chessapp.controller.OpeningTree) is used to find opponent moves played with a
     probability that is in proportion to the statistical occurence of that move given the specific players the opening tree is based on. if no move
     is known for the given position in the opening tree then a random move is chosen from the tree that is given during module initialization.
     the quiz ends when a no more moves are known for a certain positon.
     """
 
     def __init__(self, app, tree: ChessTree, opening_tree: OpeningTree, explorer: Explorer):
-        """initializes the quiz module. the actions are start, reset and explore. explore opens the explorer module (@see chessapp.controller.Explorer)
-        and sets the board to the current position. start starts the quiz. reset resets the board to the starting position.
+        """initializes the quiz module. the actions are start, start due, reset, explore and repertoire statistics. explore opens the explorer module (@see chessapp.controller.Explorer)
+        and sets the board to the current position. start starts the quiz. start due starts the quiz in a position that is due for repetition
+        (@see start_due). reset resets the board to the starting position.
 
         Args:
             app (ChessApp): the main application
@@ -36,8 +50,9 @@ class Quiz(ChessboardAndLogModule):
             opening_tree (OpeningTree): the opening tree to use for the quiz
             explorer (Explorer): the explorer module
         """
-        super().__init__(app, "Quiz", [create_method_action(app, "Start", self.start), create_method_action(
-            app, "Reset", self.reset), create_method_action(app, "Explore", self.explore)])
+        super().__init__(app, "Quiz", [create_method_action(app, "Start", self.start), create_method_action(app, "Start Due", self.start_due),
+                                       create_method_action(app, "Reset", self.reset), create_method_action(app, "Explore", self.explore),
+                                       create_method_action(app, "Repertoire Statistics", self.show_repertoire_statistics, PRIORITY_BACKGROUND)])
         self.tree: ChessTree = tree
         self.explorer = explorer
         self.player_turn: bool = False
@@ -46,7 +61,19 @@ class Quiz(ChessboardAndLogModule):
         self.board: Board = None
         self.moves_played = []
         self.opening_tree = opening_tree
-        random.seed()
+        # the acceptable moves of the positions of the quiz, updated when evaluations or moves of the tree change
+        self.acceptable_moves = AcceptableMoveIndex(tree)
+        self.acceptable_moves_requested: bool = False
+        # the opponent moves are drawn from cached alias tables of the trees (@see chessapp.model.movesampler.MoveSampler)
+        self.move_samplers: dict[ChessTree, MoveSampler] = {tree: MoveSampler(tree) for tree in (
+            tree, opening_tree.white_opening_tree, opening_tree.black_opening_tree)}
+        self.random = Random(s_random_seed)
+        # the results of the player per position for spaced repetition, loaded with the first quiz (@see load_repetition)
+        self.repetition = RepetitionStore()
+        self.repetition_loaded: bool = False
+        self.repetition_lock = Lock()
+        # if True, the opponent prefers moves that lead to due positions (@see choose_due_move)
+        self.steer_to_due: bool = False
 
     def apply_movement(self, piece_movement: PieceMovement):
         """ this method is called when the user makes a move on the chessboard. it checks if the move is acceptable and if so applies it to the board. 
@@ -69,6 +96,7 @@ class Quiz(ChessboardAndLogModule):
         san = self.board.san(chess.Move.from_uci(piece_movement.uci_format()))
         move = node.get_move_by_san(san)
         if not move:
+            self.repetition.record(fen, RESULT_EXPLORED, line=self.get_line())
             self.log_message("unable to find move " + san +
                              ". adding it to the opening chess tree.")
             ChessboardSound.RESULT_BAD.play()
@@ -79,12 +107,14 @@ class Quiz(ChessboardAndLogModule):
                 copy_board), source=SourceType.QUIZ_EXPLORATION))
             return
         cp_loss = node.get_cp_loss(move)
-        if not node.is_acceptable_move(move):
+        if not self.acceptable_moves.is_acceptable_move(node, move):
+            self.repetition.record(fen, RESULT_INCORRECT, line=self.get_line())
             self.log_message(
                 "this move is not acceptable. CP loss = " + str(cp_loss))
             ChessboardSound.RESULT_BAD.play()
             return
         else:
+            self.repetition.record(fen, RESULT_CORRECT, line=self.get_line())
             self.log_message(
                 "good move. CP loss = " + str(cp_loss))
         self.board.push_san(san)
@@ -93,7 +123,13 @@ class Quiz(ChessboardAndLogModule):
         self.chess_board_widget.display(
             self.board, last_move=move, previous_node=previous_node, node=node, play_sound=True)
         self.player_turn = False
-        self.apply_opponent_move()
+        self.dispatch_opponent_move()
+
+    def dispatch_opponent_move(self):
+        """ dispatches apply_opponent_move after s_opponent_move_delay_milliseconds (@see BaseModule.dispatch_threadpool_delayed)
+        """
+        self.dispatch_threadpool_delayed(
+            self.apply_opponent_move, s_opponent_move_delay_milliseconds, "opponent move", PRIORITY_INTERACTIVE)
 
     def apply_opponent_move(self):
         """ this method is called when the opponent makes a move. it will choose a move from the opening tree (if known) by proportion of known moves
@@ -107,7 +143,6 @@ class Quiz(ChessboardAndLogModule):
         if self.player_turn:
             raise Exception(
                 "this method can only be called during the opponents turn")
-        time.sleep(0.7)
         fen = get_reduced_fen_from_board(self.board)
         node = self.tree.get(fen)
         if not node.has_move():
@@ -121,14 +156,21 @@ class Quiz(ChessboardAndLogModule):
                 self.finish_quiz(node, "no moves for opponent known")
                 return
         op_tree = self.opening_tree.black_opening_tree
+        op_color = "black"
         if self.opponent_color == "black":
             op_tree = self.opening_tree.white_opening_tree
+            op_color = "white"
         op_node = op_tree.get(node.state)
-        move = None
-        if op_node.has_frequency():
-            move = op_node.random_move(random, True)
-        else:
-            move = node.random_move(random)
+        move = self.choose_due_move(node) if self.steer_to_due else None
+        if move == None:
+            move = self.choose_book_move(op_tree, op_color)
+        if move == None:
+            if op_node.has_frequency():
+                move = self.move_samplers[op_tree].random_move(
+                    op_node, self.random, True)
+            else:
+                move = self.move_samplers[node.tree].random_move(
+                    node, self.random)
         self.moves_played.append(move.san)
         self.board.push_san(move.san)
         self.player_turn = True
@@ -136,10 +178,82 @@ class Quiz(ChessboardAndLogModule):
         node = self.tree.get(get_reduced_fen_from_board(self.board))
         self.chess_board_widget.display(
             self.board, last_move=move, previous_node=previous_node, node=node, show_last_move_icon=False, last_move_is_opponent_move=True, play_sound=True)
-        if not node.has_acceptable_move():
+        if not self.acceptable_moves.has_acceptable_move(node):
             self.finish_quiz(
                 node, "opponent moved, no more acceptable moves for player known")
 
+    def get_line(self) -> list[str]:
+        """
+        Returns:
+            list[str]: the moves in san format that lead from the start position to the current position of the board
+        """
+        board = Board()
+        line = []
+        for move in self.board.move_stack:
+            line.append(board.san(move))
+            board.push(move)
+        return line
+
+    def choose_due_move(self, node: Node) -> Move | None:
+        """ chooses the move of the current position of the tree that leads to the position which is overdue the longest
+        (@see chessapp.controller.repetition.RepetitionStore). the cost depends on the moves of the position, not on the size of the tree.
+
+        Args:
+            node (Node): the current position
+
+        Returns:
+            Move | None: the chosen move or None if no move leads to a due position
+        """
+        if node.tree != self.tree:
+            return None
+        due_moves = [move for move in node.moves if self.repetition.is_due(move.result)]
+        if len(due_moves) == 0:
+            return None
+        return min(due_moves, key=lambda move: self.repetition.get_due_time(move.result))
+
+    def choose_book_move(self, op_tree: ChessTree, op_color: str) -> Move | None:
+        """ chooses a move of the current position from the polyglot book of the opening tree (@see OpeningTree.choose_book_move) by
+        proportion of the weights of the known moves. the book is memory-mapped, so this lookup does not depend on the opening tree being
+        loaded. a book older than the opening tree is not used, the move is then chosen from the opening tree.
+
+        Args:
+            op_tree (ChessTree): the opening tree the book was exported from
+            op_color (str): color of the opening tree ("white" or "black")
+
+        Returns:
+            Move | None: the chosen move or None if there is no up-to-date book or the book knows no move for the position
+        """
+        book_move = self.opening_tree.choose_book_move(
+            op_color, self.board, self.random)
+        if not book_move:
+            return None
+        san = self.board.san(book_move)
+        board = self.board.copy(stack=False)
+        board.push(book_move)
+        return Move(op_tree, san, get_reduced_fen_from_board(board))
+
+    def build_acceptable_moves(self):
+        """ computes the acceptable moves of all positions of the tree in advance (@see chessapp.model.acceptablemoves.AcceptableMoveIndex.build)
+        """
+        computed = self.acceptable_moves.build(self.about_to_close)
+        self.log_message("indexed the acceptable moves of " +
+                         str(computed) + " positions")
+
+    def show_repertoire_statistics(self):
+        """ logs for both colors how many positions and lines the quiz can reach, the holes of the repertoire (positions without acceptable
+        move for the player) and the lengths of the lines (@see chessapp.model.repertoire.analyse_repertoire)
+        """
+        if not self.wait_until_ready(self.tree.loaded, "the tree"):
+            return
+        for color in ("white", "black"):
+            report = analyse_repertoire(
+                self.tree, color, self.acceptable_moves.is_acceptable_move, about_to_close=self.about_to_close)
+            if report == None:
+                self.log_message("no repertoire for " + color)
+                continue
+            for line in report.format_report():
+                self.log_message(line)
+
     def finish_quiz(self, node: Node, reason: str):
         """ this method is called when the quiz is finished. it will log the reason of termination, the moves played and the moves left in the node (if any).
 
@@ -163,6 +277,7 @@ class Quiz(ChessboardAndLogModule):
             self.log_message("moves left in node " +
                              node.state + ": " + ", ".join(moves))
         self.quiz_started = False
+        self.repetition.save()
         ChessboardSound.GAME_END.play()
 
     def on_piece_movement(self, piece_movement: PieceMovement):
@@ -173,7 +288,8 @@ class Quiz(ChessboardAndLogModule):
             piece_movement (PieceMovement): the movement to apply
         """
         if not self.about_to_close():
-            self.app.threadpool.start(QuizMovementAction(self, piece_movement))
+            self.dispatch_threadpool(lambda: self.apply_movement(
+                piece_movement), "move", PRIORITY_INTERACTIVE)
 
     def reset(self):
         """ this method resets the board to the starting position and resets the quiz state.
@@ -188,44 +304,100 @@ class Quiz(ChessboardAndLogModule):
         self.explorer.focus()
         self.explorer.set_board(self.board)
 
+    def load_repetition(self):
+        """ loads the spaced repetition store once (@see chessapp.controller.repetition.RepetitionStore)
+        """
+        with self.repetition_lock:
+            if not self.repetition_loaded:
+                self.repetition.load()
+                self.repetition_loaded = True
+
+    def prepare(self) -> bool:
+        """ waits until the tree and the opening trees are loaded and loads the data of the quiz that is loaded on first use
+
+        Returns:
+            bool: False if the module closes while waiting, True otherwise
+        """
+        if not self.wait_until_ready(self.tree.loaded, "the tree") or not self.opening_tree.wait_until_loaded():
+            return False
+        if not self.acceptable_moves_requested:
+            self.acceptable_moves_requested = True
+            self.dispatch_threadpool(
+                self.build_acceptable_moves, "Quiz: index acceptable moves", PRIORITY_BACKGROUND)
+        self.load_repetition()
+        return True
+
     def start(self):
         """ this method starts the quiz. it will randomly choose a color for the player and displays the board from the perspective of the player.
         """
-        if self.quiz_started:
+        if self.quiz_started or not self.prepare():
+            return
+        self.begin(Board(), [], self.random.randint(0, 1) % 2 == 0, False)
+
+    def start_due(self):
+        """ starts the quiz in the position that is overdue the longest (@see chessapp.controller.repetition.RepetitionStore.get_due). the board
+        shows the line the position was answered in (or a shortest line of the tree if the tree does not contain that line anymore) and the
+        player has the color of the turn player. the opponent prefers moves that lead to due positions.
+        """
+        if self.quiz_started or not self.prepare():
+            return
+        fen = self.repetition.get_due()
+        while fen != None:
+            # the line the position was answered in is used if the tree still contains it, the tree is only searched otherwise
+            line = self.repetition.get_line(fen)
+            if line != None and follow_line(self.tree, line) == fen:
+                break
+            line = find_line(self.tree, fen, s_max_due_line_plies)
+            if line != None:
+                self.repetition.set_line(fen, line)
+                break
+            self.log_message("due position " + fen +
+                             " is not reached from the start position, postponing it")
+            self.repetition.postpone(fen, s_unreachable_postpone_seconds)
+            fen = self.repetition.get_due()
+        if fen == None:
+            next = self.repetition.get_next()
+            if next == None:
+                self.log_message(
+                    "no positions are due yet, start a quiz to record your answers")
+            else:
+                self.log_message("no positions are due, the next one is due in " +
+                                 str(round(max(0, next[0] - time.time()) / 60)) + " minutes")
             return
+        board = Board()
+        for san in line:
+            board.push_san(san)
+        self.begin(board, line, True, True)
+
+    def begin(self, board: Board, moves_played: list[str], player_turn: bool, steer_to_due: bool):
+        """ starts the quiz in the given position and displays the board from the perspective of the player
+
+        Args:
+            board (Board): the position the quiz starts in
+            moves_played (list[str]): the moves that lead to the position
+            player_turn (bool): True if the player moves first
+            steer_to_due (bool): if True, the opponent prefers moves that lead to due positions (@see choose_due_move)
+        """
         self.focus()
-        self.player_turn = random.randint(0, 1) % 2 == 0
-        self.opponent_color = "white"
-        self.chess_board_widget.view_black()
-        if self.player_turn:
-            self.opponent_color = "black"
+        self.player_turn = player_turn
+        player_is_white = board.turn == player_turn
+        self.opponent_color = "black" if player_is_white else "white"
+        if player_is_white:
             self.chess_board_widget.view_white()
-        self.board = Board()
+        else:
+            self.chess_board_widget.view_black()
+        self.board = board
         self.chess_board_widget.display(self.board)
-        self.moves_played = []
+        self.moves_played = list(moves_played)
+        self.steer_to_due = steer_to_due
         self.quiz_started = True
         ChessboardSound.GAME_START.play()
         if not self.player_turn:
-            self.apply_opponent_move()
-
+            self.dispatch_opponent_move()
 
-class QuizMovementAction(QRunnable):
-    """ this class is a runnable that is used to apply a piece movement to the quiz (@see on_piece_movement). it is used to run apply_movement
-    on the threadpool of the main application.
-    """
-
-    def __init__(self, quiz: Quiz, piece_movement: PieceMovement):
-        """initializes the runnable
-
-        Args:
-            quiz (Quiz): the quiz to apply the movement to
-            piece_movement (PieceMovement): the movement to apply
+    def on_close(self):
+        """ saves the spaced repetition store
         """
-        super().__init__()
-        self.quiz = quiz
-        self.piece_movement = piece_movement
+        super().on_close()
+        self.repetition.save()
 
-    def run(self):
-        """ applies the movement to the quiz
-        """
-        self.quiz.apply_movement(self.piece_movement)
@@ -0,0 +1,228 @@
+from chessapp.controller.workunits import write_json_atomic, read_json
+from chessapp.util.paths import get_data_folder
+from chessapp.util.fen import get_reduced_fen_from_board
+from chess import Board
+from os.path import join, exists
+from threading import Lock
+import traceback
+import heapq
+import time
+
+s_repetition_file_path: str = join(get_data_folder(), "quiz_repetition.json")
+s_repetition_version: int = 2
+s_start_fen: str = get_reduced_fen_from_board(Board())
+# the player found an acceptable move
+RESULT_CORRECT = "correct"
+# the player played a known move that is not acceptable
+RESULT_INCORRECT = "incorrect"
+# the player played a move that is not known yet (it is added to the tree to be explored). this is no wrong answer: the ease and the
+# interval of the position are kept, the position is only due again after s_retry_interval_seconds to quiz the new move.
+RESULT_EXPLORED = "explored"
+# a position that was answered wrongly is due again after this many seconds
+s_retry_interval_seconds: float = 600
+# a position that was answered correctly for the first time is due again after this many seconds
+s_first_interval_seconds: float = 24 * 60 * 60
+s_initial_ease: float = 2.5
+s_min_ease: float = 1.3
+# the ease of a position is lowered by this amount with each wrong answer
+s_ease_penalty: float = 0.2
+# positions of the lists of the store file. LINE is the line (moves in san format separated by spaces) the position was reached with.
+DUE, INTERVAL, EASE, CORRECT, INCORRECT, EXPLORED, LINE = range(7)
+
+
+class RepetitionStore:
+    """ the results of the quiz per position (the position in which the player had to move) for spaced repetition. a correct answer
+    multiplies the interval until the position is due again by the ease of the position, a wrong answer lowers the ease and makes the
+    position due again after s_retry_interval_seconds. the positions are stored compactly as fen -> [due, interval, ease, correct,
+    incorrect, explored, line]. the line leads from the start position to the position, so a due position can be set up without
+    searching the tree (@see get_line). a heap of the due times keeps the next due position available in O(log n) independent of the size of the
+    repertoire; entries of the heap whose position was answered again are skipped when they come up.
+    """
+
+    def __init__(self, file_path: str = s_repetition_file_path):
+        """ creates an empty store. call load to read it from disk.
+
+        Args:
+            file_path (str, optional): Defaults to s_repetition_file_path. path of the store file
+        """
+        self.file_path: str = file_path
+        self.positions: dict[str, list] = {}
+        # (due, fen). an entry is current if the position still has this due time.
+        self.due_queue: list[tuple[float, str]] = []
+        self.is_changed: bool = False
+        self.lock = Lock()
+
+    def load(self):
+        """ loads the store from disk. a store that does not exist, cannot be read or has an unknown version is ignored. stores of
+        version 1 have no lines, their positions get an empty line.
+        """
+        positions = {}
+        if exists(self.file_path):
+            try:
+                data = read_json(self.file_path)
+                if data.get("version") == s_repetition_version:
+                    positions = data["positions"]
+                elif data.get("version") == 1:
+                    positions = {fen: entry + [""]
+                                 for fen, entry in data["positions"].items()}
+            except:
+                print("error while loading quiz repetition " + self.file_path)
+                print(traceback.format_exc())
+        with self.lock:
+            self.positions = positions
+            self.rebuild_due_queue()
+            self.is_changed = False
+
+    def save(self):
+        """ writes the store to disk if it changed since it was loaded or saved
+        """
+        with self.lock:
+            if not self.is_changed:
+                return
+            positions = dict(self.positions)
+            self.is_changed = False
+        write_json_atomic(self.file_path, {
+                          "version": s_repetition_version, "positions": positions})
+
+    def rebuild_due_queue(self):
+        """ internal method that rebuilds the heap from the positions. must be called with the lock held.
+        """
+        self.due_queue = [(entry[DUE], fen)
+                          for fen, entry in self.positions.items()]
+        heapq.heapify(self.due_queue)
+
+    def record(self, fen: str, result: str, now: float = None, line: list[str] = None):
+        """ records an answer of the player and schedules the position
+
+        Args:
+            fen (str): reduced fen of the position in which the player moved
+            result (str): RESULT_CORRECT, RESULT_INCORRECT or RESULT_EXPLORED
+            now (float, optional): Defaults to None. the time of the answer in seconds since the epoch. if None, the current time is used.
+            line (list[str], optional): Defaults to None. the moves from the start position to the position. if None, the stored line
+                is kept.
+        """
+        now = time.time() if now == None else now
+        with self.lock:
+            entry = self.positions.get(fen)
+            entry = list(entry) if entry else [
+                now, 0, s_initial_ease, 0, 0, 0, ""]
+            if result == RESULT_CORRECT:
+                entry[CORRECT] += 1
+                entry[INTERVAL] = s_first_interval_seconds if entry[INTERVAL] < s_first_interval_seconds else entry[INTERVAL] * entry[EASE]
+                entry[DUE] = now + entry[INTERVAL]
+            elif result == RESULT_INCORRECT:
+                entry[INCORRECT] += 1
+                entry[EASE] = max(s_min_ease, entry[EASE] - s_ease_penalty)
+                entry[INTERVAL] = s_retry_interval_seconds
+                entry[DUE] = now + entry[INTERVAL]
+            else:
+                entry[EXPLORED] += 1
+                entry[DUE] = now + s_retry_interval_seconds
+            if line != None:
+                entry[LINE] = " ".join(line)
+            self.positions[fen] = entry
+            heapq.heappush(self.due_queue, (entry[DUE], fen))
+            # the heap holds an outdated entry per answer, it is compacted once they outnumber the positions
+            if len(self.due_queue) > 2 * len(self.positions) + 16:
+                self.rebuild_due_queue()
+            self.is_changed = True
+
+    def postpone(self, fen: str, seconds: float, now: float = None):
+        """ makes a position due later without counting an answer (e.g. because it cannot be reached at the moment)
+
+        Args:
+            fen (str): reduced fen of a position that was answered before
+            seconds (float): the position is due after this many seconds
+            now (float, optional): Defaults to None. the time in seconds since the epoch. if None, the current time is used.
+        """
+        now = time.time() if now == None else now
+        with self.lock:
+            entry = self.positions.get(fen)
+            if entry == None:
+                return
+            entry = list(entry)
+            entry[DUE] = now + seconds
+            self.positions[fen] = entry
+            heapq.heappush(self.due_queue, (entry[DUE], fen))
+            self.is_changed = True
+
+    def set_line(self, fen: str, line: list[str]):
+        """ replaces the line of a position that was answered before (e.g. because the stored line is not contained in the tree anymore)
+
+        Args:
+            fen (str): reduced fen of the position
+            line (list[str]): the moves from the start position to the position
+        """
+        with self.lock:
+            entry = self.positions.get(fen)
+            if entry == None:
+                return
+            entry = list(entry)
+            entry[LINE] = " ".join(line)
+            self.positions[fen] = entry
+            self.is_changed = True
+
+    def get_line(self, fen: str) -> list[str]:
+        """
+        Args:
+            fen (str): reduced fen of a position
+
+        Returns:
+            list[str]: the moves the position was last reached with or None if the position was never answered or its line is unknown
+        """
+        entry = self.positions.get(fen)
+        if entry == None or (entry[LINE] == "" and fen != s_start_fen):
+            return None
+        return entry[LINE].split(" ") if entry[LINE] else []
+
+    def get_next(self) -> tuple[float, str]:
+        """
+        Returns:
+            tuple[float, str]: the due time and the fen of the position that is due next or None if the store is empty
+        """
+        with self.lock:
+            while len(self.due_queue) > 0:
+                due, fen = self.due_queue[0]
+                entry = self.positions.get(fen)
+                if entry != None and entry[DUE] == due:
+                    return due, fen
+                heapq.heappop(self.due_queue)
+            return None
+
+    def get_due(self, now: float = None) -> str:
+        """
+        Args:
+            now (float, optional): Defaults to None. the time in seconds since the epoch. if None, the current time is used.
+
+        Returns:
+            str: the fen of the position that is overdue the longest or None if no position is due
+        """
+        now = time.time() if now == None else now
+        next = self.get_next()
+        return next[1] if next != None and next[0] <= now else None
+
+    def is_due(self, fen: str, now: float = None) -> bool:
+        """
+        Args:
+            fen (str): reduced fen of a position
+            now (float, optional): Defaults to None. the time in seconds since the epoch. if None, the current time is used.
+
+        Returns:
+            bool: True if the position was answered before and is due again
+        """
+        entry = self.positions.get(fen)
+        return entry != None and entry[DUE] <= (time.time() if now == None else now)
+
+    def get_due_time(self, fen: str) -> float:
+        """
+        Args:
+            fen (str): reduced fen of a position
+
+        Returns:
+            float: the time the position is due in seconds since the epoch or None if it was never answered
+        """
+        entry = self.positions.get(fen)
+        return entry[DUE] if entry != None else None
+
+    def __len__(self) -> int:
+        return len(self.positions)
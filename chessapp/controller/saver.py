@@ -1,5 +1,9 @@
 from chessapp.model.chesstree import ChessTree
 from chessapp.view.module import LogModule, create_method_action
+from chessapp.util.polyglot import export_polyglot
+from os.path import join
+
+s_book_file_name: str = "book.bin"
 
 
 class Saver(LogModule):
@@ -7,20 +11,33 @@ class Saver(LogModule):
     """
 
     def __init__(self, app, tree: ChessTree):
-        """ initialises the saver with the given app and tree. the saver has one action: save.
+        """ initialises the saver with the given app and tree. the saver has two actions: save and export polyglot.
 
         Args:
             app (Chessapp): the main application
             tree (ChessTree): the tree to save
         """
         super().__init__(app, "Saver", [
-            create_method_action(app, "Save", self.save)])
+            create_method_action(app, "Save", self.save),
+            create_method_action(app, "Export Polyglot", self.export_polyglot)])
         self.tree: ChessTree = tree
         self.app = app
 
     def save(self):
-        """saves the tree to disk
+        """saves the tree to disk once it is loaded (saving a partially loaded tree would lose the positions that are not loaded yet)
         """
+        if not self.wait_until_ready(self.tree.loaded, "the tree"):
+            return
         self.log_message("saving...")
         self.tree.save()
         self.log_message("saving done")
+
+    def export_polyglot(self):
+        """exports the tree as polyglot book (book.bin in the save folder of the tree) @see chessapp.util.polyglot.export_polyglot
+        """
+        if not self.wait_until_ready(self.tree.loaded, "the tree"):
+            return
+        file_path = join(self.tree.save_folder_path, s_book_file_name)
+        self.log_message("exporting polyglot book to " + file_path + "...")
+        self.log_message("exported " + str(export_polyglot(self.tree,
+                         file_path, about_to_close=self.about_to_close)) + " entries")
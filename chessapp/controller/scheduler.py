@@ -0,0 +1,318 @@
+from threading import Condition, local
+from contextlib import contextmanager
+import time
+
+# priority classes. the values are used as priorities of QThreadPool.start (higher values are started first).
+PRIORITY_BACKGROUND = 0
+PRIORITY_NORMAL = 1
+PRIORITY_INTERACTIVE = 2
+s_priority_names = {PRIORITY_BACKGROUND: "background",
+                    PRIORITY_NORMAL: "normal", PRIORITY_INTERACTIVE: "interactive"}
+
+STATE_QUEUED = "queued"
+STATE_RUNNING = "running"
+STATE_PAUSED = "paused"
+STATE_CANCELLED = "cancelled"
+
+# seconds a paused task sleeps before it checks again whether it should abort
+s_pause_poll_seconds = 0.5
+
+
+class CancellationToken:
+    """ tells a task that it should stop. the task checks the token at its safe points (e.g. BaseModule.about_to_close) and returns
+    early once it is cancelled. cancelling never interrupts a task forcefully.
+    """
+
+    def __init__(self):
+        """ creates a token that is not cancelled
+        """
+        self.cancelled: bool = False
+
+    def cancel(self):
+        """ requests the task to stop
+        """
+        self.cancelled = True
+
+    def is_cancelled(self) -> bool:
+        """
+        Returns:
+            bool: True if the task should stop
+        """
+        return self.cancelled
+
+
+class ScheduledTask:
+    """ a unit of work known to the scheduler (@see Scheduler)
+    """
+
+    def __init__(self, name: str, priority: int, key=None):
+        """ creates a queued task
+
+        Args:
+            name (str): the name of the task that is displayed to the user
+            priority (int): one of the PRIORITY_* constants
+            key (optional): Defaults to None. tasks with the same key are identical (@see Scheduler.find_task). if None, the name is used.
+        """
+        self.name: str = name
+        self.priority: int = priority
+        self.key = key if key != None else name
+        self.state: str = STATE_QUEUED
+        self.created_time: float = time.time()
+        self.started_time: float = None
+        self.token: CancellationToken = CancellationToken()
+        # None if the task does not report progress, otherwise the share of the work done (0 to 1)
+        self.progress: float = None
+
+    def describe(self) -> str:
+        """
+        Returns:
+            str: human readable description of the task (state, priority class, name, progress and seconds since it was queued or
+            started)
+        """
+        since = self.started_time if self.started_time else self.created_time
+        state = STATE_CANCELLED if self.token.is_cancelled() else self.state
+        progress = [] if self.progress == None else [
+            str(round(self.progress * 100)) + "%"]
+        return " ".join([state, "[" + s_priority_names[self.priority] + "]", self.name] + progress + ["(" + str(round(time.time() - since)) + "s)"])
+
+
+class Scheduler:
+    """ cooperative scheduler for the work that runs on the threadpool of the app. each task has a priority class:
+    - interactive tasks (e.g. the Explorer analysing the position on screen) run immediately and pause background tasks while they run
+    - background tasks (e.g. the Analyser or imports) pause at their next safe point (@see checkpoint) while interactive tasks run and
+      resume afterwards. long engine searches are safe points too: they are stopped when interactive work starts (@see should_yield).
+    - normal tasks neither pause nor are paused
+    nothing is preempted forcefully: a background task only pauses when it reaches a safe point. the scheduler keeps track of all
+    tasks so that they can be displayed (@see add_listener), coalesced (@see find_task) and cancelled (@see cancel).
+    """
+
+    def __init__(self):
+        """ creates a scheduler without tasks
+        """
+        self.condition = Condition()
+        self.tasks: list[ScheduledTask] = []
+        self.interactive_count: int = 0
+        self.listeners = []
+        self.local = local()
+
+    def add_listener(self, listener):
+        """
+        Args:
+            listener (callable): called with the descriptions of all tasks (list[str]) whenever a task changes
+        """
+        self.listeners.append(listener)
+
+    def notify_listeners(self):
+        """ calls all listeners with the descriptions of all tasks
+        """
+        descriptions = self.describe_tasks()
+        for listener in self.listeners:
+            listener(descriptions)
+
+    def get_tasks(self) -> list[ScheduledTask]:
+        """
+        Returns:
+            list[ScheduledTask]: all tasks, running and paused tasks first, higher priorities first
+        """
+        with self.condition:
+            return sorted(self.tasks, key=lambda task: (
+                task.state == STATE_QUEUED, -task.priority, task.created_time))
+
+    def describe_tasks(self) -> list[str]:
+        """
+        Returns:
+            list[str]: the descriptions of all tasks in the order of get_tasks
+        """
+        return [task.describe() for task in self.get_tasks()]
+
+    def find_task(self, key, include_running: bool = False) -> ScheduledTask | None:
+        """ finds a task that is identical to a task with the given key and has not been cancelled
+
+        Args:
+            key: the key of the task (@see ScheduledTask)
+            include_running (bool, optional): Defaults to False. whether running and paused tasks are considered or only queued ones
+
+        Returns:
+            ScheduledTask | None: the identical task or None
+        """
+        with self.condition:
+            for task in self.tasks:
+                if task.key == key and not task.token.is_cancelled() and (include_running or task.state == STATE_QUEUED):
+                    return task
+        return None
+
+    def submit(self, name: str, priority: int = PRIORITY_NORMAL, key=None) -> ScheduledTask:
+        """ registers a task that is about to be queued (e.g. on the threadpool)
+
+        Args:
+            name (str): the name of the task
+            priority (int, optional): Defaults to PRIORITY_NORMAL. the priority class of the task
+            key (optional): Defaults to None. the key of the task (@see ScheduledTask)
+
+        Returns:
+            ScheduledTask: the queued task
+        """
+        task = ScheduledTask(name, priority, key)
+        with self.condition:
+            self.tasks.append(task)
+        self.notify_listeners()
+        return task
+
+    def cancel(self, task: ScheduledTask):
+        """ cancels the task: a queued task does not run at all, a running or paused task stops at its next safe point
+
+        Args:
+            task (ScheduledTask): the task
+        """
+        with self.condition:
+            task.token.cancel()
+            self.condition.notify_all()
+        self.notify_listeners()
+
+    def cancel_all(self, priority: int = None):
+        """ cancels all tasks or all tasks of the given priority class
+
+        Args:
+            priority (int, optional): Defaults to None. the priority class of the tasks to cancel. if None, all tasks are cancelled.
+        """
+        with self.condition:
+            for task in self.tasks:
+                if priority == None or task.priority == priority:
+                    task.token.cancel()
+            self.condition.notify_all()
+        self.notify_listeners()
+
+    def is_cancelled(self) -> bool:
+        """
+        Returns:
+            bool: True if the task running on the current thread has been cancelled
+        """
+        task = self.get_current_task()
+        return task != None and task.token.is_cancelled()
+
+    def report_progress(self, done: int, total: int, task: ScheduledTask = None):
+        """ sets the progress of a task. listeners are only notified if the progress changed by at least one percent.
+
+        Args:
+            done (int): amount of work done
+            total (int): total amount of work
+            task (ScheduledTask, optional): Defaults to None. the task. if None, the task running on the current thread is used.
+        """
+        if task == None:
+            task = self.get_current_task()
+        if task == None or total <= 0:
+            return
+        progress = min(1, done / total)
+        changed = task.progress == None or int(
+            progress * 100) != int(task.progress * 100)
+        task.progress = progress
+        if changed:
+            self.notify_listeners()
+
+    def run(self, task: ScheduledTask, callable):
+        """ runs the callable as the given task on the current thread
+
+        Args:
+            task (ScheduledTask): the task (@see submit)
+            callable (callable): the work of the task
+        """
+        if task.token.is_cancelled():
+            with self.condition:
+                self.tasks.remove(task)
+            self.notify_listeners()
+            return
+        previous_task = self.get_current_task()
+        with self.condition:
+            task.state = STATE_RUNNING
+            task.started_time = time.time()
+            if task.priority == PRIORITY_INTERACTIVE:
+                self.interactive_count += 1
+        self.local.task = task
+        self.notify_listeners()
+        try:
+            callable()
+        finally:
+            self.local.task = previous_task
+            with self.condition:
+                self.tasks.remove(task)
+                if task.priority == PRIORITY_INTERACTIVE:
+                    self.interactive_count -= 1
+                self.condition.notify_all()
+            self.notify_listeners()
+
+    @contextmanager
+    def interactive(self, name: str):
+        """ runs the body of the with statement as interactive task (for interactive work that is not dispatched as task)
+
+        Args:
+            name (str): the name of the task
+        """
+        task = self.submit(name, PRIORITY_INTERACTIVE)
+        with self.condition:
+            task.state = STATE_RUNNING
+            task.started_time = time.time()
+            self.interactive_count += 1
+        self.notify_listeners()
+        try:
+            yield task
+        finally:
+            with self.condition:
+                self.tasks.remove(task)
+                self.interactive_count -= 1
+                self.condition.notify_all()
+            self.notify_listeners()
+
+    def set_current_task(self, task: ScheduledTask | None):
+        """ lets the current thread work on behalf of the given task (e.g. helper threads that a task starts), so that should_yield,
+        checkpoint and is_cancelled apply to it
+
+        Args:
+            task (ScheduledTask | None): the task
+        """
+        self.local.task = task
+
+    def get_current_task(self) -> ScheduledTask | None:
+        """
+        Returns:
+            ScheduledTask | None: the task running on the current thread or None
+        """
+        return getattr(self.local, "task", None)
+
+    def should_yield(self) -> bool:
+        """
+        Returns:
+            bool: True if the current thread runs a background task and interactive work is running
+        """
+        task = self.get_current_task()
+        return task != None and task.priority == PRIORITY_BACKGROUND and self.interactive_count > 0
+
+    def checkpoint(self, abort=lambda: False):
+        """ a safe point of the current task: if it is a background task and interactive work is running, the current thread is
+        blocked until no interactive work is running anymore, the task is cancelled or abort returns True. other tasks return
+        immediately.
+
+        Args:
+            abort (callable, optional): callable that returns True if the task should not wait anymore (e.g. because the app closes)
+        """
+        if not self.should_yield():
+            return
+        task = self.get_current_task()
+        with self.condition:
+            task.state = STATE_PAUSED
+        self.notify_listeners()
+        with self.condition:
+            while self.interactive_count > 0 and not task.token.is_cancelled() and not abort():
+                self.condition.wait(s_pause_poll_seconds)
+            task.state = STATE_RUNNING
+        self.notify_listeners()
+
+
+s_scheduler: Scheduler = Scheduler()
+
+
+def get_scheduler() -> Scheduler:
+    """
+    Returns:
+        Scheduler: the scheduler shared by all modules
+    """
+    return s_scheduler
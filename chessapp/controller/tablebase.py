@@ -0,0 +1,140 @@
+from chess import Board, Move, WHITE, popcount
+from chess.syzygy import Tablebase as SyzygyTablebase
+from chessapp.util.paths import get_tablebase_folder
+from os.path import isdir
+from os import listdir
+from threading import Lock
+
+s_use_tablebase: bool = True
+# tablebase results are exact. this depth makes sure they replace any engine evaluation (@see Node.update) and that the positions are
+# never scheduled for analysis again.
+s_tablebase_eval_depth: int = 99
+s_tablebase_file_suffixes = (".rtbw", ".rtbz")
+
+
+class Tablebase:
+    """ a wrapper for syzygy endgame tablebases (@see chess.syzygy). positions with few enough pieces and without castling rights are
+    resolved exactly: a won position is a mate (eval 100 or -100 from the perspective of white) and a drawn position has eval 0. cursed
+    wins and blessed losses (wins that cannot be forced within the 50-move rule) are treated as draws.
+    """
+
+    def __init__(self, folder: str = get_tablebase_folder()):
+        """ opens all tablebase files of the given folder. the files themselves are opened lazily by python-chess when probed.
+
+        Args:
+            folder (str, optional): Defaults to get_tablebase_folder(). folder containing *.rtbw (and optionally *.rtbz) files
+        """
+        self.tablebase = SyzygyTablebase()
+        self.tablebase.add_directory(folder)
+        self.max_pieces: int = 0
+        for key in self.tablebase.wdl:
+            self.max_pieces = max(self.max_pieces, len(key.replace("v", "")))
+
+    def can_probe(self, board: Board) -> bool:
+        """
+        Args:
+            board (Board): the board
+
+        Returns:
+            bool: True if the position of the board is contained in the tablebase
+        """
+        return not board.castling_rights and popcount(board.occupied) <= self.max_pieces
+
+    def probe_wdl(self, board: Board) -> int | None:
+        """
+        Args:
+            board (Board): the board
+
+        Returns:
+            int | None: win/draw/loss (2, 1, 0, -1, -2) from the perspective of the turn player or None if the position is unknown
+        """
+        if not self.can_probe(board):
+            return None
+        return self.tablebase.get_wdl(board)
+
+    def score(self, board: Board):
+        """ scores the given board like chessapp.controller.engine.Engine.score
+
+        Args:
+            board (Board): the board to score
+
+        Returns:
+            tuple | None: (eval, depth, is_mate) or None if the position is unknown
+        """
+        wdl = self.probe_wdl(board)
+        if wdl == None:
+            return None
+        return wdl_to_score(wdl, board.turn)
+
+    def rank_moves(self, board: Board) -> list[tuple[Move, tuple]]:
+        """ ranks all legal moves of the board by their tablebase result. winning moves are ordered by ascending distance to zeroing
+        (capture or pawn move) of the resulting position, losing moves by descending distance to zeroing.
+
+        Args:
+            board (Board): the board
+
+        Returns:
+            list[tuple[Move, tuple]]: moves and the scores (eval, depth, is_mate) of the resulting positions, best move first. empty
+            if the position is unknown.
+        """
+        if not self.can_probe(board):
+            return []
+        ranked = []
+        copy_board = board.copy(stack=False)
+        for move in board.legal_moves:
+            copy_board.push(move)
+            wdl = self.tablebase.get_wdl(copy_board)
+            dtz = self.tablebase.get_dtz(copy_board, 0)
+            copy_board.pop()
+            if wdl == None:
+                return []
+            # wdl and dtz are from the perspective of the opponent. prefer short wins and long losses.
+            distance = -abs(dtz) if wdl < 0 else abs(dtz)
+            ranked.append((-wdl, distance, move,
+                          wdl_to_score(wdl, not board.turn)))
+        ranked.sort(key=lambda entry: (entry[0], entry[1]), reverse=True)
+        return [(entry[2], entry[3]) for entry in ranked]
+
+    def close(self):
+        """ closes all opened tablebase files
+        """
+        self.tablebase.close()
+
+
+def wdl_to_score(wdl: int, turn: bool):
+    """ converts a wdl value to a score
+
+    Args:
+        wdl (int): win/draw/loss from the perspective of the turn player
+        turn (bool): the turn player (chess.WHITE or chess.BLACK)
+
+    Returns:
+        tuple: (eval, depth, is_mate) where eval is 100 or -100 (from the perspective of white) for won positions and 0 otherwise
+    """
+    if abs(wdl) < 2:
+        return 0.0, s_tablebase_eval_depth, False
+    eval = 100.0 if (wdl > 0) == (turn == WHITE) else -100.0
+    return eval, s_tablebase_eval_depth, True
+
+
+s_default_tablebase: Tablebase = None
+s_default_tablebase_lock = Lock()
+
+
+def get_default_tablebase() -> Tablebase | None:
+    """ returns the tablebase of the tablebase folder (@see chessapp.util.paths.get_tablebase_folder). it is opened on first use
+    and shared by all callers.
+
+    Returns:
+        Tablebase | None: the tablebase or None if s_use_tablebase is False or the folder contains no tablebase files
+    """
+    global s_default_tablebase
+    if not s_use_tablebase:
+        return None
+    with s_default_tablebase_lock:
+        if s_default_tablebase == None:
+            folder = get_tablebase_folder()
+            if not isdir(folder) or not any(name.endswith(s_tablebase_file_suffixes) for name in listdir(folder)):
+                return None
+            s_default_tablebase = Tablebase(folder)
+        return s_default_tablebase
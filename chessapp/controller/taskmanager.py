@@ -0,0 +1,72 @@
+from PyQt5.QtCore import QThreadPool
+from chessapp.controller.scheduler import Scheduler, ScheduledTask, get_scheduler, PRIORITY_NORMAL
+from chessapp.view.module import MethodAction
+from threading import Lock
+
+
+class TaskManager:
+    """ owned by the main application. every action of a menu and every work a module dispatches is started through the task manager
+    as a named task of the scheduler (@see chessapp.controller.scheduler.Scheduler) on the threadpool of the app:
+    - identical tasks (tasks with the same key, by default the same callable) are coalesced: a task is not queued again while an
+      identical task is still queued. exclusive tasks (e.g. menu actions) are also not started while an identical task is running,
+      so that clicking "Analyse" twice does not start a second analysis of the same tree.
+    - each task has a cancellation token. modules check it at their safe points (@see BaseModule.about_to_close).
+    - tasks can report their progress (@see chessapp.controller.scheduler.Scheduler.report_progress) which is shown in the task
+      list (@see chessapp.controller.taskqueue.TaskQueue).
+    """
+
+    def __init__(self, threadpool: QThreadPool, scheduler: Scheduler = None):
+        """ creates a task manager
+
+        Args:
+            threadpool (QThreadPool): the threadpool the tasks run on
+            scheduler (Scheduler, optional): Defaults to None. the scheduler of the tasks. if None, the shared scheduler is used.
+        """
+        self.threadpool: QThreadPool = threadpool
+        self.scheduler: Scheduler = scheduler if scheduler else get_scheduler()
+        self.lock = Lock()
+
+    def start(self, callable, name: str, priority: int = PRIORITY_NORMAL, key=None, exclusive: bool = False) -> ScheduledTask | None:
+        """ starts the callable as task on the threadpool unless an identical task is pending
+
+        Args:
+            callable (callable): the work of the task
+            name (str): the name of the task shown to the user
+            priority (int, optional): Defaults to PRIORITY_NORMAL. priority class of the task (@see chessapp.controller.scheduler)
+            key (optional): Defaults to None. tasks with the same key are identical. if None, the callable is the key.
+            exclusive (bool, optional): Defaults to False. if True, the task is not started while an identical task is running either
+
+        Returns:
+            ScheduledTask | None: the started task or None if it was coalesced with an identical task
+        """
+        if key == None:
+            key = callable
+        with self.lock:
+            if self.scheduler.find_task(key, exclusive) != None:
+                return None
+            task = self.scheduler.submit(name, priority, key)
+        self.threadpool.start(MethodAction(callable, task), priority)
+        return task
+
+    def cancel(self, task: ScheduledTask):
+        """ cancels the task (@see chessapp.controller.scheduler.Scheduler.cancel)
+
+        Args:
+            task (ScheduledTask): the task
+        """
+        self.scheduler.cancel(task)
+
+    def cancel_all(self, priority: int = None):
+        """ cancels all tasks or all tasks of the given priority class (@see chessapp.controller.scheduler.Scheduler.cancel_all)
+
+        Args:
+            priority (int, optional): Defaults to None. the priority class of the tasks to cancel. if None, all tasks are cancelled.
+        """
+        self.scheduler.cancel_all(priority)
+
+    def get_tasks(self) -> list[ScheduledTask]:
+        """
+        Returns:
+            list[ScheduledTask]: all queued, running and paused tasks (@see chessapp.controller.scheduler.Scheduler.get_tasks)
+        """
+        return self.scheduler.get_tasks()
@@ -0,0 +1,85 @@
+from PyQt5.QtCore import pyqtSignal, QTimer
+from PyQt5.QtWidgets import QListWidget, QVBoxLayout
+from chessapp.view.module import BaseModule, create_method_action
+from chessapp.controller.scheduler import get_scheduler, ScheduledTask, PRIORITY_BACKGROUND
+
+# the elapsed time of the tasks is refreshed this often
+s_refresh_interval_milliseconds = 1000
+
+
+class TaskQueue(BaseModule):
+    """ shows the tasks of the task manager (@see chessapp.controller.taskmanager.TaskManager): which tasks are running (with their
+    elapsed time and progress), which background tasks are paused because of interactive work and which tasks are queued on the
+    threadpool. the selected task or all background tasks can be cancelled.
+    """
+
+    tasks_changed = pyqtSignal(list)
+
+    def __init__(self, app):
+        """ initialises the module and registers it as listener of the scheduler
+
+        Args:
+            app (ChessApp): the main application
+        """
+        super().__init__(app, "Tasks", [
+            create_method_action(app, "Cancel Selected",
+                                 self.cancel_selected),
+            create_method_action(app, "Cancel Background",
+                                 self.cancel_background)
+        ])
+        self.task_widget = QListWidget()
+        self.app = app
+        self.tasks: list[ScheduledTask] = []
+        self.selected_row: int = -1
+        self.refresh_timer = QTimer()
+
+    def init(self):
+        """ @see BaseModule.init. Adds the task list to the main widget.
+        """
+        super().init()
+        v_layout = QVBoxLayout()
+        self.main_widget.setLayout(v_layout)
+        v_layout.addWidget(self.task_widget)
+        self.tasks_changed.connect(self.__display_tasks)
+        self.task_widget.currentRowChanged.connect(self.__select_row)
+        # listeners are called on the thread that changed a task, the signal moves the update onto the GUI thread
+        get_scheduler().add_listener(self.tasks_changed.emit)
+        self.__display_tasks(get_scheduler().describe_tasks())
+        self.refresh_timer.timeout.connect(
+            lambda: self.__display_tasks(get_scheduler().describe_tasks()))
+        self.refresh_timer.start(s_refresh_interval_milliseconds)
+
+    def cancel_selected(self):
+        """ cancels the task that is selected in the list
+        """
+        tasks = self.tasks
+        if 0 <= self.selected_row < len(tasks):
+            self.app.task_manager.cancel(tasks[self.selected_row])
+
+    def cancel_background(self):
+        """ cancels all background tasks
+        """
+        self.app.task_manager.cancel_all(PRIORITY_BACKGROUND)
+
+    def __select_row(self, row: int):
+        """ internal method that is called by the GUI thread when the selection changed
+
+        Args:
+            row (int): the selected row or -1
+        """
+        self.selected_row = row
+
+    def __display_tasks(self, descriptions: list[str]):
+        """ internal method that is called by the GUI thread when the tasks changed. the tasks are read again so that the rows of the
+        list match the tasks that can be cancelled.
+
+        Args:
+            descriptions (list[str]): descriptions of all tasks
+        """
+        selected_task = self.tasks[self.selected_row] if 0 <= self.selected_row < len(
+            self.tasks) else None
+        self.tasks = self.app.task_manager.get_tasks()
+        self.task_widget.clear()
+        self.task_widget.addItems([task.describe() for task in self.tasks])
+        if selected_task in self.tasks:
+            self.task_widget.setCurrentRow(self.tasks.index(selected_task))
@@ -0,0 +1,264 @@
+from chessapp.controller.enginemetrics import EngineMetrics, get_engine_metrics
+from chessapp.controller.analysispolicy import get_target_depth
+from chessapp.model.chesstree import ChessTree
+from threading import Lock
+import math
+
+s_default_branching_factor: float = 1.5
+s_min_branching_factor: float = 1.1
+s_max_branching_factor: float = 3.0
+s_reference_depth: int = 20
+s_default_seconds_at_reference_depth: float = 5
+# iterations below this depth finish in milliseconds and say little about the deeper ones
+s_min_fit_depth: int = 8
+s_adaptive_session_seconds: int = 3600
+s_adaptive_min_seconds: int = 5
+s_adaptive_max_seconds: int = 300
+# the allocation of a position is its estimated time to depth times this margin
+s_adaptive_time_margin: float = 1.5
+# a search is stalled if the next depth takes this many times longer than expected
+s_stall_factor: float = 4
+
+
+class TimeToDepthModel:
+    """ estimates the time a search needs to reach a depth. iterative deepening multiplies the time per depth by the effective branching
+    factor b, so the time to reach depth d is modelled as t(d) = exp(intercept + slope * d) with slope = log(b). the model is fitted by
+    least squares on the (depth, seconds) samples of recorded searches and is updated with every new search. without samples it
+    assumes s_default_branching_factor and s_default_seconds_at_reference_depth.
+    """
+
+    def __init__(self):
+        """ creates a model without samples
+        """
+        self.lock = Lock()
+        self.amount: int = 0
+        self.sum_depth: float = 0
+        self.sum_log_seconds: float = 0
+        self.sum_depth_squared: float = 0
+        self.sum_depth_log_seconds: float = 0
+
+    def record(self, depth_times: list[tuple[int, float]]):
+        """ adds the samples of one search
+
+        Args:
+            depth_times (list[tuple[int, float]]): the depths the search completed and the seconds it needed to complete them
+        """
+        with self.lock:
+            for depth, seconds in depth_times:
+                if depth < s_min_fit_depth or seconds <= 0:
+                    continue
+                log_seconds = math.log(seconds)
+                self.amount += 1
+                self.sum_depth += depth
+                self.sum_log_seconds += log_seconds
+                self.sum_depth_squared += depth * depth
+                self.sum_depth_log_seconds += depth * log_seconds
+
+    def fit(self, metrics: EngineMetrics):
+        """ adds the samples of all searches recorded in the metrics (@see chessapp.controller.enginemetrics.EngineCall.depth_times)
+
+        Args:
+            metrics (EngineMetrics): the metrics
+        """
+        for call in metrics.get_calls():
+            if call.depth_times:
+                self.record(call.depth_times)
+
+    def get_parameters(self) -> tuple[float, float]:
+        """
+        Returns:
+            tuple[float, float]: intercept and slope of the model
+        """
+        with self.lock:
+            variance = self.amount * self.sum_depth_squared - self.sum_depth * self.sum_depth
+            if self.amount < 2 or variance <= 0:
+                slope = math.log(s_default_branching_factor)
+                return math.log(s_default_seconds_at_reference_depth) - slope * s_reference_depth, slope
+            slope = (self.amount * self.sum_depth_log_seconds -
+                     self.sum_depth * self.sum_log_seconds) / variance
+            slope = min(max(slope, math.log(s_min_branching_factor)),
+                        math.log(s_max_branching_factor))
+            return (self.sum_log_seconds - slope * self.sum_depth) / self.amount, slope
+
+    def get_branching_factor(self) -> float:
+        """
+        Returns:
+            float: the effective branching factor (the factor by which the time grows per depth)
+        """
+        return math.exp(self.get_parameters()[1])
+
+    def estimate_seconds(self, depth: int) -> float:
+        """
+        Args:
+            depth (int): the depth
+
+        Returns:
+            float: estimated seconds a search needs to complete the depth
+        """
+        intercept, slope = self.get_parameters()
+        return math.exp(intercept + slope * depth)
+
+
+class StallDetector:
+    """ decides during a search whether to stop it early (@see chessapp.controller.engine.Engine.score_streaming). a search is stopped if
+    the next depth takes s_stall_factor times longer than the model expects or if, extrapolated with the branching factor of the model,
+    the target depth cannot be reached within the time limit anymore. the completed depths are recorded as samples for the model.
+    """
+
+    def __init__(self, model: TimeToDepthModel, target_depth: int, time_limit: float):
+        """ creates the detector for one search
+
+        Args:
+            model (TimeToDepthModel): the model
+            target_depth (int): the depth the search should reach
+            time_limit (float): the time limit of the search in seconds
+        """
+        self.model: TimeToDepthModel = model
+        self.target_depth: int = target_depth
+        self.time_limit: float = time_limit
+        self.branching_factor: float = model.get_branching_factor()
+        self.depth_times: list[tuple[int, float]] = []
+        self.stalled: bool = False
+
+    def __call__(self, depth: int, elapsed: float) -> bool:
+        """ called for every info of the search
+
+        Args:
+            depth (int): the depth the search has completed so far
+            elapsed (float): seconds since the start of the search
+
+        Returns:
+            bool: True if the search should be stopped
+        """
+        if len(self.depth_times) == 0 or depth > self.depth_times[-1][0]:
+            self.depth_times.append((depth, elapsed))
+        last_depth, last_elapsed = self.depth_times[-1]
+        if last_depth < s_min_fit_depth or last_depth >= self.target_depth:
+            return False
+        expected_next = last_elapsed * (self.branching_factor - 1)
+        projected = last_elapsed * \
+            self.branching_factor ** (self.target_depth - last_depth)
+        # the first iterations take milliseconds and are too noisy to extrapolate from
+        unreachable = last_elapsed >= s_adaptive_min_seconds and projected > self.time_limit
+        self.stalled = elapsed - last_elapsed > max(
+            s_stall_factor * expected_next, s_adaptive_min_seconds) or unreachable
+        return self.stalled
+
+
+class AdaptiveTimeBudget:
+    """ spreads a session budget (in engine seconds, summed over all engines of a pool) across the positions of an analysis. the
+    positions are ordered by their estimated time to reach the target depth of their source (@see
+    chessapp.controller.analysispolicy.get_target_depth) and the cheapest ones are analysed first, which maximizes the number of
+    positions reaching their target within the budget. each position is given its estimate times s_adaptive_time_margin and searches
+    that stall are stopped early (@see StallDetector).
+    """
+
+    def __init__(self, session_seconds: float = s_adaptive_session_seconds, min_seconds: float = s_adaptive_min_seconds,
+                 max_seconds: float = s_adaptive_max_seconds, model: TimeToDepthModel = None):
+        """ creates the budget
+
+        Args:
+            session_seconds (float, optional): Defaults to s_adaptive_session_seconds. engine seconds available for the session
+            min_seconds (float, optional): Defaults to s_adaptive_min_seconds. minimum time limit of a position
+            max_seconds (float, optional): Defaults to s_adaptive_max_seconds. maximum time limit of a position
+            model (TimeToDepthModel, optional): Defaults to None. if None, a new model is created and fitted to the searches recorded
+                so far (@see chessapp.controller.enginemetrics.get_engine_metrics)
+        """
+        self.session_seconds: float = session_seconds
+        self.min_seconds: float = min_seconds
+        self.max_seconds: float = max_seconds
+        if model == None:
+            model = TimeToDepthModel()
+            model.fit(get_engine_metrics())
+        self.model: TimeToDepthModel = model
+        self.spent_seconds: float = 0
+        self.lock = Lock()
+
+    def estimate_cost(self, target_depth: int, current_depth: int = 0) -> float:
+        """ the cost of a position is the time the model expects between its current depth and its target depth, i.e. positions that
+        lack fewer depths are cheaper than new ones of the same target.
+
+        Args:
+            target_depth (int): the target depth of a position
+            current_depth (int, optional): Defaults to 0. the depth the position is already evaluated at (@see Node.eval_depth)
+
+        Returns:
+            float: the time limit a position with the given depths is given
+        """
+        seconds = self.model.estimate_seconds(target_depth)
+        if current_depth > 0:
+            seconds -= min(self.model.estimate_seconds(current_depth), seconds)
+        return min(max(seconds * s_adaptive_time_margin, self.min_seconds), self.max_seconds)
+
+    def plan(self, tree: ChessTree, fens: list[str]) -> list[str]:
+        """ orders the fens by ascending cost (positions of the same cost keep their order) and keeps as many as fit into the budget
+
+        Args:
+            tree (ChessTree): the tree containing the positions
+            fens (list[str]): the candidates
+
+        Returns:
+            list[str]: the planned fens
+        """
+        costs = {}
+        for fen in fens:
+            node = tree.nodes[fen]
+            costs[fen] = self.estimate_cost(get_target_depth(
+                node.source()), node.eval_depth)
+        planned = []
+        total = self.spent_seconds
+        for fen in sorted(fens, key=lambda fen: costs[fen]):
+            if total + costs[fen] > self.session_seconds:
+                break
+            total += costs[fen]
+            planned.append(fen)
+        return planned
+
+    def allocate(self, target_depth: int, current_depth: int = 0) -> float:
+        """
+        Args:
+            target_depth (int): the target depth of the position
+            current_depth (int, optional): Defaults to 0. the depth the position is already evaluated at
+
+        Returns:
+            float: the time limit of the position (its cost, but not more than the remaining budget). never less than min_seconds, a
+            limit of 0 would not limit the search at all.
+        """
+        return max(min(self.estimate_cost(target_depth, current_depth), self.get_remaining_seconds()), self.min_seconds)
+
+    def get_remaining_seconds(self) -> float:
+        """
+        Returns:
+            float: seconds left in the session budget
+        """
+        with self.lock:
+            return self.session_seconds - self.spent_seconds
+
+    def is_exhausted(self) -> bool:
+        """
+        Returns:
+            bool: True if the session budget is used up
+        """
+        return self.get_remaining_seconds() <= 0
+
+    def create_stall_detector(self, target_depth: int, time_limit: float) -> StallDetector:
+        """
+        Args:
+            target_depth (int): the target depth of the search
+            time_limit (float): the time limit of the search
+
+        Returns:
+            StallDetector: a new detector for a search
+        """
+        return StallDetector(self.model, target_depth, time_limit)
+
+    def finish(self, detector: StallDetector, elapsed: float):
+        """ books the time of a finished search and adds its samples to the model
+
+        Args:
+            detector (StallDetector): the detector of the search
+            elapsed (float): seconds the search took
+        """
+        self.model.record(detector.depth_times)
+        with self.lock:
+            self.spent_seconds += elapsed
@@ -2,15 +2,14 @@ from chessapp.model.chesstree import ChessTree
 from chessapp.model.sourcetype import SourceType
 from pathlib import Path
 from chess import Board, IllegalMoveError
-from chess.pgn import read_game
-import io
 from chessapp.model.move import Move
 from chessapp.view.module import LogModule, create_method_action
+from chessapp.controller.scheduler import PRIORITY_BACKGROUND
 from os.path import join, isfile, isdir
 from chessapp.util.paths import get_openings_folder
-from chessapp.model.node import Node
 from os import listdir
 from chessapp.util.fen import get_reduced_fen_from_board
+from chessapp.util.pgn import extract_lines
 
 
 class Updater(LogModule):
@@ -25,13 +24,15 @@ class Updater(LogModule):
             tree (ChessTree): the ChessTree to update
         """
         super().__init__(app, "Update", [create_method_action(
-            app, "Update Openings", self.update_openings)])
+            app, "Update Openings", self.update_openings, PRIORITY_BACKGROUND)])
         self.tree = tree
         self.app = app
 
     def update_openings(self):
         """ update the ChessTree from the sources folder.
         """
+        if not self.wait_until_ready(self.tree.loaded, "the tree"):
+            return
         self.log_message("updating...")
         for key in SourceType._member_map_:
             path = join(get_openings_folder(), "sources", key)
@@ -97,74 +98,27 @@ def import_pgn(app, tree: ChessTree, pgn: str, source: SourceType, about_to_clos
     for line in lines:
         app.show_status_message("found line: " + str(line))
         board = Board()
-        for san in line:
+        # each line is applied as one batch of the single writer (@see ChessTree.write)
+        with tree.write():
+            for san in line:
+                fen = get_reduced_fen_from_board(board)
+                tree.assure(fen)
+                try:
+                    board.push_san(san)
+                except IllegalMoveError:
+                    print(
+                        "cannot perform board.push_san(san) because an illegal move was performed")
+                    return
+                move = Move(tree, san, get_reduced_fen_from_board(
+                    board), source=source)
+                equivalent_move = tree.get(fen).get_equivalent_move(move)
+                if equivalent_move == None:
+                    tree.get(fen).add(move)
+                    equivalent_move = move
+                elif equivalent_move.source.value < source.value:
+                    # raises the source of the known move and notifies the observers of the tree
+                    tree.get(fen).add(move)
+                if count_frequency:
+                    tree.get(fen).increment_frequency(equivalent_move)
             fen = get_reduced_fen_from_board(board)
             tree.assure(fen)
-            try:
-                board.push_san(san)
-            except IllegalMoveError:
-                print(
-                    "cannot perform board.push_san(san) because an illegal move was performed")
-                return
-            move = Move(tree, san, get_reduced_fen_from_board(
-                board), source=source)
-            equivalent_move = tree.get(fen).get_equivalent_move(move)
-            if equivalent_move == None:
-                tree.get(fen).add(move)
-                equivalent_move = move
-            elif equivalent_move.source.value < source.value:
-                equivalent_move.source = source
-            if count_frequency:
-                equivalent_move.frequency += 1
-        fen = get_reduced_fen_from_board(board)
-        tree.assure(fen)
-
-
-def extract_lines_from_node(base_line: list[str], board: Board, node: Node, about_to_close):
-    """ extract all lines from a node
-
-    Args:
-        base_line (list[str]): the base line is a list of moves that was played before to reach this specific board state
-        board (Board): the board having the specific board state and all the desired variations
-        node (Node): the node that represents the board state
-        about_to_close (callable): callable that returns True if the module closes
-
-    Returns:
-        list[list[str]]: list of lines (variations) of chess moves extracted from the board
-    """
-    move_line: list[str] = base_line.copy()
-    move_line.append(board.san(node.move))
-    if len(node.variations) == 0:
-        return [move_line]
-    board.push(node.move)
-    lines = []
-    for n in node.variations:
-        if about_to_close():
-            break
-        for line in extract_lines_from_node(move_line, board, n, about_to_close):
-            if about_to_close():
-                break
-            lines.append(line)
-    board.pop()
-    return lines
-
-
-def extract_lines(pgn: str, about_to_close):
-    """ extract all lines from a pgn string
-
-    Args:
-        pgn (str): the pgn string
-        about_to_close (callable): callable that returns True if the module closes
-
-    Returns:
-        list[list[str]]: list of lines (variations) of chess moves extracted from the pgn string
-    """
-    input_str = io.StringIO(pgn)
-    game = read_game(input_str)
-    lines = []
-    while game != None and not about_to_close():
-        for node in game.variations:
-            for line in extract_lines_from_node([], Board(), node, about_to_close):
-                lines.append(line)
-        game = read_game(input_str)
-    return lines
@@ -0,0 +1,277 @@
+from chessapp.model.chesstree import ChessTree
+from chessapp.model.sourcetype import SourceType
+from chessapp.controller.engine import Engine
+from chessapp.controller.tablebase import Tablebase
+from chessapp.controller.analysispolicy import find_candidates, get_target_depth, get_source_rank, resolve_with_tablebase
+from chessapp.configuration import STR_DEFAULT_ENCODING
+from chess import Board
+from os import listdir, rename, remove, replace, getpid, utime
+from os.path import join, exists, getmtime
+from pathlib import Path
+from hashlib import sha1
+import socket
+import json
+import time
+import traceback
+
+# a work unit directory contains the following subfolders. moving a file between them with os.rename is atomic as long as
+# the directory is located on a single file system, which makes it safe for several workers (even on different machines
+# sharing the directory) to claim units concurrently.
+s_pending_folder_name = "pending"
+s_claimed_folder_name = "claimed"
+s_results_folder_name = "results"
+s_merged_folder_name = "merged"
+s_work_unit_suffix = ".json"
+s_stale_claim_seconds = 24 * 60 * 60
+s_worker_idle_seconds = 5
+
+
+def get_unit_file_name(fen: str, source: SourceType) -> str:
+    """ the file name of a work unit. file names sort like the sources of the Analyser (@see
+    chessapp.controller.analysispolicy.get_source_rank) so that workers take the units in the order the Analyser would analyse them.
+    the fen is hashed because it contains characters that are not allowed in file names.
+
+    Args:
+        fen (str): the fen of the position
+        source (SourceType): the source of the position
+
+    Returns:
+        str: the file name of the work unit
+    """
+    return str(get_source_rank(source)).zfill(3) + "_" + sha1(fen.encode(STR_DEFAULT_ENCODING)).hexdigest() + s_work_unit_suffix
+
+
+def assure_work_unit_folders(folder: str):
+    """ creates the subfolders of the work unit directory if they do not exist
+
+    Args:
+        folder (str): the work unit directory
+    """
+    for name in (s_pending_folder_name, s_claimed_folder_name, s_results_folder_name, s_merged_folder_name):
+        Path(join(folder, name)).mkdir(parents=True, exist_ok=True)
+
+
+def write_json_atomic(file_path: str, data: dict):
+    """ writes data as json into a temporary file and moves it to file_path so that readers never see a partial file
+
+    Args:
+        file_path (str): the destination
+        data (dict): the data
+    """
+    temp_file_path = file_path + ".tmp" + str(getpid())
+    with open(temp_file_path, "w", encoding=STR_DEFAULT_ENCODING) as file:
+        json.dump(data, file)
+    replace(temp_file_path, file_path)
+
+
+def read_json(file_path: str) -> dict:
+    """
+    Args:
+        file_path (str): path of a json file
+
+    Returns:
+        dict: the content of the file
+    """
+    with open(file_path, "r", encoding=STR_DEFAULT_ENCODING) as file:
+        return json.load(file)
+
+
+def is_unit_file(name: str) -> bool:
+    """
+    Args:
+        name (str): a file name
+
+    Returns:
+        bool: True if the name is the name of a (pending or result) work unit file
+    """
+    return name.endswith(s_work_unit_suffix)
+
+
+def export_work_units(tree: ChessTree, folder: str, max_positions: int, about_to_close=lambda: False, tablebase: Tablebase = None) -> int:
+    """ exports the positions of the tree that need analysis (@see chessapp.controller.analysispolicy.find_candidates) as work
+    units into the pending folder of the given directory. positions that already have a pending, claimed or unmerged unit are skipped
+    before max_positions is applied, so every export adds new units as long as there are candidates left. a work unit is a json file
+    containing the fen, the target depth, the source and its priority (its rank in the source order, lower ranks are taken first).
+
+    Args:
+        tree (ChessTree): the tree to export from
+        folder (str): the work unit directory
+        max_positions (int): maximum amount of positions to export
+        about_to_close (callable, optional): callable that returns True if the export should be aborted
+        tablebase (Tablebase, optional): Defaults to None. positions contained in the tablebase are resolved instead of exported
+
+    Returns:
+        int: amount of exported work units
+    """
+    assure_work_unit_folders(folder)
+    claimed = set(name.split(s_work_unit_suffix)[0] + s_work_unit_suffix
+                  for name in listdir(join(folder, s_claimed_folder_name)))
+    resolve_with_tablebase(tree, tablebase, about_to_close)
+    exported = 0
+
+    def is_exported(fen: str, node) -> bool:
+        name = get_unit_file_name(fen, node.source())
+        return name in claimed or exists(join(folder, s_pending_folder_name, name)) or exists(join(folder, s_results_folder_name, name))
+    for fen in find_candidates(tree, max_positions, about_to_close, skip=is_exported):
+        source = tree.nodes[fen].source()
+        name = get_unit_file_name(fen, source)
+        write_json_atomic(join(folder, s_pending_folder_name, name), {
+            "fen": fen,
+            "target_depth": get_target_depth(source),
+            "source": source.sformat(),
+            "priority": get_source_rank(source)
+        })
+        exported += 1
+    return exported
+
+
+def get_worker_id() -> str:
+    """
+    Returns:
+        str: an id that is unique for this process across machines
+    """
+    return socket.gethostname() + "-" + str(getpid())
+
+
+def claim_work_unit(folder: str, worker_id: str) -> str | None:
+    """ claims the pending work unit with the highest priority (the lowest rank, @see get_unit_file_name) by moving it into the
+    claimed folder.
+
+    Args:
+        folder (str): the work unit directory
+        worker_id (str): id of the claiming worker (@see get_worker_id)
+
+    Returns:
+        str | None: path of the claimed unit file or None if there is no pending unit left
+    """
+    pending_folder = join(folder, s_pending_folder_name)
+    for name in sorted(filter(is_unit_file, listdir(pending_folder))):
+        claimed_path = join(folder, s_claimed_folder_name,
+                            name + "." + worker_id)
+        try:
+            rename(join(pending_folder, name), claimed_path)
+        except (FileNotFoundError, FileExistsError, PermissionError):
+            # another worker was faster
+            continue
+        # the modification time marks the time of the claim (@see requeue_stale_claims)
+        utime(claimed_path)
+        return claimed_path
+    return None
+
+
+def release_claim(folder: str, claimed_path: str):
+    """ moves a claimed work unit back into the pending folder (e.g. if analysing it failed)
+
+    Args:
+        folder (str): the work unit directory
+        claimed_path (str): path of the claimed unit file
+    """
+    name = Path(claimed_path).name.split(s_work_unit_suffix)[
+        0] + s_work_unit_suffix
+    rename(claimed_path, join(folder, s_pending_folder_name, name))
+
+
+def requeue_stale_claims(folder: str, max_age_seconds: int = s_stale_claim_seconds) -> int:
+    """ moves claimed units that are older than max_age_seconds back into the pending folder. use this to recover units of
+    workers that crashed or were stopped.
+
+    Args:
+        folder (str): the work unit directory
+        max_age_seconds (int, optional): Defaults to s_stale_claim_seconds. claims older than this are considered stale
+
+    Returns:
+        int: amount of requeued units
+    """
+    assure_work_unit_folders(folder)
+    requeued = 0
+    claimed_folder = join(folder, s_claimed_folder_name)
+    for name in listdir(claimed_folder):
+        path = join(claimed_folder, name)
+        try:
+            if time.time() - getmtime(path) >= max_age_seconds:
+                release_claim(folder, path)
+                requeued += 1
+        except FileNotFoundError:
+            continue
+    return requeued
+
+
+def process_work_units(folder: str, engine: Engine, time_seconds: int, wait_for_units: bool = False, log=print, about_to_close=lambda: False) -> int:
+    """ claims and analyses work units until there are no pending units left (or forever if wait_for_units is True). the result
+    of each unit is written into the results folder as json file containing fen, eval, eval_depth and is_mate.
+
+    Args:
+        folder (str): the work unit directory
+        engine (Engine): the engine to analyse with
+        time_seconds (int): seconds the engine is given per position
+        wait_for_units (bool, optional): Defaults to False. if True, the worker waits for new units instead of returning
+        log (callable, optional): Defaults to print. receives log messages as str
+        about_to_close (callable, optional): callable that returns True if the worker should stop
+
+    Returns:
+        int: amount of processed work units
+    """
+    assure_work_unit_folders(folder)
+    worker_id = get_worker_id()
+    processed = 0
+    while not about_to_close():
+        claimed_path = claim_work_unit(folder, worker_id)
+        if not claimed_path:
+            if not wait_for_units:
+                break
+            time.sleep(s_worker_idle_seconds)
+            continue
+        try:
+            unit = read_json(claimed_path)
+            log(" ".join(("evaluating position", unit["fen"], "(" + unit["source"] + ") at depth",
+                str(unit["target_depth"]), "for up to", str(time_seconds), "seconds")))
+            score_eval, score_depth, is_mate = engine.score(
+                Board(unit["fen"]), time_seconds, unit["target_depth"])
+        except Exception:
+            print("error while processing work unit " + claimed_path)
+            print(traceback.format_exc())
+            release_claim(folder, claimed_path)
+            break
+        result_name = Path(claimed_path).name.split(s_work_unit_suffix)[
+            0] + s_work_unit_suffix
+        write_json_atomic(join(folder, s_results_folder_name, result_name), {
+            "fen": unit["fen"],
+            "eval": score_eval,
+            "eval_depth": score_depth,
+            "is_mate": is_mate,
+            "worker": worker_id
+        })
+        remove(claimed_path)
+        processed += 1
+    return processed
+
+
+def merge_results(tree: ChessTree, folder: str, log=print) -> int:
+    """ merges all result files of the work unit directory into the tree with the semantics of Node.update (deeper evaluations
+    or mates win). merged result files are moved into the merged folder.
+
+    Args:
+        tree (ChessTree): the tree to merge into
+        folder (str): the work unit directory
+        log (callable, optional): Defaults to print. receives log messages as str
+
+    Returns:
+        int: amount of merged result files
+    """
+    assure_work_unit_folders(folder)
+    results_folder = join(folder, s_results_folder_name)
+    merged = 0
+    for name in sorted(filter(is_unit_file, listdir(results_folder))):
+        path = join(results_folder, name)
+        try:
+            result = read_json(path)
+        except Exception:
+            print("error while reading result " + path)
+            print(traceback.format_exc())
+            continue
+        tree.get(result["fen"]).update(
+            float(result["eval"]), int(result["eval_depth"]), bool(result["is_mate"]))
+        replace(path, join(folder, s_merged_folder_name, name))
+        merged += 1
+    log(" ".join(("merged", str(merged), "results")))
+    return merged
@@ -0,0 +1,130 @@
+from chessapp.model.chesstree import ChessTree, TreeObserver
+from chessapp.model.node import Node
+from chessapp.model.move import Move
+from threading import Lock
+
+
+class AcceptableMoveIndex(TreeObserver):
+    """ caches the acceptable moves of the nodes of a tree (@see Node.is_acceptable_move) so that the quiz looks them up in constant time
+    instead of resolving the evaluations of all moves of a node at every step. the index registers itself as observer of the tree and
+    invalidates the entries that depend on a changed node: an evaluation of a node is used by the node itself (as the evaluation of the best
+    move) and by its parents (as the evaluation of a move), the moves of a node only by the node. invalidated entries are computed again on
+    their next lookup.
+    """
+
+    def __init__(self, tree: ChessTree):
+        """ creates an empty index and registers it as observer of the tree. call build to compute the entries of all nodes in advance.
+
+        Args:
+            tree (ChessTree): the tree
+        """
+        self.tree: ChessTree = tree
+        # fen -> sans of the acceptable moves of the node
+        self.entries: dict[str, frozenset[str]] = {}
+        # incremented by every invalidation. an entry is only stored if no invalidation happened while it was computed.
+        self.version: int = 0
+        self.lock = Lock()
+        tree.add_observer(self)
+
+    def close(self):
+        """ unregisters the index from the tree
+        """
+        self.tree.remove_observer(self)
+
+    def get_acceptable_sans(self, node: Node) -> frozenset[str]:
+        """
+        Args:
+            node (Node): a node of the tree
+
+        Returns:
+            frozenset[str]: the sans of the acceptable moves of the node
+        """
+        sans = self.entries.get(node.state)
+        if sans != None:
+            return sans
+        version = self.version
+        sans = frozenset(
+            move.san for move in node.moves if node.is_acceptable_move(move))
+        with self.lock:
+            if version == self.version:
+                self.entries[node.state] = sans
+        return sans
+
+    def is_acceptable_move(self, node: Node, move: Move) -> bool:
+        """ @see Node.is_acceptable_move
+
+        Args:
+            node (Node): a node of the tree
+            move (Move): a move of the node
+
+        Returns:
+            bool: True if the move is acceptable, False otherwise
+        """
+        return move.san in self.get_acceptable_sans(node)
+
+    def has_acceptable_move(self, node: Node) -> bool:
+        """ @see Node.has_acceptable_move
+
+        Args:
+            node (Node): a node of the tree
+
+        Returns:
+            bool: True if the node has at least one acceptable move, False otherwise
+        """
+        return len(self.get_acceptable_sans(node)) > 0
+
+    def build(self, about_to_close=lambda: False) -> int:
+        """ computes the entries of all nodes with moves that are not cached yet
+
+        Args:
+            about_to_close (callable, optional): callable that returns True if the computation should be aborted
+
+        Returns:
+            int: amount of computed entries
+        """
+        computed = 0
+        # iterate a snapshot, other threads may add nodes in the meantime (@see ChessTree.snapshot)
+        for fen, node in self.tree.snapshot().items():
+            if about_to_close():
+                break
+            if node.has_move() and not fen in self.entries:
+                self.get_acceptable_sans(node)
+                computed += 1
+        return computed
+
+    def invalidate(self, fens: list[str]):
+        """ removes the entries of the given nodes
+
+        Args:
+            fens (list[str]): fens of the nodes
+        """
+        with self.lock:
+            self.version += 1
+            for fen in fens:
+                self.entries.pop(fen, None)
+
+    def on_eval_changed(self, node: Node):
+        """ @see TreeObserver.on_eval_changed. the entries of the node and of its parents are invalidated.
+
+        Args:
+            node (Node): the changed node
+        """
+        self.invalidate([node.state] + [backlink.node.state for backlink in node.backlinks])
+
+    def on_moves_changed(self, node: Node):
+        """ @see TreeObserver.on_moves_changed. the entry of the node is invalidated.
+
+        Args:
+            node (Node): the changed node
+        """
+        self.invalidate([node.state])
+
+    def on_loaded(self):
+        """ @see TreeObserver.on_loaded. all entries are invalidated.
+        """
+        with self.lock:
+            self.version += 1
+            self.entries = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
@@ -6,6 +6,49 @@ from chess import Board
 from chessapp.util.paths import assure_file
 from chessapp.configuration import STR_DEFAULT_ENCODING
 from chessapp.util.fen import get_reduced_fen_from_board
+from threading import RLock, Event, get_ident
+from os.path import getsize
+from contextlib import contextmanager
+from collections import deque
+
+# rows of the csv files that are loaded per write batch (@see ChessTree.write)
+s_load_batch_size = 1000
+
+
+class TreeObserver:
+    """ base class for objects that want to be notified about changes of the nodes of a ChessTree. override the methods of interest
+    and register the observer with ChessTree.add_observer.
+    """
+
+    def on_eval_changed(self, node: Node):
+        """ called after the evaluation of the node has changed (@see Node.update)
+
+        Args:
+            node (Node): the changed node
+        """
+        pass
+
+    def on_moves_changed(self, node: Node):
+        """ called after a move was added to the node or the source of a move of the node changed (@see Node.add)
+
+        Args:
+            node (Node): the changed node
+        """
+        pass
+
+    def on_frequency_changed(self, node: Node):
+        """ called after the frequency of a move of the node has changed (@see Node.increment_frequency)
+
+        Args:
+            node (Node): the changed node
+        """
+        pass
+
+    def on_loaded(self):
+        """ called after ChessTree.load has finished. the changes made by load are not notified one by one, so observers that cache
+        values derived from the nodes drop them here.
+        """
+        pass
 
 
 class ChessTree:
@@ -26,6 +69,12 @@ class ChessTree:
     - SourceType: the source of the move (@see chessapp.model.sourcetype.SourceType)
     - frequency: the frequency of the move (how often it was played in the database)
     - result fen: the fen of the resulting position after the move is played
+
+    The tree is shared by the threads of the threadpool and follows a single-writer model: all mutations (creating nodes, Node.update,
+    Node.add and changes of moves) are applied while holding the write lock, so at most one thread writes at a time and a batch of
+    mutations (@see write) is applied atomically. Readers never take the lock for single lookups. The lists of a node (moves, backlinks)
+    are replaced instead of changed (copy-on-write), so iterating them never sees a concurrent write. Long scans over all nodes iterate a
+    snapshot (@see snapshot) and therefore neither block writers nor fail because nodes are added while they run.
     """
 
     def __init__(self, save_folder_path: str):
@@ -36,6 +85,12 @@ class ChessTree:
             save_folder_path (str): _description_
         """
         self.nodes = {}
+        self.write_lock = RLock()
+        # set once load has finished. trees that are loaded in the background can be used by waiting for it.
+        self.loaded = Event()
+        self.observers: list[TreeObserver] = []
+        # id of the thread that runs load. its changes are not notified (@see load)
+        self.loading_thread: int = None
         self.save_folder_path = save_folder_path
         self.position_eval_file_name = "position_eval.csv"
         self.moves_file_name = "moves.csv"
@@ -43,7 +98,78 @@ class ChessTree:
     def clear(self) -> None:
         """ "forgets" all nodes
         """
-        self.nodes = {}
+        with self.write_lock:
+            self.nodes = {}
+
+    @contextmanager
+    def write(self):
+        """ applies the mutations in the body of the with statement as one batch: no other thread writes to the tree in between and
+        snapshots (@see snapshot) contain either none or all of the nodes the batch adds. readers that do not hold the write lock may see
+        a part of the changed values of a batch, but never a torn value of a single node: moves and backlinks are copy-on-write and an
+        evaluation is replaced as a whole (@see Node). keep batches short, other writers wait for them.
+        """
+        with self.write_lock:
+            yield self
+
+    def snapshot(self) -> dict[str, Node]:
+        """ returns a consistent copy of the mapping of fens to nodes that can be iterated while other threads write to the tree.
+        copying is cheap compared to a scan over the nodes; the nodes themselves are shared, not copied.
+
+        Returns:
+            dict[str, Node]: the nodes of the tree at the time of the call
+        """
+        with self.write_lock:
+            return dict(self.nodes)
+
+    def add_observer(self, observer: TreeObserver):
+        """ registers an observer that is notified about changes of the nodes of this tree
+
+        Args:
+            observer (TreeObserver): the observer
+        """
+        self.observers.append(observer)
+
+    def remove_observer(self, observer: TreeObserver):
+        """ unregisters an observer
+
+        Args:
+            observer (TreeObserver): the observer
+        """
+        if observer in self.observers:
+            self.observers.remove(observer)
+
+    def notify_eval_changed(self, node: Node):
+        """ notifies all observers that the evaluation of the node has changed
+
+        Args:
+            node (Node): the changed node
+        """
+        if self.loading_thread == get_ident():
+            return
+        for observer in self.observers:
+            observer.on_eval_changed(node)
+
+    def notify_moves_changed(self, node: Node):
+        """ notifies all observers that a move was added to the node
+
+        Args:
+            node (Node): the changed node
+        """
+        if self.loading_thread == get_ident():
+            return
+        for observer in self.observers:
+            observer.on_moves_changed(node)
+
+    def notify_frequency_changed(self, node: Node):
+        """ notifies all observers that the frequency of a move of the node has changed
+
+        Args:
+            node (Node): the changed node
+        """
+        if self.loading_thread == get_ident():
+            return
+        for observer in self.observers:
+            observer.on_frequency_changed(node)
 
     def get(self, fen: str) -> Node:
         """ Returns the node with the given fen. If the node does not exist, it is created.
@@ -63,8 +189,11 @@ class ChessTree:
         Args:
             fen (str): the fen
         """
-        if not fen in self.nodes:
-            self.nodes[fen] = Node(self, fen)
+        if fen in self.nodes:
+            return
+        with self.write_lock:
+            if not fen in self.nodes:
+                self.nodes[fen] = Node(self, fen)
 
     def position_evaluation_file_path(self) -> str:
         """
@@ -80,67 +209,209 @@ class ChessTree:
         """
         return self.save_folder_path + "/" + self.moves_file_name
 
-    def load_position_evaluation(self, encoding: str):
-        """ Loads the position_eval.csv file and creates the corresponding nodes.
+    def load_position_evaluation(self, encoding: str, on_read=None):
+        """ Loads the position_eval.csv file and creates the corresponding nodes. The rows are applied in batches of
+        s_load_batch_size rows (@see write). Nodes that already exist (e.g. created by another thread while the tree loads in the
+        background) are kept and updated.
 
         Args:
             encoding (str): the encoding of the file
+            on_read (callable, optional): Defaults to None. called with the amount of characters read after each batch
         """
         assure_file(self.position_evaluation_file_path())
         with open(self.position_evaluation_file_path(), "r", encoding=encoding) as f:
             # fen; eval; eval_depth; is_mate
-            reader = csv.reader(f, delimiter=';')
-            for row in reader:
-                self.nodes[row[0]] = Node(self, row[0], float(
-                    row[1]), int(row[2]), row[3] == "True")
+            lines = CharacterCounter(f, on_read)
+            reader = csv.reader(lines, delimiter=';')
+            for rows in read_batches(reader):
+                with self.write():
+                    for row in rows:
+                        if row[0] in self.nodes:
+                            self.nodes[row[0]].update(float(
+                                row[1]), int(row[2]), row[3] == "True")
+                        else:
+                            self.nodes[row[0]] = Node(self, row[0], float(
+                                row[1]), int(row[2]), row[3] == "True")
+                lines.report()
 
-    def load_moves(self, encoding: str):
-        """ Loads the moves.csv file and creates the corresponding moves (and nodes if needed).
+    def load_moves(self, encoding: str, on_read=None):
+        """ Loads the moves.csv file and creates the corresponding moves (and nodes if needed). The rows are applied in batches of
+        s_load_batch_size rows (@see write).
 
         Args:
             encoding (str): the encoding of the file
+            on_read (callable, optional): Defaults to None. called with the amount of characters read after each batch
         """
         assure_file(self.moves_file_path())
         with open(self.moves_file_path(), "r", encoding=encoding) as f:
             # fen; move; comment; SourceType; frequency;result fen
-            reader = csv.reader(f, delimiter=';')
-            for row in reader:
-                if len(row) >= 6:
-                    result_fen = row[5]
-                else:
-                    # recover result_fen from san
-                    board = Board(fen=row[0])
-                    board.push_san(row[1])
-                    result_fen = get_reduced_fen_from_board(board)
-                move = Move(self, row[1], result_fen, row[2],
-                            SourceType.from_str(row[3]), int(row[4]))
-                self.get(row[0]).add(move)
-                self.assure(result_fen)
-
-    def load(self, encoding: str = STR_DEFAULT_ENCODING):
-        """ loads the tree from the position_eval.csv and moves.csv files
+            lines = CharacterCounter(f, on_read)
+            reader = csv.reader(lines, delimiter=';')
+            for rows in read_batches(reader):
+                with self.write():
+                    for row in rows:
+                        if len(row) >= 6:
+                            result_fen = row[5]
+                        else:
+                            # recover result_fen from san
+                            board = Board(fen=row[0])
+                            board.push_san(row[1])
+                            result_fen = get_reduced_fen_from_board(board)
+                        move = Move(self, row[1], result_fen, row[2],
+                                    SourceType.from_str(row[3]), int(row[4]))
+                        self.get(row[0]).add(move)
+                        self.assure(result_fen)
+                lines.report()
+
+    def load(self, encoding: str = STR_DEFAULT_ENCODING, on_progress=None):
+        """ loads the tree from the position_eval.csv and moves.csv files and sets loaded afterwards. observers are usually registered
+        before the tree loads in the background. notifying them about every loaded row would be slow and wasted work, so the changes made
+        by load are not notified and the observers are told once when load has finished (@see TreeObserver.on_loaded). changes of other
+        threads in the meantime are notified as usual.
 
         Args:
             encoding (str, optional): Defaults to STR_DEFAULT_ENCODING. the encoding of the files
+            on_progress (callable, optional): Defaults to None. called with the amount of bytes read and the size of both files in bytes
+                after each batch (@see s_load_batch_size). characters are counted as bytes, which is exact for the ascii files of a tree.
         """
-        self.load_position_evaluation(encoding)
-        self.load_moves(encoding)
+        assure_file(self.position_evaluation_file_path())
+        assure_file(self.moves_file_path())
+        evaluation_size = getsize(self.position_evaluation_file_path())
+        total_size = evaluation_size + getsize(self.moves_file_path())
+        self.loading_thread = get_ident()
+        try:
+            self.load_position_evaluation(encoding, None if on_progress == None else lambda read: on_progress(
+                read, total_size))
+            self.load_moves(encoding, None if on_progress == None else lambda read: on_progress(
+                evaluation_size + read, total_size))
+        finally:
+            self.loading_thread = None
+        for observer in list(self.observers):
+            observer.on_loaded()
+        self.loaded.set()
 
     def save(self):
-        """ saves the tree to the position_eval.csv and moves.csv files
+        """ saves the tree to the position_eval.csv and moves.csv files. the nodes are written from a snapshot (@see snapshot), so
+        other threads can keep writing to the tree while it is saved.
         """
+        nodes = self.snapshot()
         with open(self.moves_file_path(), "w", encoding=STR_DEFAULT_ENCODING) as file:
-            for fen in self.nodes:
-                for move in self.nodes[fen].moves:
+            for fen in nodes:
+                for move in nodes[fen].moves:
                     file.write("\"" + fen + "\";\"" + move.san +
                                "\";\"" + move.comment + "\";\"" + move.source.sformat() + "\";\"" +
                                str(move.frequency) + "\";\"" + str(move.result) + "\"\n")
             file.flush()
             file.close()
         with open(self.position_evaluation_file_path(), "w", encoding=STR_DEFAULT_ENCODING) as file:
-            for fen in self.nodes:
-                node = self.nodes[fen]
-                file.write("\"" + fen + "\";\"" + str(node.eval) +
-                           "\";\"" + str(node.eval_depth) + "\";\"" + str(node.is_mate) + "\"\n")
+            for fen in nodes:
+                # read once, the evaluation of a node is replaced as a whole (@see Node.update)
+                evaluation = nodes[fen].evaluation
+                file.write("\"" + fen + "\";\"" + str(evaluation.eval) +
+                           "\";\"" + str(evaluation.eval_depth) + "\";\"" + str(evaluation.is_mate) + "\"\n")
             file.flush()
             file.close()
+
+
+def follow_line(tree: ChessTree, line: list[str]) -> str:
+    """ follows the moves of the line from the start position through the tree. no nodes are created.
+
+    Args:
+        tree (ChessTree): the tree
+        line (list[str]): moves in san format
+
+    Returns:
+        str: reduced fen of the position the line leads to or None if the tree does not contain a move of the line
+    """
+    fen = get_reduced_fen_from_board(Board())
+    for san in line:
+        node = tree.nodes.get(fen)
+        move = node.get_move_by_san(san) if node != None else None
+        if move == None:
+            return None
+        fen = move.result
+    return fen
+
+
+def find_line(tree: ChessTree, fen: str, max_plies: int) -> list[str]:
+    """ finds a shortest line from the start position to the position by following the backlinks of the tree. positions that are not
+    contained in the tree are skipped, no nodes are created.
+
+    Args:
+        tree (ChessTree): the tree
+        fen (str): reduced fen of the position
+        max_plies (int): lines longer than this are not searched
+
+    Returns:
+        list[str]: the moves of the line in san format or None if the start position is not reached within max_plies
+    """
+    start_fen = get_reduced_fen_from_board(Board())
+    # fen -> (fen of the next position towards the target, san of the move leading there)
+    successors = {fen: None}
+    frontier = deque([(fen, 0)])
+    while len(frontier) > 0:
+        current, plies = frontier.popleft()
+        if current == start_fen:
+            line = []
+            while successors[current] != None:
+                current, san = successors[current]
+                line.append(san)
+            return line
+        if plies >= max_plies:
+            continue
+        node = tree.nodes.get(current)
+        if node == None:
+            continue
+        for backlink in node.backlinks:
+            previous = backlink.node.state
+            if not previous in successors:
+                successors[previous] = (current, backlink.move.san)
+                frontier.append((previous, plies + 1))
+    return None
+
+
+def read_batches(reader, batch_size: int = s_load_batch_size):
+    """ splits the rows of the reader into lists of at most batch_size rows
+
+    Args:
+        reader (iterable): the rows (e.g. a csv.reader)
+        batch_size (int, optional): Defaults to s_load_batch_size. the maximum amount of rows per list
+
+    Yields:
+        list: the next rows
+    """
+    rows = []
+    for row in reader:
+        rows.append(row)
+        if len(rows) >= batch_size:
+            yield rows
+            rows = []
+    if len(rows) > 0:
+        yield rows
+
+
+class CharacterCounter:
+    """ iterates the lines of a file and counts the characters read so far (the position of a text file cannot be told while it is
+    iterated)
+    """
+
+    def __init__(self, file, on_read=None):
+        """
+        Args:
+            file (TextIO): the file
+            on_read (callable, optional): Defaults to None. called with the amount of characters read by report
+        """
+        self.file = file
+        self.on_read = on_read
+        self.read: int = 0
+
+    def __iter__(self):
+        for line in self.file:
+            self.read += len(line)
+            yield line
+
+    def report(self):
+        """ calls on_read with the amount of characters read so far
+        """
+        if self.on_read:
+            self.on_read(self.read)
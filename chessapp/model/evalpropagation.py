@@ -0,0 +1,240 @@
+from chessapp.model.chesstree import ChessTree, TreeObserver
+from chessapp.model.node import Node, Evaluation
+from threading import RLock
+
+
+def get_node_evaluation(node: Node) -> Evaluation | None:
+    """
+    Args:
+        node (Node): a node
+
+    Returns:
+        Evaluation | None: the engine evaluation of the node itself or None if it has not been evaluated
+    """
+    # read once, the evaluation of a node is replaced as a whole (@see Node.update)
+    evaluation = node.evaluation
+    if evaluation.eval_depth < 0 and not evaluation.is_mate:
+        return None
+    return evaluation
+
+
+def is_deeper(evaluation: Evaluation, other: Evaluation | None) -> bool:
+    """ compares two evaluations with the semantics of Node.update (deeper or mate wins)
+
+    Args:
+        evaluation (Evaluation): the evaluation
+        other (Evaluation | None): the evaluation to compare to
+
+    Returns:
+        bool: True if evaluation replaces other
+    """
+    return other == None or evaluation.eval_depth > other.eval_depth or (evaluation.is_mate and not other.is_mate)
+
+
+class EvalPropagator(TreeObserver):
+    """ derives the value of each node of a tree from the evaluations of its children (minimax over Node.moves). the derived value of a
+    node is the best value for the turn player amongst its evaluated children at the depth of that child + 1. the value of a child is
+    its own evaluation or its derived value, whichever is deeper (@see Node.update).
+
+    the derived values are kept separate from the evaluations of the nodes because a node usually only knows some of its legal moves:
+    a derived value is a lower bound for the turn player. the only exceptions are forced mates in favour of the turn player, which cannot
+    be improved upon. @see is_determined.
+
+    positions can repeat, so the tree can contain cycles. an edge that leads back onto the current search path is ignored. the propagator
+    registers itself as observer of the tree and updates the derived values incrementally when an evaluation or the moves of a node change.
+
+    the observer methods run on the thread that writes to the tree while propagate_all may run on another one, so both change the derived
+    values with the lock of the propagator held. observers are called with the write lock of the tree held, so the lock of the propagator
+    is always taken after the write lock and never the other way round.
+    """
+
+    def __init__(self, tree: ChessTree):
+        """ creates the propagator and registers it as observer of the tree. call propagate_all to compute the initial values.
+
+        Args:
+            tree (ChessTree): the tree
+        """
+        self.tree: ChessTree = tree
+        self.derived: dict[str, Evaluation] = {}
+        self.lock = RLock()
+        tree.add_observer(self)
+
+    def close(self):
+        """ unregisters the propagator from the tree
+        """
+        self.tree.remove_observer(self)
+
+    def get_value(self, node: Node) -> Evaluation | None:
+        """
+        Args:
+            node (Node): a node
+
+        Returns:
+            Evaluation | None: the deeper one of the evaluation of the node and its derived value or None if neither exists
+        """
+        own = get_node_evaluation(node)
+        derived = self.derived.get(node.state)
+        if derived != None and is_deeper(derived, own):
+            return derived
+        return own
+
+    def derive(self, node: Node, ignored_fens=()) -> Evaluation | None:
+        """ derives the value of the node from the current values of its children
+
+        Args:
+            node (Node): the node
+            ignored_fens (collection, optional): fens of children that are ignored (e.g. because they are on the current search path)
+
+        Returns:
+            Evaluation | None: the derived value or None if no child has a value
+        """
+        is_white_turn = node.is_white_turn()
+        best: Evaluation = None
+        for move in node.moves:
+            if move.result in ignored_fens or move.result == node.state:
+                continue
+            child = self.tree.nodes.get(move.result)
+            if child == None:
+                continue
+            value = self.get_value(child)
+            if value == None:
+                continue
+            if best == None or value.is_better_than(best, is_white_turn) or (value.eval == best.eval and value.eval_depth > best.eval_depth):
+                best = value
+        if best == None:
+            return None
+        return Evaluation(best.eval, best.eval_depth + 1, best.is_mate)
+
+    def set_derived(self, node: Node, value: Evaluation | None) -> bool:
+        """ stores the derived value of the node. must be called with the lock held.
+
+        Args:
+            node (Node): the node
+            value (Evaluation | None): the derived value
+
+        Returns:
+            bool: True if the stored value changed
+        """
+        if value == self.derived.get(node.state):
+            return False
+        if value == None:
+            del self.derived[node.state]
+        else:
+            self.derived[node.state] = value
+        return True
+
+    def propagate_all(self, about_to_close=lambda: False):
+        """ computes the derived values of all nodes with an iterative post-order traversal (children before parents). incremental
+        updates of other threads wait until it is done.
+
+        Args:
+            about_to_close (callable, optional): callable that returns True if the computation should be aborted
+        """
+        # the snapshot takes the write lock of the tree, so it is taken before the lock of the propagator (@see EvalPropagator)
+        nodes = self.tree.snapshot()
+        with self.lock:
+            self.derived = {}
+            done = set()
+            on_path = set()
+            # iterate a snapshot, other threads may add nodes in the meantime (@see ChessTree.snapshot)
+            for root in nodes:
+                if root in done:
+                    continue
+                if about_to_close():
+                    return
+                on_path.add(root)
+                stack = [(root, 0)]
+                while len(stack) > 0:
+                    fen, index = stack[-1]
+                    node: Node = self.tree.nodes[fen]
+                    if index < len(node.moves):
+                        stack[-1] = (fen, index + 1)
+                        child_fen = node.moves[index].result
+                        if not child_fen in done and not child_fen in on_path and child_fen in self.tree.nodes:
+                            on_path.add(child_fen)
+                            stack.append((child_fen, 0))
+                        continue
+                    stack.pop()
+                    on_path.remove(fen)
+                    self.set_derived(node, self.derive(node, on_path))
+                    done.add(fen)
+
+    def update_ancestors(self, node: Node):
+        """ recomputes the derived values of the parents of the node (@see Node.backlinks) and, as long as values change, the values
+        of their ancestors. each node is recomputed at most once per call which bounds the work in cycles.
+
+        Args:
+            node (Node): the node whose value changed
+        """
+        with self.lock:
+            visited = set([node.state])
+            worklist = [backlink.node for backlink in node.backlinks]
+            while len(worklist) > 0:
+                current: Node = worklist.pop()
+                if current.state in visited:
+                    continue
+                visited.add(current.state)
+                if self.set_derived(current, self.derive(current)):
+                    for backlink in current.backlinks:
+                        worklist.append(backlink.node)
+
+    def on_eval_changed(self, node: Node):
+        """ @see TreeObserver.on_eval_changed. the value of the node itself changed, so its ancestors are updated.
+
+        Args:
+            node (Node): the changed node
+        """
+        self.update_ancestors(node)
+
+    def on_moves_changed(self, node: Node):
+        """ @see TreeObserver.on_moves_changed. the node got a new child, so its derived value and, if that changed, its ancestors
+        are updated.
+
+        Args:
+            node (Node): the changed node
+        """
+        with self.lock:
+            if self.set_derived(node, self.derive(node)):
+                self.update_ancestors(node)
+
+    def is_determined(self, node: Node, target_depth: int) -> bool:
+        """ checks whether the value of the node is already determined by the analysis of its children so that analysing the node
+        itself up to target_depth is not necessary. this is the case if the children prove a forced mate for the turn player or if
+        the derived value reaches target_depth and confirms the own (shallower) evaluation of the node, meaning the best known child
+        is at least as good for the turn player as the node's own evaluation. without an own evaluation a derived value is only a
+        lower bound and therefore not sufficient.
+
+        Args:
+            node (Node): the node
+            target_depth (int): the depth the node should be evaluated at
+
+        Returns:
+            bool: True if the node does not need to be analysed up to target_depth
+        """
+        derived = self.derived.get(node.state)
+        if derived == None:
+            return False
+        is_white_turn = node.is_white_turn()
+        if derived.is_mate_for(is_white_turn):
+            return True
+        own = get_node_evaluation(node)
+        if own == None or derived.eval_depth < target_depth:
+            return False
+        return not own.is_better_than(derived, is_white_turn)
+
+    def count_determined(self, target_depth_function) -> int:
+        """
+        Args:
+            target_depth_function (callable): returns the target depth of a node
+
+        Returns:
+            int: amount of nodes that are determined @see is_determined
+        """
+        count = 0
+        with self.lock:
+            fens = list(self.derived)
+        for fen in fens:
+            node = self.tree.nodes.get(fen)
+            if node != None and self.is_determined(node, target_depth_function(node)):
+                count += 1
+        return count
@@ -0,0 +1,157 @@
+from chessapp.model.chesstree import ChessTree, TreeObserver
+from chessapp.model.node import Node
+from chessapp.model.move import Move
+from random import Random
+from threading import Lock
+
+
+class AliasTable:
+    """ a Walker alias table of weights (Vose's method). it is built in O(n) and draws an index with a probability proportional to its
+    weight in O(1).
+    """
+
+    def __init__(self, weights: list[float]):
+        """
+        Args:
+            weights (list[float]): the weights, at least one of them must be positive
+        """
+        size = len(weights)
+        total = sum(weights)
+        self.probabilities: list[float] = [0.0] * size
+        self.aliases: list[int] = [0] * size
+        scaled = [weight * size / total for weight in weights]
+        small = [i for i, weight in enumerate(scaled) if weight < 1]
+        large = [i for i, weight in enumerate(scaled) if weight >= 1]
+        while len(small) > 0 and len(large) > 0:
+            less = small.pop()
+            more = large.pop()
+            self.probabilities[less] = scaled[less]
+            self.aliases[less] = more
+            scaled[more] = scaled[more] + scaled[less] - 1
+            if scaled[more] < 1:
+                small.append(more)
+            else:
+                large.append(more)
+        # the remaining weights are 1 up to rounding errors
+        for i in large + small:
+            self.probabilities[i] = 1.0
+
+    def sample(self, random: Random) -> int:
+        """
+        Args:
+            random (Random): source of randomness
+
+        Returns:
+            int: the drawn index
+        """
+        # a single random number chooses the column (integer part) and the side of the column (fractional part)
+        value = random.random() * len(self.probabilities)
+        i = int(value)
+        return i if value - i < self.probabilities[i] else self.aliases[i]
+
+
+class MoveSampler(TreeObserver):
+    """ draws moves of the nodes of a tree with a probability proportional to their frequency (@see Move.frequency) like
+    Node.random_move, but caches an alias table per node (@see AliasTable) so that a draw takes constant time instead of summing up the
+    frequencies of all moves. the sampler registers itself as observer of the tree and drops the table of a node when its moves or their
+    frequencies change (e.g. during an import, @see chessapp.controller.updater.import_pgn). pass a seeded Random to the draws for
+    reproducible simulations.
+    """
+
+    def __init__(self, tree: ChessTree):
+        """ creates the sampler and registers it as observer of the tree
+
+        Args:
+            tree (ChessTree): the tree
+        """
+        self.tree: ChessTree = tree
+        # fen -> (moves with a frequency > 0, alias table of their frequencies)
+        self.tables: dict[str, tuple[list[Move], AliasTable]] = {}
+        # incremented by every invalidation. a table is only stored if no invalidation happened while it was built.
+        self.version: int = 0
+        self.lock = Lock()
+        tree.add_observer(self)
+
+    def close(self):
+        """ unregisters the sampler from the tree
+        """
+        self.tree.remove_observer(self)
+
+    def get_table(self, node: Node) -> tuple[list[Move], AliasTable]:
+        """
+        Args:
+            node (Node): a node of the tree
+
+        Returns:
+            tuple[list[Move], AliasTable]: the moves of the node with a frequency > 0 and the alias table of their frequencies or None if no
+            move of the node has a frequency
+        """
+        table = self.tables.get(node.state)
+        if table != None:
+            return table
+        version = self.version
+        moves = [move for move in node.moves if move.frequency > 0]
+        table = (moves, AliasTable(
+            [move.frequency for move in moves])) if len(moves) > 0 else None
+        with self.lock:
+            if version == self.version:
+                self.tables[node.state] = table
+        return table
+
+    def random_move(self, node: Node, random: Random, use_frequency: bool = False) -> Move:
+        """ @see Node.random_move
+
+        Args:
+            node (Node): a node of the tree with at least one move
+            random (Random): source of randomness
+            use_frequency (bool, optional): Defaults to False. if True, the probability of a move to be chosen is proportional to its
+            frequency, otherwise all moves have the same probability
+
+        Raises:
+            Exception: if use_frequency is True and no move of the node has a frequency
+
+        Returns:
+            Move: the chosen move
+        """
+        if not use_frequency:
+            moves = node.moves
+            return moves[random.randrange(len(moves))]
+        table = self.get_table(node)
+        if table == None:
+            raise Exception(
+                "cannot chose a move. check frequencies of the moves of node " + node.state)
+        moves, alias_table = table
+        return moves[alias_table.sample(random)]
+
+    def invalidate(self, fen: str):
+        """ drops the table of the node
+
+        Args:
+            fen (str): fen of the node
+        """
+        with self.lock:
+            self.version += 1
+            self.tables.pop(fen, None)
+
+    def on_moves_changed(self, node: Node):
+        """ @see TreeObserver.on_moves_changed. the table of the node is dropped.
+
+        Args:
+            node (Node): the changed node
+        """
+        self.invalidate(node.state)
+
+    def on_frequency_changed(self, node: Node):
+        """ @see TreeObserver.on_frequency_changed. the table of the node is dropped.
+
+        Args:
+            node (Node): the changed node
+        """
+        self.invalidate(node.state)
+
+    def on_loaded(self):
+        """ @see TreeObserver.on_loaded. all tables are dropped.
+        """
+        with self.lock:
+            self.version += 1
+            self.tables = {}
@@ -13,6 +13,52 @@ class Backlink:
     move: Move
 
 
+class Evaluation:
+    """ an evaluation of a position: eval in centipawns/100 (from the perspective of white, 100 or -100 if mate), the depth of the
+    evaluation and whether it is a mate. evaluations are never modified after their creation, a node replaces its evaluation as a whole
+    (@see Node.update).
+    """
+
+    def __init__(self, eval: float, eval_depth: int, is_mate: bool):
+        """ creates a new evaluation
+
+        Args:
+            eval (float): evaluation of the position
+            eval_depth (int): depth of the evaluation
+            is_mate (bool): whether the position is a mate position or not
+        """
+        self.eval: float = eval
+        self.eval_depth: int = eval_depth
+        self.is_mate: bool = is_mate
+
+    def is_better_than(self, other, is_white_turn: bool) -> bool:
+        """ checks whether this evaluation is better than the other one for the turn player
+
+        Args:
+            other (Evaluation): the other evaluation
+            is_white_turn (bool): True if white is the turn player
+
+        Returns:
+            bool: True if this evaluation is better for the turn player
+        """
+        if is_white_turn:
+            return self.eval > other.eval
+        return self.eval < other.eval
+
+    def is_mate_for(self, is_white: bool) -> bool:
+        """
+        Args:
+            is_white (bool): the player
+
+        Returns:
+            bool: True if this evaluation is a forced mate in favour of the given player
+        """
+        return self.is_mate and (self.eval > 0) == is_white
+
+    def __eq__(self, other) -> bool:
+        return other != None and self.eval == other.eval and self.eval_depth == other.eval_depth and self.is_mate == other.is_mate
+
+
 class Node:
     """ A node represents a position in the chess tree. It contains the following information:
     - state: the fen of the position
@@ -21,6 +67,11 @@ class Node:
     - is_mate: whether the position is a mate position or not
     - moves: the known moves of the position
     - backlinks: the links pointing to the known nodes leading to this node
+
+    Mutations hold the write lock of the tree. moves and backlinks are replaced by new lists when they change (copy-on-write), so a
+    reader that iterates them is never affected by a concurrent write (@see ChessTree). likewise eval, eval_depth and is_mate are read
+    from a single immutable Evaluation that is replaced as a whole. readers that need more than one of them read evaluation once so that
+    they never combine the values of two different evaluations.
     """
 
     def __init__(self, tree, fen: str, eval: float = 0, eval_depth: int = -1, is_mate: bool = False):
@@ -37,23 +88,40 @@ class Node:
         self.state: str = fen
         self.moves = []
         self.backlinks = []
-        self.eval: float = eval
-        self.eval_depth: float = eval_depth
-        self.is_mate: bool = is_mate
+        self.evaluation: Evaluation = Evaluation(eval, eval_depth, is_mate)
+
+    @property
+    def eval(self) -> float:
+        return self.evaluation.eval
+
+    @property
+    def eval_depth(self) -> int:
+        return self.evaluation.eval_depth
 
-    def update(self, eval: float, eval_depth: int, is_mate: bool):
+    @property
+    def is_mate(self) -> bool:
+        return self.evaluation.is_mate
+
+    def update(self, eval: float, eval_depth: int, is_mate: bool) -> bool:
         """ updates the evaluation of this node if the given evaluation depth is deeper than the current one or
-        if the new evaluation is a mate and the current evaluation is not a mate
+        if the new evaluation is a mate and the current evaluation is not a mate. the observers of the tree are notified
+        if the evaluation changed.
 
         Args:
             eval (float): evaluation of the position
             eval_depth (int): depth of the evaluation
             is_mate (bool): whether the position is a mate position or not
+
+        Returns:
+            bool: True if the evaluation was updated, False otherwise
         """
-        if eval_depth > self.eval_depth or (not self.is_mate and is_mate):
-            self.eval_depth = eval_depth
-            self.eval = eval
-            self.is_mate = is_mate
+        with self.tree.write_lock:
+            current = self.evaluation
+            if eval_depth > current.eval_depth or (not current.is_mate and is_mate):
+                self.evaluation = Evaluation(eval, eval_depth, is_mate)
+                self.tree.notify_eval_changed(self)
+                return True
+            return False
 
     def add(self, move: Move):
         """ adds a move to the node. if the move is already known, the source and the comment are updated if applicable
@@ -61,15 +129,30 @@ class Node:
         Args:
             move (Move): _description_
         """
-        for m in self.moves:
-            if m.is_equivalent_to(move):
-                if m.source.value < move.source.value:
-                    m.source = move.source
-                if move.comment and not m.comment:
-                    m.comment = move.comment
-                return
-        self.moves.append(move)
-        self.tree.get(move.result).backlink(self, move)
+        with self.tree.write_lock:
+            for m in self.moves:
+                if m.is_equivalent_to(move):
+                    if move.comment and not m.comment:
+                        m.comment = move.comment
+                    if m.source.value < move.source.value:
+                        m.source = move.source
+                        # the source decides which moves are acceptable (@see is_acceptable_move)
+                        self.tree.notify_moves_changed(self)
+                    return
+            self.moves = self.moves + [move]
+            self.tree.get(move.result).backlink(self, move)
+            self.tree.notify_moves_changed(self)
+
+    def increment_frequency(self, move: Move, amount: int = 1):
+        """ increments the frequency of a move of the node and notifies the observers of the tree
+
+        Args:
+            move (Move): a move of the node
+            amount (int, optional): Defaults to 1. the amount the frequency is incremented by
+        """
+        with self.tree.write_lock:
+            move.frequency += amount
+            self.tree.notify_frequency_changed(self)
 
     def backlink(self, node, move: Move):
         """ adds a backlink to the node.
@@ -79,7 +162,8 @@ class Node:
             node (Node): previous node
             move (Move): move that leads from the previous node to this node
         """
-        self.backlinks.append(Backlink(node, move))
+        with self.tree.write_lock:
+            self.backlinks = self.backlinks + [Backlink(node, move)]
 
     def knows_move(self, move: Move) -> bool:
         """ checks whether the node knows the given move
@@ -0,0 +1,86 @@
+from chessapp.model.chesstree import ChessTree
+from chessapp.model.node import Node
+from chessapp.util.fen import get_reduced_fen_from_board
+from chess import Board
+
+s_start_fen: str = get_reduced_fen_from_board(Board())
+
+
+def compute_reach_probabilities(tree: ChessTree, root_fen: str = s_start_fen, about_to_close=lambda: False) -> dict[str, float]:
+    """ computes for each position of the tree the probability to reach it from the root when every move is played with a probability
+    proportional to its frequency (@see Move.frequency). transpositions add up: the probability of a position is the sum over all its
+    parents of the probability of the parent times the share of the move leading to the position.
+
+    moves that repeat a position of the current line close a cycle, so no topological order exists for them. they are the back edges of a
+    depth first search from the root and are dropped (like in chessapp.model.repertoire.analyse_repertoire); the probability that flows
+    into a repetition is lost. the remaining moves form a directed acyclic graph whose positions are processed in topological order
+    (Kahn's algorithm), so every move is visited once and a position is only processed after all its parents.
+
+    Args:
+        tree (ChessTree): a tree with move frequencies (e.g. an opening tree of chessapp.controller.openingtree.OpeningTree)
+        root_fen (str, optional): Defaults to s_start_fen. the position every game starts from
+        about_to_close (callable, optional): callable that returns True if the computation should be aborted
+
+    Returns:
+        dict[str, float]: the probabilities of all positions reachable from the root through moves with a frequency > 0
+    """
+    if not root_fen in tree.nodes:
+        return {}
+    # depth first search: collect the moves of the positions reachable from the root without the back edges and count the parents
+    forward_moves = {}
+    parents = {root_fen: 0}
+    on_path = set([root_fen])
+    stack = [(root_fen, 0)]
+    while len(stack) > 0:
+        if about_to_close():
+            break
+        fen, index = stack[-1]
+        moves = tree.nodes[fen].moves
+        if index == 0:
+            forward_moves[fen] = []
+        if index >= len(moves):
+            stack.pop()
+            on_path.remove(fen)
+            continue
+        stack[-1] = (fen, index + 1)
+        move = moves[index]
+        if move.frequency <= 0 or move.result in on_path or not move.result in tree.nodes:
+            continue
+        forward_moves[fen].append(move)
+        if not move.result in parents:
+            parents[move.result] = 0
+            on_path.add(move.result)
+            stack.append((move.result, 0))
+        parents[move.result] += 1
+    probabilities = {fen: 0.0 for fen in parents}
+    probabilities[root_fen] = 1.0
+    ready = [root_fen]
+    while len(ready) > 0:
+        if about_to_close():
+            break
+        node: Node = tree.nodes[ready.pop()]
+        total = node.total_frequency()
+        for move in forward_moves.get(node.state, []):
+            probabilities[move.result] += probabilities[node.state] * \
+                move.frequency / total
+            parents[move.result] -= 1
+            if parents[move.result] == 0:
+                ready.append(move.result)
+    return probabilities
+
+
+def combine_reach_probabilities(white_probabilities: dict[str, float], black_probabilities: dict[str, float]) -> dict[str, float]:
+    """ combines the probabilities of the white and the black opening tree assuming that the player plays both colors equally often
+
+    Args:
+        white_probabilities (dict[str, float]): probabilities of the games played as white
+        black_probabilities (dict[str, float]): probabilities of the games played as black
+
+    Returns:
+        dict[str, float]: the combined probabilities
+    """
+    combined = {}
+    for probabilities in (white_probabilities, black_probabilities):
+        for fen, probability in probabilities.items():
+            combined[fen] = combined.get(fen, 0) + probability / 2
+    return combined
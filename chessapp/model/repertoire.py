@@ -0,0 +1,153 @@
+from chessapp.model.chesstree import ChessTree
+from chessapp.model.node import Node
+from chessapp.model.move import Move
+from chessapp.util.fen import get_reduced_fen_from_board
+from chess import Board
+
+s_start_fen: str = get_reduced_fen_from_board(Board())
+
+
+class LineStatistics:
+    """ the lines of the part of a position graph that is reachable from a position (@see analyse_repertoire). line counts and lengths are
+    python ints and therefore cannot overflow, even though the number of lines grows exponentially with the depth of a repertoire.
+    """
+
+    def __init__(self, lines: int = 1, total_length: int = 0, max_depth: int = 0, min_depth: int = 0):
+        """
+        Args:
+            lines (int, optional): Defaults to 1. number of distinct lines from the position to the end of the repertoire
+            total_length (int, optional): Defaults to 0. sum of the lengths (in plies) of these lines
+            max_depth (int, optional): Defaults to 0. length of the longest line
+            min_depth (int, optional): Defaults to 0. length of the shortest line
+        """
+        self.lines: int = lines
+        self.total_length: int = total_length
+        self.max_depth: int = max_depth
+        self.min_depth: int = min_depth
+
+    def get_mean_length(self) -> float:
+        """
+        Returns:
+            float: the mean length of the lines in plies
+        """
+        return self.total_length / self.lines
+
+
+class RepertoireReport:
+    """ the result of analyse_repertoire
+    """
+
+    def __init__(self, color: str, root: LineStatistics, reachable_positions: int, holes: list[str], leaves: list[str], cycles: int,
+                 branches: dict[str, LineStatistics]):
+        """
+        Args:
+            color (str): the color of the player ("white" or "black")
+            root (LineStatistics): the lines from the root
+            reachable_positions (int): number of distinct positions the quiz can reach
+            holes (list[str]): fens of the reachable positions in which the player is to move but has no acceptable move
+            leaves (list[str]): fens of the reachable positions in which the opponent is to move but no move is known
+            cycles (int): number of moves that were ignored because they repeat a position of the current line
+            branches (dict[str, LineStatistics]): the lines after each move of the root (san -> statistics)
+        """
+        self.color: str = color
+        self.root: LineStatistics = root
+        self.reachable_positions: int = reachable_positions
+        self.holes: list[str] = holes
+        self.leaves: list[str] = leaves
+        self.cycles: int = cycles
+        self.branches: dict[str, LineStatistics] = branches
+
+    def format_report(self, max_holes: int = 10) -> list[str]:
+        """
+        Args:
+            max_holes (int, optional): Defaults to 10. at most this many holes are listed
+
+        Returns:
+            list[str]: the report in human readable form
+        """
+        lines = [" ".join(("repertoire of", self.color + ":", str(self.reachable_positions), "positions,", str(self.root.lines), "lines,",
+                           str(len(self.holes)), "holes,", str(len(self.leaves)), "leaves,", str(self.cycles), "repetitions")),
+                 " ".join(("line length: min", str(self.root.min_depth), "max", str(self.root.max_depth), "mean",
+                           str(round(self.root.get_mean_length(), 1)), "plies"))]
+        for san, branch in sorted(self.branches.items(), key=lambda item: -item[1].lines):
+            lines.append(" ".join(("after", san + ":", str(branch.lines), "lines, max depth", str(branch.max_depth + 1), "plies")))
+        for fen in self.holes[:max_holes]:
+            lines.append("hole: " + fen)
+        return lines
+
+
+def analyse_repertoire(tree: ChessTree, color: str, is_acceptable_move=None, root_fen: str = s_start_fen,
+                       about_to_close=lambda: False) -> RepertoireReport:
+    """ analyses the lines the quiz can reach with the player playing color: the player continues with each acceptable move
+    (@see Node.is_acceptable_move) and the opponent with each known move. a line ends in a hole (the player has no acceptable move) or in
+    a leaf (the opponent has no known move).
+
+    the graph has transpositions, so the number of lines grows exponentially while the number of positions does not. each position is
+    therefore traversed once (iterative post-order, children before parents) and its statistics are memoized and combined by all parents.
+    positions can repeat, so the graph can contain cycles: a move back onto the current line is ignored (like in
+    chessapp.model.evalpropagation.EvalPropagator) and the line ends there.
+
+    Args:
+        tree (ChessTree): the tree
+        color (str): the color of the player ("white" or "black")
+        is_acceptable_move (callable, optional): Defaults to None. (node, move) -> bool. if None, Node.is_acceptable_move is used. pass
+            chessapp.model.acceptablemoves.AcceptableMoveIndex.is_acceptable_move to use cached results.
+        root_fen (str, optional): Defaults to s_start_fen. the position the lines start from
+        about_to_close (callable, optional): callable that returns True if the analysis should be aborted
+
+    Returns:
+        RepertoireReport: the report or None if the root is not part of the tree or the analysis was aborted
+    """
+    if is_acceptable_move == None:
+        def is_acceptable_move(node: Node, move: Move) -> bool:
+            return node.is_acceptable_move(move)
+    player_is_white = color == "white"
+
+    def get_continuations(node: Node) -> list[Move]:
+        if node.is_white_turn() == player_is_white:
+            return [move for move in node.moves if is_acceptable_move(node, move)]
+        return list(node.moves)
+
+    if not root_fen in tree.nodes:
+        return None
+    statistics: dict[str, LineStatistics] = {}
+    holes = []
+    leaves = []
+    cycles = 0
+    on_path = set([root_fen])
+    stack = [(tree.nodes[root_fen], get_continuations(tree.nodes[root_fen]), 0)]
+    while len(stack) > 0:
+        if about_to_close():
+            return None
+        node, continuations, index = stack[-1]
+        if index < len(continuations):
+            stack[-1] = (node, continuations, index + 1)
+            child_fen = continuations[index].result
+            if child_fen in on_path:
+                cycles += 1
+            elif not child_fen in statistics and child_fen in tree.nodes:
+                child = tree.nodes[child_fen]
+                on_path.add(child_fen)
+                stack.append((child, get_continuations(child), 0))
+            continue
+        stack.pop()
+        on_path.remove(node.state)
+        children = [statistics[move.result]
+                    for move in continuations if move.result in statistics]
+        if len(children) == 0:
+            statistics[node.state] = LineStatistics()
+            # a position whose continuations all repeat the line is neither a hole nor a leaf
+            if len(continuations) == 0:
+                if node.is_white_turn() == player_is_white:
+                    holes.append(node.state)
+                else:
+                    leaves.append(node.state)
+            continue
+        statistics[node.state] = LineStatistics(sum(child.lines for child in children),
+                                                sum(child.total_length + child.lines for child in children),
+                                                1 + max(child.max_depth for child in children),
+                                                1 + min(child.min_depth for child in children))
+    root = tree.nodes[root_fen]
+    branches = {move.san: statistics[move.result] for move in get_continuations(root)
+                if move.result in statistics and move.result != root_fen}
+    return RepertoireReport(color, statistics[root_fen], len(statistics), holes, leaves, cycles, branches)
@@ -86,6 +86,15 @@ def get_puzzles_folder() -> Path:
     return join(get_data_folder(), "puzzles")
 
 
+def get_tablebase_folder() -> Path:
+    """path to the folder that contains syzygy endgame tablebase files (*.rtbw and *.rtbz). @see chessapp.controller.tablebase
+
+    Returns:
+        Path: path to the tablebase folder
+    """
+    return join(get_data_folder(), "syzygy")
+
+
 def assure_file(file_path: str | Path):
     """ creates a file if it does not exist
 
@@ -1,3 +1,8 @@
+from chess import Board
+from chess.pgn import read_game, ChildNode
+import io
+
+
 def moves_to_pgn(moves, white_first_move: bool) -> str:
     """ this method converts a list of moves to a pgn string
 
@@ -16,3 +21,53 @@ def moves_to_pgn(moves, white_first_move: bool) -> str:
             pgn += ".."
         pgn += " " + str(moves[i])
     return pgn
+
+
+def extract_lines_from_node(base_line: list[str], board: Board, node: ChildNode, about_to_close):
+    """ extract all lines from a node
+
+    Args:
+        base_line (list[str]): the base line is a list of moves that was played before to reach this specific board state
+        board (Board): the board having the specific board state and all the desired variations
+        node (ChildNode): the node of the pgn game that represents the board state
+        about_to_close (callable): callable that returns True if the module closes
+
+    Returns:
+        list[list[str]]: list of lines (variations) of chess moves extracted from the board
+    """
+    move_line: list[str] = base_line.copy()
+    move_line.append(board.san(node.move))
+    if len(node.variations) == 0:
+        return [move_line]
+    board.push(node.move)
+    lines = []
+    for n in node.variations:
+        if about_to_close():
+            break
+        for line in extract_lines_from_node(move_line, board, n, about_to_close):
+            if about_to_close():
+                break
+            lines.append(line)
+    board.pop()
+    return lines
+
+
+def extract_lines(pgn: str, about_to_close):
+    """ extract all lines from a pgn string
+
+    Args:
+        pgn (str): the pgn string
+        about_to_close (callable): callable that returns True if the module closes
+
+    Returns:
+        list[list[str]]: list of lines (variations) of chess moves extracted from the pgn string
+    """
+    input_str = io.StringIO(pgn)
+    game = read_game(input_str)
+    lines = []
+    while game != None and not about_to_close():
+        for node in game.variations:
+            for line in extract_lines_from_node([], Board(), node, about_to_close):
+                lines.append(line)
+        game = read_game(input_str)
+    return lines
@@ -0,0 +1,171 @@
+from chess import Board, Move, KNIGHT, BISHOP, ROOK, QUEEN, square, square_file, square_rank
+from chess.polyglot import zobrist_hash, open_reader
+from random import Random
+from os.path import exists, getmtime
+import struct
+
+s_polyglot_entry_format = ">QHHI"
+s_polyglot_max_weight = 0xFFFF
+s_polyglot_promotion_map = {KNIGHT: 1, BISHOP: 2, ROOK: 3, QUEEN: 4}
+
+
+def encode_polyglot_move(board: Board, move: Move) -> int:
+    """ encodes a move in the polyglot format. castling is encoded as the king capturing its own rook (e.g. e1h1).
+
+    Args:
+        board (Board): the board the move is played on
+        move (Move): the move
+
+    Returns:
+        int: the encoded move
+    """
+    to_square = move.to_square
+    if board.is_castling(move):
+        rook_file = 7 if square_file(move.to_square) > square_file(
+            move.from_square) else 0
+        to_square = square(rook_file, square_rank(move.from_square))
+    promotion = s_polyglot_promotion_map.get(move.promotion, 0)
+    return square_file(to_square) | (square_rank(to_square) << 3) | (square_file(move.from_square) << 6) | (square_rank(move.from_square) << 9) | (promotion << 12)
+
+
+def get_move_weight(node, move) -> int:
+    """ the default weight of a move of a node: its frequency if the node knows frequencies (e.g. the opening trees), otherwise
+    its source (the better the source the higher the weight, @see chessapp.model.sourcetype.SourceType)
+
+    Args:
+        node (chessapp.model.node.Node): the node
+        move (chessapp.model.move.Move): a move of the node
+
+    Returns:
+        int: the weight of the move
+    """
+    if node.has_frequency():
+        return move.frequency
+    return move.source.value - move.source.default_value().value + 1
+
+
+def export_polyglot(tree, file_path: str, weight_function=get_move_weight, about_to_close=lambda: False) -> int:
+    """ exports all moves of the tree into a polyglot opening book (.bin) that can be read by other tools and engines. the weights
+    of the moves of each position are scaled down proportionally if they exceed the 16 bit weight of the format. moves with weight 0
+    and moves that are not legal in their position (e.g. imported from a broken pgn) are not exported.
+
+    Args:
+        tree (chessapp.model.chesstree.ChessTree): the tree to export
+        file_path (str): path of the book file
+        weight_function (callable, optional): Defaults to get_move_weight. returns the weight of a move given the node and the move
+        about_to_close (callable, optional): callable that returns True if the export should be aborted
+
+    Returns:
+        int: amount of exported entries
+    """
+    entries = []
+    # iterate a snapshot, other threads may add nodes in the meantime (@see ChessTree.snapshot)
+    for node in tree.snapshot().values():
+        if about_to_close():
+            return 0
+        if not node.has_move():
+            continue
+        board = Board(fen=node.state)
+        key = zobrist_hash(board)
+        weighted_moves = []
+        for move in node.moves:
+            weight = weight_function(node, move)
+            if weight <= 0:
+                continue
+            try:
+                weighted_moves.append((board.parse_san(move.san), weight))
+            except ValueError:
+                print("skipping illegal move " + move.san +
+                      " of position " + node.state)
+        if len(weighted_moves) == 0:
+            continue
+        max_weight = max(weight for _, weight in weighted_moves)
+        for move, weight in weighted_moves:
+            if max_weight > s_polyglot_max_weight:
+                weight = max(1, weight * s_polyglot_max_weight // max_weight)
+            entries.append(
+                (key, encode_polyglot_move(board, move), weight))
+    # polyglot books are sorted by key, entries of the same key by descending weight
+    entries.sort(key=lambda entry: (entry[0], -entry[2]))
+    with open(file_path, "wb") as file:
+        for key, move, weight in entries:
+            file.write(struct.pack(s_polyglot_entry_format,
+                       key, move, weight, 0))
+    return len(entries)
+
+
+def is_book_up_to_date(file_path: str, tree) -> bool:
+    """ checks whether the book was exported after the tree was saved the last time (@see ChessTree.save). a book that is older than
+    the tree misses the changes since its export.
+
+    Args:
+        file_path (str): path of the book file
+        tree (chessapp.model.chesstree.ChessTree): the tree the book was exported from
+
+    Returns:
+        bool: True if the book exists and is not older than the saved tree
+    """
+    if not exists(file_path):
+        return False
+    return not exists(tree.moves_file_path()) or getmtime(file_path) >= getmtime(tree.moves_file_path())
+
+
+class PolyglotBook:
+    """ a polyglot opening book that is memory-mapped instead of loaded. lookups are binary searches over the sorted entries of the
+    file (@see chess.polyglot.MemoryMappedReader), so even very large books are cheap to open and to query.
+    """
+
+    def __init__(self, file_path: str):
+        """ opens the book
+
+        Args:
+            file_path (str): path of the book file
+        """
+        self.file_path: str = file_path
+        self.reader = open_reader(file_path)
+
+    def get_weighted_moves(self, board: Board) -> list[tuple[Move, int]]:
+        """
+        Args:
+            board (Board): the position to look up
+
+        Returns:
+            list[tuple[Move, int]]: the legal moves the book knows for the position and their weights
+        """
+        return [(entry.move, entry.weight) for entry in self.reader.find_all(board)]
+
+    def has_moves(self, board: Board) -> bool:
+        """
+        Args:
+            board (Board): the position to look up
+
+        Returns:
+            bool: True if the book knows at least one move with a weight > 0 for the position
+        """
+        return self.reader.get(board) != None
+
+    def weighted_choice(self, board: Board, random: Random) -> Move | None:
+        """ chooses a move of the position with a probability proportional to its weight
+
+        Args:
+            board (Board): the position to look up
+            random (Random): source of randomness
+
+        Returns:
+            Move | None: the chosen move or None if the book knows no move for the position
+        """
+        weighted_moves = self.get_weighted_moves(board)
+        total = sum(weight for _, weight in weighted_moves)
+        if total <= 0:
+            return None
+        target = random.randint(0, total - 1)
+        for move, weight in weighted_moves:
+            if target < weight:
+                return move
+            target -= weight
+        return None
+
+    def close(self):
+        """ closes the book file
+        """
+        self.reader.close()
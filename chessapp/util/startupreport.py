@@ -0,0 +1,125 @@
+from contextlib import contextmanager
+from threading import Lock
+import time
+
+
+class StartupStep:
+    """ a step of the startup of the application (e.g. creating the window or loading a tree)
+    """
+
+    def __init__(self, name: str, start_seconds: float):
+        """
+        Args:
+            name (str): the name of the step
+            start_seconds (float): seconds since the start of the application when the step began
+        """
+        self.name: str = name
+        self.start_seconds: float = start_seconds
+        self.duration_seconds: float = None
+
+
+class StartupReport:
+    """ measures where the time of the startup goes. the steps of the startup are measured with begin and end (or measure). steps may
+    run in the background and overlap. once the last begun step ends, the startup is done and the listeners receive the report.
+    """
+
+    def __init__(self):
+        """ creates a report that starts now
+        """
+        self.start_time: float = time.perf_counter()
+        self.steps: list[StartupStep] = []
+        self.pending: dict[str, StartupStep] = {}
+        self.listeners = []
+        self.is_done: bool = False
+        self.lock = Lock()
+
+    def get_seconds(self) -> float:
+        """
+        Returns:
+            float: seconds since the start of the application
+        """
+        return time.perf_counter() - self.start_time
+
+    def add_listener(self, listener):
+        """
+        Args:
+            listener (callable): called with the lines of the report (@see format_report) once the startup is done
+        """
+        self.listeners.append(listener)
+
+    def begin(self, name: str):
+        """ begins a step. steps that run in the background should be begun before they are dispatched so that the startup is not
+        considered done before they run.
+
+        Args:
+            name (str): the unique name of the step
+        """
+        with self.lock:
+            step = StartupStep(name, self.get_seconds())
+            self.steps.append(step)
+            self.pending[name] = step
+
+    def end(self, name: str):
+        """ ends a step. if it was the last pending step, the listeners receive the report.
+
+        Args:
+            name (str): the name of the step
+        """
+        with self.lock:
+            if not name in self.pending:
+                return
+            step = self.pending.pop(name)
+            step.duration_seconds = self.get_seconds() - step.start_seconds
+            done = len(self.pending) == 0 and not self.is_done
+            if done:
+                self.is_done = True
+        if done:
+            lines = self.format_report()
+            for listener in self.listeners:
+                listener(lines)
+
+    @contextmanager
+    def measure(self, name: str):
+        """ measures the body of the with statement as a step (@see begin and end)
+
+        Args:
+            name (str): the unique name of the step
+        """
+        self.begin(name)
+        try:
+            yield
+        finally:
+            self.end(name)
+
+    def format_report(self) -> list[str]:
+        """
+        Returns:
+            list[str]: one line per step (start since the start of the application and duration) and the total startup time
+        """
+        with self.lock:
+            steps = list(self.steps)
+        lines = []
+        end_seconds = 0
+        for step in steps:
+            if step.duration_seconds == None:
+                lines.append(" ".join(("startup:", step.name, "started at", str(
+                    round(step.start_seconds, 2)), "s, still running")))
+                continue
+            end_seconds = max(
+                end_seconds, step.start_seconds + step.duration_seconds)
+            lines.append(" ".join(("startup:", step.name, "started at", str(round(step.start_seconds, 2)), "s, took",
+                                   str(round(step.duration_seconds, 2)), "s")))
+        lines.append(" ".join(("startup: done after", str(
+            round(end_seconds, 2)), "s")))
+        return lines
+
+
+s_startup_report: StartupReport = StartupReport()
+
+
+def get_startup_report() -> StartupReport:
+    """
+    Returns:
+        StartupReport: the report of the startup of this process (its start is the first import of this module)
+    """
+    return s_startup_report
@@ -128,6 +128,11 @@ class ChessBoard:
     with the board, but not the internal representation.
 
     The SquareIcons are loaded.
+
+    Painting happens on every mouse move while a piece is dragged, so the squares are drawn from a cached background pixmap (@see
+    get_background) and the pieces from pixmaps scaled to the square size (@see ChessPiece.get_scaled_pixmap). Both caches are keyed by
+    the size and the colors they were rendered with, so resizing the widget or changing the square colors renders them again. The
+    pattern of the squares is the same from both sides, so flipping the board does not.
     """
 
     def __init__(self):
@@ -162,6 +167,10 @@ R N B Q K B N R"""
         self.best_move_cp_loss: int = 0
         self.show_last_move_arrow: bool = True
         self.show_last_move_icon: bool = True
+        # if False, squares and pieces are painted without the cached pixmaps (e.g. to compare both in benchmarks.board_rendering)
+        self.use_render_cache: bool = True
+        self.background: QPixmap = None
+        self.background_key: tuple = None
         for icon_type in SquareIconType:
             self.icon_map[icon_type] = SquareIcon(icon_type)
 
@@ -304,6 +313,15 @@ R N B Q K B N R"""
             bound (QRect): bounds to draw the chessboard in
             dim (QSize): dimensions of a square on the chessboard
         """
+        if self.use_render_cache:
+            qp.drawPixmap(bound.x(), bound.y(), self.get_background(
+                dim, qp.device().devicePixelRatioF()))
+            if self.active_piece and self.active_piece_origin:
+                x, y = self.square_to_coords(
+                    self.active_piece_origin, bound.width(), bound.height())
+                qp.fillRect(x + bound.x(), y + bound.y(),
+                            dim.width, dim.height, self.red_square_color)
+            return
         square_color = None
         for row in range(0, 8):
             for col in range(0, 8):
@@ -313,6 +331,34 @@ R N B Q K B N R"""
                 qp.fillRect(col * dim.width + bound.x(), (7 - row) * dim.height + bound.y(),
                             dim.width, dim.height, square_color)
 
+    def get_background(self, dim: QSize, ratio: float) -> QPixmap:
+        """ returns the squares of the chessboard rendered into a pixmap. the pixmap is rendered again if the size of the squares, the
+        device pixel ratio or the square colors changed since the last call.
+
+        Args:
+            dim (QSize): dimensions of a square on the chessboard
+            ratio (float): device pixel ratio of the paint device (e.g. 2 on high dpi screens)
+
+        Returns:
+            QPixmap: the squares of the chessboard
+        """
+        key = (dim.width, dim.height, ratio, self.white_square_color.rgba(),
+               self.black_square_color.rgba())
+        if self.background != None and self.background_key == key:
+            return self.background
+        background = QPixmap(int(8 * dim.width * ratio),
+                             int(8 * dim.height * ratio))
+        background.setDevicePixelRatio(ratio)
+        qp = QPainter(background)
+        for row in range(0, 8):
+            for col in range(0, 8):
+                qp.fillRect(col * dim.width, (7 - row) * dim.height, dim.width, dim.height,
+                            self.black_square_color if row % 2 == col % 2 else self.white_square_color)
+        qp.end()
+        self.background = background
+        self.background_key = key
+        return background
+
     def draw_pieces(self, qp: QPainter, bound: QRect, dim: QSize):
         """ draws the pieces of the chessboard on the given painter within the given bounds
 
@@ -333,7 +379,7 @@ R N B Q K B N R"""
                     j_value = 7 - j
                 if piece and not (self.is_active_piece(7 - i, j) and self.should_draw_active_piece()):
                     piece.drawOn(qp, QPoint(
-                        dim.width * j_value + bound.x(), dim.height * i_value + bound.y()), dim)
+                        dim.width * j_value + bound.x(), dim.height * i_value + bound.y()), dim, self.use_render_cache)
 
     def draw_last_move_arrow(self, qp: QPainter, bound: QRect, dim: QSize):
         """ draws the last move arrow on the given painter within the given bounds
@@ -411,4 +457,4 @@ R N B Q K B N R"""
                            dim.width // 5, dim.height // 5)
         # draw piece itself
         self.active_piece.drawOn(qp, QPoint(
-            int(self.mouse_x - (dim.width / 2)), int(self.mouse_y - (dim.height / 2))), dim)
+            int(self.mouse_x - (dim.width / 2)), int(self.mouse_y - (dim.height / 2))), dim, self.use_render_cache)
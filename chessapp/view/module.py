@@ -1,9 +1,14 @@
-from PyQt5.QtCore import QRunnable, QObject, Qt
+from PyQt5.QtCore import QRunnable, QObject, Qt, QTimer
 from PyQt5.QtWidgets import QAction, QMenuBar, QMenu, QWidget, QListWidget, QHBoxLayout, QLabel, QVBoxLayout, QListWidgetItem
 from PyQt5.QtGui import QFont
 from chessapp.view.chessboardwidget import ChessBoardWidget, PieceMovement
 from PyQt5.QtCore import pyqtSignal
 from chessapp.configuration import DEFAULT_STYLESHEET
+from chessapp.controller.scheduler import get_scheduler, ScheduledTask, PRIORITY_NORMAL
+from threading import Event
+
+# seconds between two checks whether data that is loaded in the background is ready (@see BaseModule.wait_until_ready)
+s_ready_poll_seconds = 0.5
 
 
 class BaseModule(QObject):
@@ -17,6 +22,8 @@ class BaseModule(QObject):
     TODO: This class needs to be refactored! The chessapp.controller classes are derived from it which mixes GUI and logic. Instead a controller should be able to offer a GUI-element to the application and interact through it with the user and vice versa.
     """
 
+    delayed_dispatch_requested = pyqtSignal(object)
+
     def __init__(self, app, display_name: str, actions: list[QAction]) -> None:
         """ initialises the module with the given parameters. The module is not focused after initialisation. After
         initialising this class the method init needs to be called on the GUI thread to finish up the initialisation.
@@ -59,6 +66,9 @@ class BaseModule(QObject):
         # default values
         self.header_label.setText(self.display_name)
 
+        # connections
+        self.delayed_dispatch_requested.connect(self.__start_delay_timer)
+
     def register(self):
         """ this method is only called once by the main application. Don't call this in any other way.
         It registers the module in the menu bar with the "Focus" action and the actions given in the constructor.
@@ -67,7 +77,7 @@ class BaseModule(QObject):
         menu: QMenu = menu_bar.addMenu("&" + self.display_name)
         focus_action = QAction("&Focus", self.app.window)
         focus_action.triggered.connect(
-            lambda: self.app.threadpool.start(MethodAction(self.focus)))
+            lambda: self.dispatch_threadpool(self.focus, "Focus"))
         menu.addAction(focus_action)
         for action in self.actions:
             menu.addAction(action)
@@ -79,10 +89,36 @@ class BaseModule(QObject):
         not to continue actions. Often it is prudent to include this method inside loops to abort actions when the program
         wants to close.
 
+        Calls of this method are also the safe points of background tasks: while interactive work is running, a background task
+        blocks here until the interactive work is done (@see chessapp.controller.scheduler.Scheduler.checkpoint). This method
+        also returns True if the task running on the current thread has been cancelled, so that loops checking it abort the task.
+
+        Returns:
+            bool: True if the module is about to close or is already closed or the current task has been cancelled
+        """
+        get_scheduler().checkpoint(lambda: self.is_closing or self.is_closed)
+        return self.is_closing or self.is_closed or get_scheduler().is_cancelled()
+
+    def wait_until_ready(self, event: Event, description: str) -> bool:
+        """ blocks until the given event is set, e.g. until a tree that is loaded in the background is loaded (@see
+        chessapp.model.chesstree.ChessTree.loaded). Call this method at the start of actions that need the data, so that the module
+        is usable as soon as its data is ready. Don't call it on the GUI thread.
+
+        Args:
+            event (Event): the event that is set once the data is ready
+            description (str): description of the data shown to the user while waiting
+
         Returns:
-            bool: True if the module is about to close or is already closed
+            bool: True if the data is ready, False if the module is about to close
         """
-        return self.is_closing or self.is_closed
+        if event.is_set():
+            return True
+        self.app.show_status_message(
+            "waiting for " + description + " to load...", 5000)
+        while not event.wait(s_ready_poll_seconds):
+            if self.about_to_close():
+                return False
+        return not self.about_to_close()
 
     def on_register(self):
         """ override this method to react to the registration of the module in the main application.
@@ -134,13 +170,54 @@ class BaseModule(QObject):
         """
         pass
 
-    def dispatch_threadpool(self, callable):
-        """ dispatches the given callable to the threadpool of the main application.
+    def dispatch_threadpool(self, callable, name: str = None, priority: int = PRIORITY_NORMAL, key=None, exclusive: bool = False):
+        """ dispatches the given callable to the threadpool of the main application as task of its task manager. the callable is not
+        queued again while an identical task is queued (@see chessapp.controller.taskmanager.TaskManager.start).
+
+        Args:
+            callable (callable): any callable object like a method of an object or a lambda function
+            name (str, optional): Defaults to None. name of the task shown to the user. if None, the name of the callable is used.
+            priority (int, optional): Defaults to PRIORITY_NORMAL. priority class of the task (@see chessapp.controller.scheduler)
+            key (optional): Defaults to None. tasks with the same key are identical. if None, the callable is the key.
+            exclusive (bool, optional): Defaults to False. if True, the callable is not started while an identical task is running
+        """
+        if name == None:
+            name = getattr(callable, "__name__", "task")
+        self.app.task_manager.start(
+            callable, self.display_name + ": " + name, priority, key, exclusive)
+
+    def dispatch_threadpool_delayed(self, callable, delay_milliseconds: int, name: str = None, priority: int = PRIORITY_NORMAL):
+        """ dispatches the given callable to the threadpool of the main application after the given delay (@see dispatch_threadpool).
+        The delay is measured by a timer of the GUI thread, so no thread of the threadpool is blocked while waiting. This method can
+        be called from any thread.
 
         Args:
             callable (callable): any callable object like a method of an object or a lambda function
+            delay_milliseconds (int): the delay in milliseconds
+            name (str, optional): Defaults to None. name of the task shown to the user. if None, the name of the callable is used.
+            priority (int, optional): Defaults to PRIORITY_NORMAL. priority class of the task (@see chessapp.controller.scheduler)
+        """
+        self.delayed_dispatch_requested.emit(
+            (callable, delay_milliseconds, name, priority))
+
+    def __start_delay_timer(self, request: tuple):
+        """ internal method that is called by the GUI thread when a delayed dispatch is requested (@see dispatch_threadpool_delayed)
+
+        Args:
+            request (tuple): the callable, the delay in milliseconds, the name and the priority of the task
+        """
+        callable, delay_milliseconds, name, priority = request
+        QTimer.singleShot(delay_milliseconds, lambda: None if self.about_to_close(
+        ) else self.dispatch_threadpool(callable, name, priority))
+
+    def report_progress(self, done: int, total: int):
+        """ reports the progress of the task running on the current thread (@see chessapp.controller.scheduler.Scheduler.report_progress)
+
+        Args:
+            done (int): amount of work done
+            total (int): total amount of work
         """
-        self.app.threadpool.start(MethodAction(callable))
+        get_scheduler().report_progress(done, total)
 
 
 class LogModule(BaseModule):
@@ -251,36 +328,45 @@ class ChessboardAndLogModule(LogModule):
 
 
 class MethodAction(QRunnable):
-    """ This class is used to dispatch a method to the threadpool of the main application.
+    """ This class is used to dispatch a method to the threadpool of the main application. The method runs as the given task of
+    the scheduler (@see chessapp.controller.scheduler.Scheduler). Use the task manager of the main application to create it
+    (@see chessapp.controller.taskmanager.TaskManager.start).
     """
 
-    def __init__(self, method):
+    def __init__(self, method, task: ScheduledTask):
         """ initialises the MethodAction with the given method.
 
         Args:
             method (callable): any callable object like a method of an object or a lambda function
+            task (ScheduledTask): the submitted task the method runs as
         """
         super().__init__()
         self.method = method
+        self.task: ScheduledTask = task
 
     def run(self):
         """ runs the method that was given in the constructor.
         """
-        self.method()
+        get_scheduler().run(self.task, self.method)
 
 
-def create_method_action(app, display_name: str, method):
-    """ helper function to create a QAction that calls the given method when triggered.
+def create_method_action(app, display_name: str, method, priority: int = PRIORITY_NORMAL, key=None):
+    """ helper function to create a QAction that calls the given method when triggered. The method is started as exclusive task of
+    the task manager, i.e. triggering the action again while the method is queued or running has no effect
+    (@see chessapp.controller.taskmanager.TaskManager.start).
 
     Args:
         app (ChessApp): the main application
         display_name (str): the name of the action that is displayed in the menu
         method (callable): the method that is called when the action is triggered
+        priority (int, optional): Defaults to PRIORITY_NORMAL. priority class of the task (@see chessapp.controller.scheduler)
+        key (optional): Defaults to None. tasks with the same key are identical (e.g. to let several actions share one key). if None,
+            the method is the key.
 
     Returns:
         MethodAction: the QAction that calls the given method when triggered
     """
     method_action = QAction("&" + display_name)
     method_action.triggered.connect(
-        lambda: app.threadpool.start(MethodAction(method)))
+        lambda: app.task_manager.start(method, display_name, priority, key, exclusive=True))
     return method_action
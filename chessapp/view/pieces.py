@@ -7,6 +7,9 @@ from PyQt5.QtCore import QRect
 from PyQt5.QtCore import Qt
 from chessapp.util.font import find_font_size
 
+# the scaled pixmaps of a piece are dropped once it was drawn with more sizes than this (e.g. while the window is resized)
+s_max_scaled_pixmaps: int = 8
+
 
 class PieceColor(Enum):
     """color of a chess piece: white (w) or black (b)
@@ -42,15 +45,45 @@ class ChessPiece():
         self.piece_color: PieceColor = piece_color
         self.piece_type: PieceType = piece_type
         self.pixmap: QPixmap = None
+        # (width, height, device pixel ratio) -> pixmap scaled to this size
+        self.scaled_pixmaps: dict[tuple[int, int, float], QPixmap] = {}
 
-    def load_pixmap(self):
+    def load_pixmap(self, folder: str = None):
         """tries to load the pixmap of the chess piece from the chess_pieces folder. if the file does not exist, the pixmap is set to None.
+        the scaled pixmaps of the previous image are dropped.
+
+        Args:
+            folder (str, optional): Defaults to None. folder of the image files. if None, get_chess_pieces_folder is used.
         """
-        image_path = join(get_chess_pieces_folder(), str(
+        image_path = join(get_chess_pieces_folder() if folder == None else folder, str(
             self.piece_color.value) + str(self.piece_type.value) + ".png")
         self.pixmap = QPixmap(image_path) if exists(image_path) else None
+        self.scaled_pixmaps = {}
 
-    def drawOn(self, qp: QPainter, position: QPoint, dimension: QSize):
+    def get_scaled_pixmap(self, width: int, height: int, ratio: float) -> QPixmap:
+        """ returns the pixmap scaled to the given size. scaling the full resolution image is expensive, so the result is cached per size and
+        drawing the scaled pixmap is a plain copy.
+
+        Args:
+            width (int): width in device independent pixels
+            height (int): height in device independent pixels
+            ratio (float): device pixel ratio of the paint device (e.g. 2 on high dpi screens)
+
+        Returns:
+            QPixmap: the scaled pixmap
+        """
+        key = (width, height, ratio)
+        scaled = self.scaled_pixmaps.get(key)
+        if scaled == None:
+            if len(self.scaled_pixmaps) >= s_max_scaled_pixmaps:
+                self.scaled_pixmaps = {}
+            scaled = self.pixmap.scaled(int(width * ratio), int(height * ratio), Qt.AspectRatioMode.IgnoreAspectRatio,
+                                        Qt.TransformationMode.SmoothTransformation)
+            scaled.setDevicePixelRatio(ratio)
+            self.scaled_pixmaps[key] = scaled
+        return scaled
+
+    def drawOn(self, qp: QPainter, position: QPoint, dimension: QSize, use_cache: bool = True):
         """draws the piece on the given position with the given dimensions. if load_pixmap was not called before or no image for the piece exists,
         then the piece is drawn as text (e.g. "q" for queen, "r" for rook, ...) with the color of the piece.
         of the bounding box of the piece.
@@ -59,8 +92,13 @@ class ChessPiece():
             qp (QPainter): QPainter of the GUI
             position (QPoint): position of the piece (x, y upper left corner)
             dimension (PieceDimenson): dimensions of the piece (width and height)
+            use_cache (bool, optional): Defaults to True. if True, a pixmap scaled to the dimensions is drawn (@see get_scaled_pixmap),
+            otherwise the full resolution image is scaled while drawing
         """
-        if self.pixmap:
+        if self.pixmap and use_cache:
+            qp.drawPixmap(position.x(), position.y(), self.get_scaled_pixmap(
+                dimension.width, dimension.height, qp.device().devicePixelRatioF()))
+        elif self.pixmap:
             qp.drawPixmap(position.x(), position.y(), dimension.width, dimension.height,
                           self.pixmap, 0, 0, self.pixmap.width(), self.pixmap.height())
         else:
@@ -126,11 +164,14 @@ LETTER_MAP = {
 }
 
 
-def load_pieces():
-    """loads all the pixmaps of the chess pieces
+def load_pieces(folder: str = None):
+    """loads all the pixmaps of the chess pieces. call it again to change the piece set, the cached scaled pixmaps are dropped.
+
+    Args:
+        folder (str, optional): Defaults to None. folder of the image files. if None, get_chess_pieces_folder is used.
     """
     for piece in LETTER_MAP.values():
-        piece.load_pixmap()
+        piece.load_pixmap(folder)
 
 
 def get_piece_from(letter: str) -> ChessPiece | None:
@@ -0,0 +1,299 @@
+from argparse import ArgumentParser
+from chessapp.model.chesstree import ChessTree
+from chessapp.controller.engine import Engine, s_engine_number_of_threads
+from chessapp.controller.batchanalyser import BatchAnalyser, s_analyse_desired_time_seconds, s_analyse_max_positions, s_checkpoint_interval_seconds
+from chessapp.controller.workunits import export_work_units, process_work_units, merge_results, requeue_stale_claims, s_stale_claim_seconds
+from chessapp.model.evalpropagation import EvalPropagator
+from chessapp.controller.tablebase import Tablebase, get_default_tablebase
+from chessapp.util.paths import get_openings_folder, get_opening_tree_folder
+from os.path import join
+from chessapp.util.polyglot import export_polyglot
+from chessapp.controller.enginemetrics import get_engine_metrics
+from chessapp.controller.timebudget import AdaptiveTimeBudget
+from chessapp.controller.analysissession import AnalysisSession
+from chessapp.controller.analysispolicy import ORDER_BY_SOURCE, ORDER_BY_REACH, s_analysis_orders
+from chessapp.model.reachprobability import compute_reach_probabilities, combine_reach_probabilities
+from chessapp.controller.puzzlegenerator import PuzzleGenerator, s_generated_puzzles_folder, s_max_candidates, s_min_gap, s_verify_time_seconds, s_verify_depth
+
+# command line interface for running analysis jobs without a GUI. this module (and everything it imports) must not import PyQt5.
+
+
+def open_tablebase(args) -> Tablebase | None:
+    """
+    Args:
+        args (Namespace): parsed command line arguments
+
+    Returns:
+        Tablebase | None: the tablebase of args.tablebase or the default tablebase if args.tablebase is not set
+    """
+    if args.tablebase:
+        return Tablebase(args.tablebase)
+    return get_default_tablebase()
+
+
+def report_metrics(args):
+    """ prints the engine metrics and writes them as json to args.metrics if set @see chessapp.controller.enginemetrics
+
+    Args:
+        args (Namespace): parsed command line arguments
+    """
+    metrics = get_engine_metrics()
+    for line in metrics.format_report():
+        print(line)
+    if args.metrics:
+        metrics.dump(args.metrics)
+
+
+def load_reach_probabilities(args) -> dict[str, float]:
+    """ computes the reach probabilities of the white and black opening trees in args.opening_trees
+    @see chessapp.model.reachprobability
+
+    Args:
+        args (Namespace): parsed command line arguments
+
+    Returns:
+        dict[str, float]: the probabilities to reach the positions in a game
+    """
+    probabilities = []
+    for color in ("white", "black"):
+        opening_tree = ChessTree(join(args.opening_trees, color))
+        opening_tree.load()
+        probabilities.append(compute_reach_probabilities(opening_tree))
+    return combine_reach_probabilities(*probabilities)
+
+
+def analyse(args):
+    """ analyses the tree in args.tree with a pool of args.engines engines @see chessapp.controller.batchanalyser.BatchAnalyser
+
+    Args:
+        args (Namespace): parsed command line arguments
+    """
+    tree = ChessTree(args.tree)
+    tree.load()
+    tablebase = open_tablebase(args)
+    engines = [Engine(args.engine_path, args.threads, tablebase)
+               for _ in range(args.engines)]
+    propagator = None if args.no_propagation else EvalPropagator(tree)
+    time_budget = AdaptiveTimeBudget(
+        args.adaptive) if args.adaptive else None
+    reach_probabilities = load_reach_probabilities(
+        args) if args.order == ORDER_BY_REACH else None
+    session = AnalysisSession(tree)
+    if args.fresh:
+        session.finish()
+    try:
+        BatchAnalyser(tree, engines, args.time, args.max_positions, args.total_time, args.checkpoint_interval,
+                      propagator=propagator, tablebase=tablebase, time_budget=time_budget, session=session,
+                      order=args.order, reach_probabilities=reach_probabilities).run()
+    except KeyboardInterrupt:
+        print("interrupted, saving tree")
+        tree.save()
+    finally:
+        for engine in engines:
+            engine.close()
+        report_metrics(args)
+
+
+def export_units(args):
+    """ exports the positions of args.tree that need analysis as work units into args.units @see chessapp.controller.workunits
+
+    Args:
+        args (Namespace): parsed command line arguments
+    """
+    tree = ChessTree(args.tree)
+    tree.load()
+    print("requeued " + str(requeue_stale_claims(args.units,
+          args.stale_claim_seconds)) + " stale claims")
+    print("exported " + str(export_work_units(tree, args.units,
+          args.max_positions, tablebase=open_tablebase(args))) + " work units")
+
+
+def work(args):
+    """ processes work units of args.units with a single engine until none are left @see chessapp.controller.workunits.
+    start this command several times (on one or several machines sharing args.units) to analyse in parallel.
+
+    Args:
+        args (Namespace): parsed command line arguments
+    """
+    engine = Engine(args.engine_path, args.threads, open_tablebase(args))
+    try:
+        print("processed " + str(process_work_units(args.units,
+              engine, args.time, args.wait)) + " work units")
+    except KeyboardInterrupt:
+        print("interrupted")
+    finally:
+        engine.close()
+        report_metrics(args)
+
+
+def merge(args):
+    """ merges the results of args.units into args.tree and saves the tree @see chessapp.controller.workunits.merge_results
+
+    Args:
+        args (Namespace): parsed command line arguments
+    """
+    tree = ChessTree(args.tree)
+    tree.load()
+    if merge_results(tree, args.units) > 0:
+        tree.save()
+
+
+def export_book(args):
+    """ exports args.tree as polyglot book to args.book @see chessapp.util.polyglot.export_polyglot
+
+    Args:
+        args (Namespace): parsed command line arguments
+    """
+    tree = ChessTree(args.tree)
+    tree.load()
+    print("exported " + str(export_polyglot(tree, args.book)) + " entries")
+
+
+def generate_puzzles(args):
+    """ mines puzzles from args.tree and verifies them with a pool of args.engines engines
+    @see chessapp.controller.puzzlegenerator.PuzzleGenerator
+
+    Args:
+        args (Namespace): parsed command line arguments
+    """
+    tree = ChessTree(args.tree)
+    tree.load()
+    engines = [Engine(args.engine_path, args.threads, open_tablebase(args))
+               for _ in range(args.engines)]
+    try:
+        PuzzleGenerator(tree, engines, args.output, args.max_candidates, args.min_gap, args.time, args.depth,
+                        args.total_time).run()
+    except KeyboardInterrupt:
+        print("interrupted")
+    finally:
+        for engine in engines:
+            engine.close()
+        report_metrics(args)
+
+
+def add_tree_argument(parser: ArgumentParser):
+    """ adds the --tree argument to the given parser
+
+    Args:
+        parser (ArgumentParser): the parser of a command
+    """
+    parser.add_argument("--tree", default=get_openings_folder(),
+                        help="folder containing position_eval.csv and moves.csv")
+
+
+def add_engine_arguments(parser: ArgumentParser):
+    """ adds the arguments that configure a single engine and its time per position to the given parser
+
+    Args:
+        parser (ArgumentParser): the parser of a command
+    """
+    parser.add_argument("--engine-path", default=None,
+                        help="path to a uci engine executable (defaults to the bundled stockfish)")
+    parser.add_argument("--threads", type=int, default=s_engine_number_of_threads,
+                        help="number of threads per engine process")
+    parser.add_argument("--time", type=int, default=s_analyse_desired_time_seconds,
+                        help="seconds per position")
+    parser.add_argument("--metrics", default=None,
+                        help="json file the engine metrics (latency, depth, nps, hashfull, stop reason per search) are written to")
+
+
+def add_tablebase_argument(parser: ArgumentParser):
+    """ adds the --tablebase argument to the given parser
+
+    Args:
+        parser (ArgumentParser): the parser of a command
+    """
+    parser.add_argument("--tablebase", default=None,
+                        help="folder containing syzygy tablebase files (defaults to data/syzygy if it exists)")
+
+
+def create_parser() -> ArgumentParser:
+    """
+    Returns:
+        ArgumentParser: the parser for the command line arguments of all commands
+    """
+    parser = ArgumentParser(description="headless tools for the chess app")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    analyse_parser = subparsers.add_parser(
+        "analyse", help="analyse all positions of a tree that are below their target depth")
+    add_tree_argument(analyse_parser)
+    add_engine_arguments(analyse_parser)
+    add_tablebase_argument(analyse_parser)
+    analyse_parser.add_argument("--engines", type=int, default=1,
+                                help="number of engine processes analysing in parallel")
+    analyse_parser.add_argument("--max-positions", type=int, default=s_analyse_max_positions,
+                                help="maximum amount of positions to analyse")
+    analyse_parser.add_argument("--total-time", type=int, default=None,
+                                help="no new position is started after this many seconds")
+    analyse_parser.add_argument("--checkpoint-interval", type=int, default=s_checkpoint_interval_seconds,
+                                help="the tree is saved at least every this many seconds")
+    analyse_parser.add_argument("--adaptive", type=int, default=None,
+                                help="engine seconds for the whole session: positions get the time they are estimated to need to reach their "
+                                "target depth, cheapest first, and stalled searches are stopped early (--time is ignored)")
+    analyse_parser.add_argument("--order", choices=s_analysis_orders, default=ORDER_BY_SOURCE,
+                                help="order of the positions: by source, depth-first along the moves of the tree (reuses the engine's hash) "
+                                "or by the probability to reach them in a game (computed from the opening trees)")
+    analyse_parser.add_argument("--opening-trees", default=get_opening_tree_folder(),
+                                help="folder containing the white and black opening trees (used by --order reach)")
+    analyse_parser.add_argument("--fresh", action="store_true",
+                                help="discard an unfinished analysis session of the tree instead of resuming it")
+    analyse_parser.add_argument("--no-propagation", action="store_true",
+                                help="also analyse positions whose value is determined by the analysis of their children")
+    analyse_parser.set_defaults(function=analyse)
+    export_parser = subparsers.add_parser(
+        "export-units", help="export the positions of a tree that need analysis as work units")
+    add_tree_argument(export_parser)
+    add_tablebase_argument(export_parser)
+    export_parser.add_argument("--units", required=True,
+                               help="work unit directory (may be shared between machines)")
+    export_parser.add_argument("--max-positions", type=int, default=s_analyse_max_positions,
+                               help="maximum amount of positions to export")
+    export_parser.add_argument("--stale-claim-seconds", type=int, default=s_stale_claim_seconds,
+                               help="claims older than this are moved back to pending")
+    export_parser.set_defaults(function=export_units)
+    work_parser = subparsers.add_parser(
+        "work", help="process work units until none are left")
+    work_parser.add_argument("--units", required=True,
+                             help="work unit directory (may be shared between machines)")
+    add_engine_arguments(work_parser)
+    add_tablebase_argument(work_parser)
+    work_parser.add_argument("--wait", action="store_true",
+                             help="wait for new work units instead of stopping when none are left")
+    work_parser.set_defaults(function=work)
+    merge_parser = subparsers.add_parser(
+        "merge", help="merge the results of work units into a tree")
+    add_tree_argument(merge_parser)
+    merge_parser.add_argument("--units", required=True,
+                              help="work unit directory (may be shared between machines)")
+    merge_parser.set_defaults(function=merge)
+    book_parser = subparsers.add_parser(
+        "export-polyglot", help="export a tree as polyglot opening book")
+    add_tree_argument(book_parser)
+    book_parser.add_argument("--book", required=True,
+                             help="path of the book file (.bin)")
+    book_parser.set_defaults(function=export_book)
+    puzzle_parser = subparsers.add_parser(
+        "generate-puzzles", help="mine puzzles from the evaluated positions of a tree and verify them with the engine")
+    add_tree_argument(puzzle_parser)
+    add_engine_arguments(puzzle_parser)
+    add_tablebase_argument(puzzle_parser)
+    puzzle_parser.set_defaults(time=s_verify_time_seconds)
+    puzzle_parser.add_argument("--engines", type=int, default=1,
+                               help="number of engine processes verifying in parallel")
+    puzzle_parser.add_argument("--depth", type=int, default=s_verify_depth,
+                               help="depth of each verification search")
+    puzzle_parser.add_argument("--output", default=s_generated_puzzles_folder,
+                               help="folder the puzzle files are written to")
+    puzzle_parser.add_argument("--max-candidates", type=int, default=s_max_candidates,
+                               help="maximum amount of positions verified by the engine (the largest gaps first)")
+    puzzle_parser.add_argument("--min-gap", type=float, default=s_min_gap,
+                               help="minimum amount of pawns the best move must be better than the second best move")
+    puzzle_parser.add_argument("--total-time", type=int, default=None,
+                               help="no new position is verified after this many seconds")
+    puzzle_parser.set_defaults(function=generate_puzzles)
+    return parser
+
+
+if __name__ == "__main__":
+    arguments = create_parser().parse_args()
+    arguments.function(arguments)
@@ -1,12 +1,13 @@
+from chessapp.util.startupreport import get_startup_report
 from chessapp.chessapp import ChessApp
 from chessapp.model.chesstree import ChessTree
 import sys
 from chessapp.util.paths import get_openings_folder
-from chessapp.view.pieces import load_pieces
 
+# the startup report measures from here (@see chessapp.util.startupreport)
+get_startup_report()
+# the tree is loaded in the background once the window is shown (@see ChessApp.load_tree)
 tree = ChessTree(get_openings_folder())
-tree.load()
 qtapp = ChessApp(tree, sys.argv)
 qtapp.aboutToQuit.connect(qtapp.close)
-load_pieces()
 qtapp.exec_()
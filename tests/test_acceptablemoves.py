@@ -0,0 +1,75 @@
+""" tests of the invalidation of chessapp.model.acceptablemoves.AcceptableMoveIndex. run from the root folder of the repository, e.g.
+    python -m pytest tests
+"""
+from chessapp.model.acceptablemoves import AcceptableMoveIndex
+from chessapp.model.chesstree import ChessTree
+from chessapp.model.move import Move
+from chessapp.model.sourcetype import SourceType
+from chessapp.util.fen import get_reduced_fen_from_board
+from chess import Board
+from random import Random
+
+
+def add_moves(tree: ChessTree, board: Board, sans: list[str]) -> dict[str, str]:
+    """
+    Returns:
+        dict[str, str]: san -> fen of the position the move leads to
+    """
+    node = tree.get(get_reduced_fen_from_board(board))
+    fens = {}
+    for san in sans:
+        board.push_san(san)
+        fens[san] = get_reduced_fen_from_board(board)
+        board.pop()
+        node.add(Move(tree, san, fens[san], source=SourceType.MANUAL))
+    return fens
+
+
+def test_entries_follow_the_changes_of_the_tree():
+    tree = ChessTree("")
+    start = tree.get(get_reduced_fen_from_board(Board()))
+    start.update(0.3, 20, False)
+    fens = add_moves(tree, Board(), ["e4", "a4"])
+    tree.nodes[fens["e4"]].update(0.3, 20, False)
+    tree.nodes[fens["a4"]].update(-0.5, 20, False)
+    index = AcceptableMoveIndex(tree)
+    assert index.build() == 1 and len(index) == 1
+    assert index.get_acceptable_sans(start) == {"e4"}
+    # the evaluation of a child is the evaluation of a move of its parent
+    tree.nodes[fens["a4"]].update(0.2, 25, False)
+    assert index.get_acceptable_sans(start) == {"e4", "a4"}
+    # the evaluation of the node is the evaluation of its best move
+    start.update(1.0, 30, False)
+    assert index.get_acceptable_sans(start) == frozenset()
+    assert not index.has_acceptable_move(start)
+    # a new move of the node
+    fens.update(add_moves(tree, Board(), ["d4"]))
+    tree.nodes[fens["d4"]].update(0.9, 30, False)
+    assert index.is_acceptable_move(start, start.get_move_by_san("d4"))
+    index.on_loaded()
+    assert len(index) == 0
+    assert index.get_acceptable_sans(start) == {"d4"}
+    index.close()
+    tree.nodes[fens["e4"]].update(1.0, 40, False)
+    # a closed index is not invalidated anymore
+    assert index.get_acceptable_sans(start) == {"d4"}
+
+
+def test_entries_agree_with_the_nodes():
+    tree = ChessTree("")
+    board = Board()
+    fens = [get_reduced_fen_from_board(board)]
+    for sans in (["e4", "d4", "c4"], ["e5", "c5"], ["Nf3", "Nc3"]):
+        fens += add_moves(tree, board, sans).values()
+        board.push_san(sans[0])
+    index = AcceptableMoveIndex(tree)
+    random = Random(3)
+    for depth in range(1, 200):
+        tree.nodes[random.choice(fens)].update(random.uniform(-1, 1), depth, False)
+        node = tree.nodes[random.choice(fens)]
+        assert index.get_acceptable_sans(node) == frozenset(
+            move.san for move in node.moves if node.is_acceptable_move(move))
+    for fen in fens:
+        node = tree.nodes[fen]
+        assert index.get_acceptable_sans(node) == frozenset(
+            move.san for move in node.moves if node.is_acceptable_move(move))
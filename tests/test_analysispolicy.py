@@ -0,0 +1,43 @@
+""" tests of chessapp.controller.analysispolicy. run from the root folder of the repository, e.g.
+    python -m pytest tests
+"""
+from chessapp.controller.analysispolicy import find_candidates, resolve_with_tablebase
+from chessapp.model.chesstree import ChessTree
+from chessapp.model.move import Move
+from chessapp.model.sourcetype import SourceType
+from chessapp.util.fen import get_reduced_fen_from_board
+from chess import Board, popcount
+
+# white to move wins with the queen
+s_endgame_fen = "8/8/8/4k3/8/8/3QK3/8 w - -"
+
+
+class FakeTablebase:
+    """ a tablebase of all positions with at most three pieces that scores each of them as won for white
+    """
+
+    def can_probe(self, board: Board) -> bool:
+        return popcount(board.occupied) <= 3
+
+    def score(self, board: Board):
+        return (100.0, 99, True) if self.can_probe(board) else None
+
+
+def test_tablebase_positions_are_resolved_before_the_search():
+    tree = ChessTree("")
+    board = Board()
+    board.push_san("e4")
+    e4 = get_reduced_fen_from_board(board)
+    tree.get(get_reduced_fen_from_board(Board())).add(Move(tree, "e4", e4, source=SourceType.MANUAL))
+    board = Board(s_endgame_fen)
+    before = get_reduced_fen_from_board(board)
+    board.push_san("Qd5+")
+    endgame = get_reduced_fen_from_board(board)
+    tree.get(before).add(Move(tree, "Qd5+", endgame, source=SourceType.MANUAL))
+    # the search only reads the tree
+    assert sorted(find_candidates(tree, 10)) == sorted([e4, endgame])
+    assert not tree.nodes[endgame].is_mate
+    assert resolve_with_tablebase(tree, FakeTablebase()) == 1
+    assert tree.nodes[endgame].is_mate and tree.nodes[endgame].eval == 100
+    assert find_candidates(tree, 10) == [e4]
+    assert resolve_with_tablebase(tree, None) == 0
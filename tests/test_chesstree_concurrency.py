@@ -0,0 +1,68 @@
+""" concurrency tests of chessapp.model.chesstree.ChessTree: readers that do not hold the write lock never see a torn evaluation.
+run from the root folder of the repository, e.g.
+    python -m pytest tests
+"""
+from chessapp.model.chesstree import ChessTree
+from threading import Thread
+import csv
+
+s_positions = 50
+s_updates = 400
+
+
+def get_eval(depth: int) -> float:
+    """ the writers only store evaluations with this eval for a depth, so a reader can check that eval and depth belong together
+    """
+    return depth / 100
+
+
+def create_tree(folder: str) -> ChessTree:
+    tree = ChessTree(folder)
+    for i in range(s_positions):
+        tree.get("position " + str(i)).update(get_eval(0), 0, False)
+    return tree
+
+
+def write_evaluations(tree: ChessTree, offset: int):
+    for depth in range(1, s_updates + 1):
+        for i in range(offset, s_positions, 2):
+            tree.nodes["position " + str(i)].update(
+                get_eval(depth), depth, False)
+
+
+def test_save_and_scans_do_not_tear_evaluations(tmp_path):
+    tree = create_tree(str(tmp_path))
+    writers = [Thread(target=write_evaluations, args=(tree, offset))
+               for offset in range(2)]
+    for writer in writers:
+        writer.start()
+    saves = 0
+    while any(writer.is_alive() for writer in writers) or saves == 0:
+        for node in tree.snapshot().values():
+            evaluation = node.evaluation
+            assert evaluation.eval == get_eval(evaluation.eval_depth)
+        tree.save()
+        saves += 1
+        with open(tree.position_evaluation_file_path(), "r") as f:
+            for row in csv.reader(f, delimiter=";"):
+                assert float(row[1]) == get_eval(int(row[2]))
+    for writer in writers:
+        writer.join()
+    tree.save()
+    loaded = ChessTree(str(tmp_path))
+    loaded.load()
+    assert len(loaded.nodes) == s_positions
+    assert all(node.eval_depth == s_updates for node in loaded.nodes.values())
+
+
+def test_an_update_replaces_the_evaluation_as_a_whole():
+    tree = create_tree("")
+    node = tree.nodes["position 0"]
+    before = node.evaluation
+    assert node.update(1.5, 20, False)
+    assert before.eval == 0 and before.eval_depth == 0
+    assert node.evaluation is not before
+    assert (node.eval, node.eval_depth, node.is_mate) == (1.5, 20, False)
+    assert not node.update(2.0, 10, False)
+    assert node.update(100, 5, True)
+    assert node.is_mate and node.eval_depth == 5
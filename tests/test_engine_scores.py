@@ -0,0 +1,65 @@
+""" tests of the conversion of engine scores (@see chessapp.controller.engine.info_to_score) and of the puzzle generator, which compares
+them. no engine process is started: the searches return fixed infos. run from the root folder of the repository, e.g.
+    python -m pytest tests
+"""
+from chessapp.controller.engine import Engine, info_to_score
+from chessapp.controller.puzzlegenerator import PuzzleGenerator
+from chessapp.model.chesstree import ChessTree
+from chess import Board, Move, WHITE, BLACK
+from chess.engine import PovScore, Mate, Cp
+
+# white to move mates with Qh5xf7# (scholar's mate)
+s_white_mates_fen = "r1bqkbnr/pppp1ppp/2n5/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - 2 3"
+# white to move gets mated
+s_white_gets_mated_fen = "rnb1kbnr/pppp1ppp/8/4p3/6P1/5P1q/PPPPP2P/RNBQKBNR w KQkq - 1 3"
+
+
+class FixedEngine(Engine):
+    """ an engine whose searches return the given infos
+    """
+
+    def __init__(self, infos: list[dict]):
+        super().__init__(engine_path="none", lazy=True)
+        self.tablebase = None
+        self.infos: list[dict] = infos
+
+    def analyse(self, board: Board, time: int, depth: int, multipv: int, method: str):
+        return self.infos[:multipv]
+
+
+def test_mate_scores_take_the_sign_of_the_mating_side():
+    assert info_to_score({"score": PovScore(Mate(1), WHITE), "depth": 20}) == (100, 20, True)
+    assert info_to_score({"score": PovScore(Mate(-1), WHITE), "depth": 20}) == (-100, 20, True)
+    assert info_to_score({"score": PovScore(Mate(1), BLACK), "depth": 20}) == (-100, 20, True)
+    assert info_to_score({"score": PovScore(Mate(-1), BLACK), "depth": 20}) == (100, 20, True)
+    # the side to move is already mated
+    assert info_to_score({"score": PovScore(Mate(0), WHITE), "depth": 0}) == (-100, 0, True)
+    assert info_to_score({"score": PovScore(Cp(-50), BLACK), "depth": 20}) == (0.5, 20, False)
+
+
+def test_a_unique_mate_is_a_puzzle():
+    board = Board(s_white_mates_fen)
+    engine = FixedEngine([{"score": PovScore(Mate(1), WHITE), "depth": 22, "pv": [Move.from_uci("h5f7")]},
+                          {"score": PovScore(Cp(-30), WHITE), "depth": 22, "pv": [Move.from_uci("h5e2")]}])
+    generator = PuzzleGenerator(ChessTree(""), [engine])
+    best_move = generator.find_unique_move(engine, board)
+    assert best_move != None and best_move.pv[0] == Move.from_uci("h5f7") and best_move.eval == 100
+
+
+def test_a_mated_position_is_no_puzzle():
+    # every move of the player gets mated, so the position is lost even though the best move is far better than the second
+    board = Board(s_white_gets_mated_fen)
+    engine = FixedEngine([{"score": PovScore(Mate(-5), WHITE), "depth": 22, "pv": [Move.from_uci("g1h3")]},
+                          {"score": PovScore(Mate(-1), WHITE), "depth": 22, "pv": [Move.from_uci("e2e3")]}])
+    generator = PuzzleGenerator(ChessTree(""), [engine])
+    assert generator.find_unique_move(engine, board) == None
+
+
+def test_mating_and_getting_mated_are_far_apart():
+    engine = FixedEngine([{"score": PovScore(Mate(3), BLACK), "depth": 22, "pv": [Move.from_uci("d8h4")]},
+                          {"score": PovScore(Mate(-2), BLACK), "depth": 22, "pv": [Move.from_uci("a7a6")]}])
+    board = Board("rnbqkbnr/pppp1ppp/8/4p3/6P1/5P2/PPPPP2P/RNBQKBNR b KQkq - 0 2")
+    best_moves = engine.find_best_moves(board, 1, 22, multipv=2)
+    assert [move.eval for move in best_moves] == [-100, 100]
+    generator = PuzzleGenerator(ChessTree(""), [engine])
+    assert generator.find_unique_move(engine, board).pv[0] == Move.from_uci("d8h4")
@@ -0,0 +1,21 @@
+""" tests of chessapp.controller.enginemetrics. run from the root folder of the repository, e.g.
+    python -m pytest tests
+"""
+from chessapp.controller.enginemetrics import EngineMetrics, EngineCall, STOP_REASON_DEPTH, STOP_REASON_TIME
+
+
+def create_call(depth: int, stop_reason: str) -> EngineCall:
+    return EngineCall("score", 1.0, 5, 20, depth, 1000, 1000, 10, 1, stop_reason)
+
+
+def test_registry_is_bounded():
+    metrics = EngineMetrics(max_calls=3)
+    for depth in range(10):
+        metrics.record(create_call(depth, STOP_REASON_DEPTH if depth % 2 == 0 else STOP_REASON_TIME))
+    assert [call.depth for call in metrics.get_calls()] == [7, 8, 9]
+    # the counts cover all calls
+    assert metrics.get_amount() == 10
+    assert metrics.get_stop_reasons() == {STOP_REASON_DEPTH: 5, STOP_REASON_TIME: 5}
+    assert metrics.format_report()[0] == "engine metrics of 10 calls (histograms of the last 3)"
+    metrics.clear()
+    assert metrics.get_amount() == 0 and metrics.get_calls() == [] and metrics.get_stop_reasons() == {}
@@ -0,0 +1,85 @@
+""" tests of chessapp.model.evalpropagation. run from the root folder of the repository, e.g.
+    python -m pytest tests
+"""
+from chessapp.model.chesstree import ChessTree
+from chessapp.model.evalpropagation import EvalPropagator
+from chessapp.model.move import Move
+from chessapp.util.fen import get_reduced_fen_from_board
+from chess import Board
+from threading import Thread
+
+
+def add_line(tree: ChessTree, sans: list[str]) -> list[str]:
+    """ adds the moves of the line from the start position to the tree
+
+    Returns:
+        list[str]: the fens of the positions of the line, starting with the start position
+    """
+    board = Board()
+    fens = [get_reduced_fen_from_board(board)]
+    for san in sans:
+        board.push_san(san)
+        fens.append(get_reduced_fen_from_board(board))
+        tree.get(fens[-2]).add(Move(tree, san, fens[-1]))
+    return fens
+
+
+def test_values_are_derived_by_minimax():
+    tree = ChessTree("")
+    e4 = add_line(tree, ["e4", "e5"])
+    d4 = add_line(tree, ["d4"])
+    propagator = EvalPropagator(tree)
+    tree.nodes[e4[2]].update(0.3, 20, False)
+    tree.nodes[d4[1]].update(0.5, 20, False)
+    propagator.propagate_all()
+    # black chooses e5 after e4, white chooses the better of e4 and d4
+    assert propagator.get_value(tree.nodes[e4[1]]).eval == 0.3
+    assert propagator.get_value(tree.nodes[e4[1]]).eval_depth == 21
+    assert propagator.get_value(tree.nodes[e4[0]]).eval == 0.5
+
+
+def test_updates_are_propagated_incrementally():
+    tree = ChessTree("")
+    fens = add_line(tree, ["e4", "e5", "Nf3"])
+    propagator = EvalPropagator(tree)
+    propagator.propagate_all()
+    assert propagator.get_value(tree.nodes[fens[0]]) == None
+    tree.nodes[fens[3]].update(0.4, 30, False)
+    assert propagator.get_value(tree.nodes[fens[0]]).eval == 0.4
+    assert propagator.get_value(tree.nodes[fens[0]]).eval_depth == 33
+    # a new child with a better value for black changes the value of the parent
+    other = add_line(tree, ["e4", "c5"])
+    tree.nodes[other[2]].update(-0.2, 30, False)
+    assert propagator.get_value(tree.nodes[fens[1]]).eval == -0.2
+
+
+def test_cycles_are_ignored():
+    tree = ChessTree("")
+    fens = add_line(tree, ["Nf3", "Nf6", "Ng1", "Ng8"])
+    assert fens[4] == fens[0]
+    tree.nodes[fens[2]].update(0.1, 20, False)
+    propagator = EvalPropagator(tree)
+    propagator.propagate_all()
+    assert propagator.get_value(tree.nodes[fens[0]]).eval == 0.1
+
+
+def test_concurrent_updates_match_a_full_propagation():
+    tree = ChessTree("")
+    leaves = []
+    for first in ["e4", "d4", "c4", "Nf3"]:
+        for second in ["e5", "d5", "c5", "Nf6"]:
+            leaves.append(add_line(tree, [first, second])[2])
+    propagator = EvalPropagator(tree)
+
+    def write():
+        for depth in range(1, 200):
+            for i, fen in enumerate(leaves):
+                tree.nodes[fen].update((i * depth) % 7 / 10, depth, False)
+    writer = Thread(target=write)
+    writer.start()
+    while writer.is_alive():
+        propagator.propagate_all()
+    writer.join()
+    incremental = dict(propagator.derived)
+    propagator.propagate_all()
+    assert incremental == propagator.derived
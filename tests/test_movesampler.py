@@ -0,0 +1,81 @@
+""" tests of chessapp.model.movesampler: the alias table and the invalidation of the tables of the move sampler. run from the root folder
+of the repository, e.g.
+    python -m pytest tests
+"""
+from chessapp.model.movesampler import AliasTable, MoveSampler
+from chessapp.model.chesstree import ChessTree
+from chessapp.model.move import Move
+from chessapp.util.fen import get_reduced_fen_from_board
+from chess import Board
+from random import Random
+import pytest
+
+
+def get_probabilities(table: AliasTable) -> list[float]:
+    """
+    Returns:
+        list[float]: the exact probability of each index to be drawn by the table
+    """
+    size = len(table.probabilities)
+    probabilities = [0.0] * size
+    for i in range(size):
+        probabilities[i] += table.probabilities[i] / size
+        probabilities[table.aliases[i]] += (1 - table.probabilities[i]) / size
+    return probabilities
+
+
+@pytest.mark.parametrize("weights", [[1], [1, 1], [1, 2, 3, 4], [5, 0, 1], [0, 0, 7], [1000000, 1, 1], [0.1, 0.7, 0.2], list(range(1, 50))])
+def test_table_reproduces_the_weights(weights):
+    table = AliasTable(weights)
+    for probability, weight in zip(get_probabilities(table), weights):
+        assert probability == pytest.approx(weight / sum(weights), abs=1e-9)
+
+
+def test_draws_follow_the_weights():
+    weights = [1, 0, 3, 6]
+    table = AliasTable(weights)
+    random = Random(11)
+    counts = [0] * len(weights)
+    draws = 20000
+    for _ in range(draws):
+        counts[table.sample(random)] += 1
+    assert counts[1] == 0
+    for count, weight in zip(counts, weights):
+        assert abs(count / draws - weight / sum(weights)) < 0.02
+
+
+def test_tables_follow_the_frequencies():
+    tree = ChessTree("")
+    board = Board()
+    node = tree.get(get_reduced_fen_from_board(board))
+    for san, frequency in (("e4", 1), ("d4", 0)):
+        board.push_san(san)
+        node.add(Move(tree, san, get_reduced_fen_from_board(board), frequency=frequency))
+        board.pop()
+    sampler = MoveSampler(tree)
+    random = Random(5)
+    assert all(sampler.random_move(node, random, True).san == "e4" for _ in range(20))
+    node.increment_frequency(node.get_move_by_san("d4"), 1000)
+    # the table of the node was dropped and is built again with the new frequency
+    moves, table = sampler.get_table(node)
+    assert [move.san for move in moves] == ["e4", "d4"]
+    assert get_probabilities(table)[1] == pytest.approx(1000 / 1001)
+    board.push_san("c4")
+    node.add(Move(tree, "c4", get_reduced_fen_from_board(board), frequency=5))
+    assert [move.san for move in sampler.get_table(node)[0]] == ["e4", "d4", "c4"]
+    sampler.on_loaded()
+    assert len(sampler.tables) == 0
+    sampler.close()
+
+
+def test_node_without_frequencies():
+    tree = ChessTree("")
+    board = Board()
+    node = tree.get(get_reduced_fen_from_board(board))
+    board.push_san("e4")
+    node.add(Move(tree, "e4", get_reduced_fen_from_board(board)))
+    sampler = MoveSampler(tree)
+    assert sampler.get_table(node) == None
+    assert sampler.random_move(node, Random(1)).san == "e4"
+    with pytest.raises(Exception):
+        sampler.random_move(node, Random(1), True)
@@ -0,0 +1,64 @@
+""" tests of chessapp.util.polyglot. run from the root folder of the repository, e.g.
+    python -m pytest tests
+"""
+from chessapp.model.chesstree import ChessTree
+from chessapp.model.move import Move
+from chessapp.util.fen import get_reduced_fen_from_board
+from chessapp.util.polyglot import PolyglotBook, export_polyglot, is_book_up_to_date
+from chess import Board
+from random import Random
+from os import utime
+from os.path import join, getmtime
+
+
+def add_moves(tree: ChessTree, board: Board, frequencies: dict[str, int]):
+    node = tree.get(get_reduced_fen_from_board(board))
+    for san, frequency in frequencies.items():
+        board.push_san(san)
+        node.add(Move(tree, san, get_reduced_fen_from_board(board), frequency=frequency))
+        board.pop()
+
+
+def test_round_trip(tmp_path):
+    tree = ChessTree(str(tmp_path))
+    board = Board()
+    add_moves(tree, board, {"e4": 70000, "d4": 35000, "Nf3": 0})
+    board.push_san("e4")
+    add_moves(tree, board, {"c5": 3, "e5": 1})
+    # castling is encoded as the king capturing its rook
+    castling = Board("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1")
+    add_moves(tree, castling, {"O-O": 1, "O-O-O": 2})
+    file_path = join(str(tmp_path), "book.bin")
+    assert export_polyglot(tree, file_path) == 6
+    book = PolyglotBook(file_path)
+    try:
+        # weights above 16 bit are scaled down proportionally, moves with weight 0 are not exported
+        assert [(Board().san(move), weight) for move, weight in book.get_weighted_moves(Board())] == [("e4", 65535), ("d4", 32767)]
+        assert [(board.san(move), weight) for move, weight in book.get_weighted_moves(board)] == [("c5", 3), ("e5", 1)]
+        assert sorted((castling.san(move), weight) for move, weight in book.get_weighted_moves(castling)) == [("O-O", 1), ("O-O-O", 2)]
+        assert book.weighted_choice(board, Random(1)) in (board.parse_san("c5"), board.parse_san("e5"))
+        board.push_san("c5")
+        assert not book.has_moves(board) and book.weighted_choice(board, Random(1)) == None
+    finally:
+        book.close()
+
+
+def test_illegal_moves_are_skipped(tmp_path):
+    tree = ChessTree(str(tmp_path))
+    board = Board()
+    add_moves(tree, board, {"e4": 2})
+    tree.get(get_reduced_fen_from_board(board)).add(Move(tree, "Ke2", get_reduced_fen_from_board(board), frequency=5))
+    file_path = join(str(tmp_path), "book.bin")
+    assert export_polyglot(tree, file_path) == 1
+
+
+def test_book_older_than_tree_is_outdated(tmp_path):
+    tree = ChessTree(str(tmp_path))
+    add_moves(tree, Board(), {"e4": 1})
+    file_path = join(str(tmp_path), "book.bin")
+    assert not is_book_up_to_date(file_path, tree)
+    export_polyglot(tree, file_path)
+    assert is_book_up_to_date(file_path, tree)
+    tree.save()
+    utime(file_path, (getmtime(tree.moves_file_path()) - 10, getmtime(tree.moves_file_path()) - 10))
+    assert not is_book_up_to_date(file_path, tree)
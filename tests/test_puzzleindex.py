@@ -0,0 +1,44 @@
+""" tests of chessapp.controller.puzzleindex. run from the root folder of the repository, e.g.
+    python -m pytest tests
+"""
+from chessapp.controller.puzzleindex import PuzzleIndex, get_san_moves, get_position_key, get_puzzle_key
+from chessapp.util.fen import get_reduced_fen_from_board, reduce_fen
+from chess import Board
+import json
+
+s_pgn = "1. e4 e5 2. Nf3 Nc6 3. Bc4 Nd4 4. Nxe5 Qg5 5. Nxf7 Qxg2 6. Rf1 Qxe4+ 7. Be2 Nf3#"
+s_puzzles = [{"fen": "r1b1kbnr/pppp1ppp/8/4N1q1/2BnP3/8/PPPP1PPP/RNBQK2R w KQkq - 1 5", "moves": "Nxf7 Qxg2", "themes": ["fork"]},
+             {"fen": "r1b1kbnr/pppp1Npp/8/8/2BnP3/8/PPPP1PqP/RNBQKR2 b Qkq - 1 6", "moves": "Qxe4+ Be2 Nf3#"}]
+
+
+def create_index(tmp_path) -> PuzzleIndex:
+    folder = tmp_path / "puzzles"
+    folder.mkdir()
+    (folder / "game.json").write_text(json.dumps({"pgn": s_pgn, "puzzles": s_puzzles}))
+    return PuzzleIndex(str(folder), str(tmp_path / "puzzle_index.json"))
+
+
+def test_records_contain_the_puzzle(tmp_path):
+    index = create_index(tmp_path)
+    assert index.update() == 1
+    assert len(index) == 2
+    for record, puzzle in zip(index.records, s_puzzles):
+        assert record["fen"] == reduce_fen(puzzle["fen"])
+        assert get_san_moves(record["fen"], record["solution"].split(" ")) == puzzle["moves"].split(" ")
+        board = Board()
+        for uci in record["line"].split(" "):
+            board.push_uci(uci)
+        assert get_reduced_fen_from_board(board) == record["fen"]
+    first, second = index.records
+    assert first["themes"] == ["fork"] and second["themes"] == []
+    assert first["side_to_move"] == "white" and second["side_to_move"] == "black"
+    assert first["solution_length"] == 1 and second["solution_length"] == 2
+    assert get_position_key(get_reduced_fen_from_board(Board())) in first["openings"]
+    assert get_puzzle_key(second) == "game.json#1"
+
+
+def test_unchanged_files_are_not_compiled_again(tmp_path):
+    create_index(tmp_path).update()
+    index = PuzzleIndex(str(tmp_path / "puzzles"), str(tmp_path / "puzzle_index.json"))
+    assert index.update() == 0
+    assert len(index) == 2
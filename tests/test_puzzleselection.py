@@ -0,0 +1,87 @@
+""" tests of chessapp.controller.puzzleselection: the fenwick tree of weights and the weighted draws of the selector. run from the root
+folder of the repository, e.g.
+    python -m pytest tests
+"""
+from chessapp.controller.puzzleselection import WeightTree, PuzzleSelector, PuzzleHistory, PuzzleFilter, s_unseen_weight, \
+    s_max_cached_samplers
+from chessapp.controller.puzzleindex import get_puzzle_key
+from random import Random
+from os.path import join
+
+
+class RecordIndex:
+    """ a puzzle index that holds the given records (@see chessapp.controller.puzzleindex.PuzzleIndex.records)
+    """
+
+    def __init__(self, records: list[dict]):
+        self.records: list[dict] = records
+
+
+def create_record(index: int, side_to_move: str, solution_length: int, themes: list[str] = None) -> dict:
+    return {"file": "puzzles.json", "index": index, "openings": [], "themes": themes if themes else [], "side_to_move": side_to_move,
+            "solution_length": solution_length, "material": "KQ"}
+
+
+def create_selector(tmp_path, records: list[dict]) -> PuzzleSelector:
+    selector = PuzzleSelector(RecordIndex(records), PuzzleHistory(
+        join(str(tmp_path), "history.json")), Random(1))
+    selector.rebuild()
+    return selector
+
+
+def test_find_matches_the_cumulative_weights():
+    weights = [3.0, 0.0, 1.0, 2.0, 0.0, 5.0, 0.5]
+    tree = WeightTree(weights)
+    assert tree.total() == sum(weights)
+    tree.set(2, 4.0)
+    tree.set(6, 0.0)
+    weights[2], weights[6] = 4.0, 0.0
+    assert tree.total() == sum(weights)
+    start = 0.0
+    for index, weight in enumerate(weights):
+        if weight > 0:
+            assert tree.find(start) == index
+            assert tree.find(start + weight * 0.99) == index
+        start += weight
+    # the end of the range never selects a weight of 0
+    assert tree.find(sum(weights) - 1e-12) == 5
+
+
+def test_draws_follow_the_weights():
+    weights = [1.0, 2.0, 0.0, 7.0]
+    tree = WeightTree(weights)
+    random = Random(7)
+    counts = [0] * len(weights)
+    draws = 20000
+    for _ in range(draws):
+        counts[tree.find(random.random() * tree.total())] += 1
+    assert counts[2] == 0
+    for count, weight in zip(counts, weights):
+        assert abs(count / draws - weight / sum(weights)) < 0.02
+
+
+def test_selector_filters_and_follows_the_history(tmp_path):
+    records = [create_record(0, "white", 1, ["fork"]), create_record(1, "white", 2), create_record(2, "black", 1, ["fork"])]
+    selector = create_selector(tmp_path, records)
+    assert selector.count(PuzzleFilter()) == 3
+    assert selector.count(PuzzleFilter(theme="fork")) == 2
+    assert selector.count(PuzzleFilter(side_to_move="white", min_length=2)) == 1
+    assert selector.sample(PuzzleFilter(side_to_move="black")) == records[2]
+    assert selector.sample(PuzzleFilter(theme="pin")) == None
+    unsolved = PuzzleFilter(theme="fork", unsolved_only=True)
+    assert selector.count(unsolved) == 2
+    # the cached sampler is updated by the history
+    selector.history.record(get_puzzle_key(records[0]), True)
+    assert selector.count(unsolved) == 1
+    assert all(selector.sample(unsolved) == records[2] for _ in range(20))
+    _, weights, positions, _ = selector.samplers[PuzzleFilter().key()]
+    assert weights.weights[positions[0]] < s_unseen_weight == weights.weights[positions[1]]
+
+
+def test_selector_caches_a_bounded_amount_of_samplers(tmp_path):
+    selector = create_selector(tmp_path, [create_record(i, "white", i) for i in range(2 * s_max_cached_samplers)])
+    for length in range(2 * s_max_cached_samplers):
+        assert selector.count(PuzzleFilter(min_length=length, max_length=length)) == 1
+    assert len(selector.samplers) == s_max_cached_samplers
+    assert list(selector.samplers)[-1] == PuzzleFilter(min_length=2 * s_max_cached_samplers - 1,
+                                                       max_length=2 * s_max_cached_samplers - 1).key()
@@ -0,0 +1,63 @@
+""" regression tests of chessapp.model.reachprobability. run from the root folder of the repository, e.g.
+    python -m unittest discover tests
+"""
+from chessapp.model.chesstree import ChessTree
+from chessapp.model.move import Move
+from chessapp.model.reachprobability import compute_reach_probabilities
+from chessapp.util.fen import get_reduced_fen_from_board
+from chess import Board
+import unittest
+
+
+def create_tree(lines: list[str]) -> tuple[ChessTree, dict[str, str]]:
+    """ creates a tree (that is never saved) in which every move of the lines has frequency 1 per line
+
+    Args:
+        lines (list[str]): the lines, each one given as sans separated by spaces
+
+    Returns:
+        tuple[ChessTree, dict[str, str]]: the tree and a mapping of each line prefix (e.g. "e4 e5") to the fen of its position
+    """
+    tree = ChessTree("")
+    fens = {}
+    for line in lines:
+        board = Board()
+        sans = []
+        for san in line.split(" "):
+            fen = get_reduced_fen_from_board(board)
+            board.push_san(san)
+            sans.append(san)
+            fens[" ".join(sans)] = get_reduced_fen_from_board(board)
+            move = Move(tree, san, fens[" ".join(sans)])
+            equivalent_move = tree.get(fen).get_equivalent_move(move)
+            if equivalent_move == None:
+                tree.get(fen).add(move)
+                equivalent_move = move
+            tree.get(fen).increment_frequency(equivalent_move)
+            tree.assure(fens[" ".join(sans)])
+    return tree, fens
+
+
+class ReachProbabilityTest(unittest.TestCase):
+
+    def test_transpositions_add_up(self):
+        tree, fens = create_tree(["e4 e5 Nf3 Nc6", "Nf3 Nc6 e4 e5"])
+        probabilities = compute_reach_probabilities(tree)
+        self.assertAlmostEqual(probabilities[fens["e4"]], 0.5)
+        self.assertAlmostEqual(probabilities[fens["e4 e5 Nf3 Nc6"]], 1.0)
+
+    def test_cycle_away_from_the_root(self):
+        # 3.Ng1 Nb8 repeats the position after 1...e5, the positions of the repetition must still be reached
+        tree, fens = create_tree(
+            ["e4 e5 Nf3 Nc6 Ng1 Nb8", "e4 e5 Nf3 Nc6 Bb5 a6"])
+        probabilities = compute_reach_probabilities(tree)
+        self.assertAlmostEqual(probabilities[fens["e4 e5"]], 1.0)
+        self.assertAlmostEqual(probabilities[fens["e4 e5 Nf3"]], 1.0)
+        self.assertAlmostEqual(probabilities[fens["e4 e5 Nf3 Nc6"]], 1.0)
+        self.assertAlmostEqual(probabilities[fens["e4 e5 Nf3 Nc6 Ng1"]], 0.5)
+        self.assertAlmostEqual(probabilities[fens["e4 e5 Nf3 Nc6 Bb5"]], 0.5)
+        self.assertAlmostEqual(probabilities[fens["e4 e5 Nf3 Nc6 Bb5 a6"]], 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
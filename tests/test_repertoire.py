@@ -0,0 +1,89 @@
+""" tests of chessapp.model.repertoire on a small graph with a transposition and a cycle. run from the root folder of the repository, e.g.
+    python -m pytest tests
+"""
+from chessapp.model.repertoire import analyse_repertoire, s_start_fen
+from chessapp.model.chesstree import ChessTree
+from chessapp.model.move import Move
+from chessapp.util.fen import get_reduced_fen_from_board
+from chess import Board
+
+
+def add_line(tree: ChessTree, sans: list[str]) -> list[str]:
+    """ adds the moves of the line from the start position to the tree
+
+    Returns:
+        list[str]: the fens of the positions of the line, starting with the start position
+    """
+    board = Board()
+    fens = [get_reduced_fen_from_board(board)]
+    for san in sans:
+        board.push_san(san)
+        fens.append(get_reduced_fen_from_board(board))
+        tree.get(fens[-2]).add(Move(tree, san, fens[-1]))
+    return fens
+
+
+def create_tree() -> ChessTree:
+    """ 1. Nf3 Nf6 2. Nc3 and 1. Nc3 Nf6 2. Nf3 transpose, 1. Nf3 Nf6 2. Ng1 Ng8 returns to the start position
+    """
+    tree = ChessTree("")
+    add_line(tree, ["Nf3", "Nf6", "Nc3"])
+    add_line(tree, ["Nc3", "Nf6", "Nf3"])
+    fens = add_line(tree, ["Nf3", "Nf6", "Ng1", "Ng8"])
+    assert fens[-1] == s_start_fen
+    return tree
+
+
+def count_lines(tree: ChessTree, fen: str, path: set[str], is_acceptable_move, player_is_white: bool) -> list[int]:
+    """ enumerates the lines from the position without memoization
+
+    Returns:
+        list[int]: the lengths of the lines
+    """
+    node = tree.nodes[fen]
+    moves = [move for move in node.moves if node.is_white_turn() != player_is_white or is_acceptable_move(node, move)]
+    lengths = []
+    for move in moves:
+        if not move.result in path:
+            lengths += [length + 1 for length in count_lines(tree, move.result, path | {move.result}, is_acceptable_move, player_is_white)]
+    return lengths if len(lengths) > 0 else [0]
+
+
+def test_lines_with_a_transposition_and_a_cycle():
+    tree = create_tree()
+    report = analyse_repertoire(tree, "white", lambda node, move: True)
+    # start, after 1. Nf3, after 1. Nc3, after 1... Nf6 (two positions), after 2. Nc3 / 2. Nf3 and after 2. Ng1
+    assert report.reachable_positions == 7
+    assert report.root.lines == 3
+    assert report.root.min_depth == report.root.max_depth == 3 and report.root.get_mean_length() == 3
+    # 2... Ng8 repeats the start position
+    assert report.cycles == 1
+    assert report.holes == []
+    assert len(report.leaves) == 1
+    assert {san: branch.lines for san, branch in report.branches.items()} == {"Nf3": 2, "Nc3": 1}
+    assert count_lines(tree, s_start_fen, {s_start_fen}, lambda node, move: True, True) == [3, 3, 3]
+
+
+def test_holes_of_the_player():
+    tree = create_tree()
+    after_nc3_nf6 = add_line(tree, ["Nc3", "Nf6"])[-1]
+
+    def is_acceptable_move(node, move) -> bool:
+        return node.state != after_nc3_nf6
+
+    report = analyse_repertoire(tree, "white", is_acceptable_move)
+    assert report.holes == [after_nc3_nf6]
+    assert report.root.lines == 3 and report.root.min_depth == 2
+    assert report.root.total_length == 8
+    assert sorted(count_lines(tree, s_start_fen, {s_start_fen}, is_acceptable_move, True)) == [2, 3, 3]
+
+
+def test_black_repertoire_and_missing_root():
+    tree = create_tree()
+    report = analyse_repertoire(tree, "black", lambda node, move: move.san != "Ng8")
+    # the player does not return to the start position, so the line ends after 2. Ng1 in a hole. black has no move after the
+    # transposition either.
+    assert report.cycles == 0 and len(report.holes) == 2 and report.leaves == []
+    assert report.root.lines == 3 and report.root.total_length == 9
+    assert count_lines(tree, s_start_fen, {s_start_fen}, lambda node, move: move.san != "Ng8", False) == [3, 3, 3]
+    assert analyse_repertoire(tree, "white", root_fen="8/8/8/8/8/8/8/8 w - -") == None
@@ -0,0 +1,103 @@
+""" tests of chessapp.controller.repetition and of the lines of due positions (@see chessapp.model.chesstree.find_line). run from the
+root folder of the repository, e.g.
+    python -m pytest tests
+"""
+from chessapp.controller.repetition import RepetitionStore, RESULT_CORRECT, RESULT_INCORRECT, RESULT_EXPLORED, INTERVAL, EASE, \
+    s_first_interval_seconds, s_retry_interval_seconds, s_initial_ease, s_ease_penalty
+from chessapp.controller.workunits import write_json_atomic
+from chessapp.model.chesstree import ChessTree, find_line, follow_line
+from chessapp.model.move import Move
+from chessapp.util.fen import get_reduced_fen_from_board
+from chess import Board
+from os.path import join
+
+
+def add_line(tree: ChessTree, sans: list[str]) -> list[str]:
+    """ adds the moves of the line from the start position to the tree
+
+    Returns:
+        list[str]: the fens of the positions of the line, starting with the start position
+    """
+    board = Board()
+    fens = [get_reduced_fen_from_board(board)]
+    for san in sans:
+        board.push_san(san)
+        fens.append(get_reduced_fen_from_board(board))
+        tree.get(fens[-2]).add(Move(tree, san, fens[-1]))
+    return fens
+
+
+def test_intervals():
+    store = RepetitionStore("")
+    store.record("a", RESULT_CORRECT, 0)
+    assert store.get_due_time("a") == s_first_interval_seconds
+    store.record("a", RESULT_CORRECT, 100)
+    assert store.get_due_time("a") == 100 + s_first_interval_seconds * s_initial_ease
+    store.record("a", RESULT_INCORRECT, 200)
+    assert store.get_due_time("a") == 200 + s_retry_interval_seconds
+    assert store.positions["a"][EASE] == s_initial_ease - s_ease_penalty
+
+
+def test_explored_keeps_ease_and_interval():
+    store = RepetitionStore("")
+    store.record("a", RESULT_CORRECT, 0)
+    store.record("a", RESULT_EXPLORED, 100)
+    assert store.get_due_time("a") == 100 + s_retry_interval_seconds
+    assert store.positions["a"][EASE] == s_initial_ease
+    assert store.positions["a"][INTERVAL] == s_first_interval_seconds
+
+
+def test_due_order():
+    store = RepetitionStore("")
+    store.record("a", RESULT_CORRECT, 0)
+    store.record("b", RESULT_INCORRECT, 0)
+    store.record("c", RESULT_INCORRECT, 10)
+    assert store.get_due(s_retry_interval_seconds - 1) == None
+    assert store.get_due(s_retry_interval_seconds) == "b"
+    # answering again replaces the due time, the outdated heap entry is skipped
+    store.record("b", RESULT_CORRECT, s_retry_interval_seconds)
+    assert store.get_due(s_retry_interval_seconds + 10) == "c"
+    store.postpone("c", s_first_interval_seconds * 10, s_retry_interval_seconds + 10)
+    assert store.get_next() == (s_first_interval_seconds, "a")
+    assert store.is_due("a", s_first_interval_seconds) and not store.is_due("c", s_first_interval_seconds)
+
+
+def test_lines_are_saved_and_loaded(tmp_path):
+    file_path = join(str(tmp_path), "repetition.json")
+    store = RepetitionStore(file_path)
+    store.record("a", RESULT_CORRECT, 0, ["e4", "e5"])
+    store.record("a", RESULT_INCORRECT, 10)
+    store.record("b", RESULT_CORRECT, 0)
+    store.save()
+    loaded = RepetitionStore(file_path)
+    loaded.load()
+    assert loaded.positions == store.positions
+    assert loaded.get_line("a") == ["e4", "e5"]
+    assert loaded.get_line("b") == None and loaded.get_line("c") == None
+
+
+def test_version_1_is_migrated(tmp_path):
+    file_path = join(str(tmp_path), "repetition.json")
+    write_json_atomic(file_path, {"version": 1, "positions": {"a": [5, 600, 2.3, 1, 1, 0]}})
+    store = RepetitionStore(file_path)
+    store.load()
+    assert store.get_due() == "a" and store.get_line("a") == None
+    store.set_line("a", ["d4"])
+    assert store.get_line("a") == ["d4"]
+
+
+def test_find_line_does_not_create_nodes():
+    tree = ChessTree("")
+    fens = add_line(tree, ["e4", "e5", "Nf3"])
+    add_line(tree, ["Nf3", "e5"])
+    size = len(tree.nodes)
+    assert find_line(tree, fens[3], 10) == ["e4", "e5", "Nf3"]
+    assert find_line(tree, fens[3], 2) == None
+    # the position is not contained in the tree
+    board = Board()
+    board.push_san("a4")
+    assert find_line(tree, get_reduced_fen_from_board(board), 10) == None
+    assert len(tree.nodes) == size
+    assert follow_line(tree, ["e4", "e5", "Nf3"]) == fens[3]
+    assert follow_line(tree, ["e4", "c5"]) == None
+    assert len(tree.nodes) == size
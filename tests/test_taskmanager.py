@@ -0,0 +1,119 @@
+""" tests of the coalescing and the cancellation of tasks (@see chessapp.controller.taskmanager.TaskManager and
+chessapp.controller.scheduler.Scheduler). the task manager imports the widgets of the app, its tests are skipped where PyQt5 cannot be
+imported completely (e.g. QtMultimedia without pulseaudio). run from the root folder of the repository, e.g.
+    python -m pytest tests
+"""
+from chessapp.controller.scheduler import Scheduler, get_scheduler, PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, STATE_RUNNING
+from threading import Thread, Event
+import pytest
+
+
+class ManualThreadPool:
+    """ a threadpool that runs the started runnables only when run_next is called
+    """
+
+    def __init__(self):
+        self.runnables = []
+
+    def start(self, runnable, priority: int):
+        self.runnables.append(runnable)
+
+    def run_next(self):
+        self.runnables.pop(0).run()
+
+
+def create_task_manager():
+    taskmanager = pytest.importorskip(
+        "chessapp.controller.taskmanager", exc_type=ImportError)
+    # MethodAction runs its task on the shared scheduler
+    return taskmanager.TaskManager(ManualThreadPool(), get_scheduler())
+
+
+def test_scheduler_coalesces_queued_tasks():
+    scheduler = Scheduler()
+    task = scheduler.submit("a", key="key")
+    assert scheduler.find_task("key") == task
+    scheduler.cancel(task)
+    assert scheduler.find_task("key") == None
+    calls = []
+    scheduler.run(task, lambda: calls.append(1))
+    # a cancelled task does not run and is removed
+    assert calls == [] and scheduler.get_tasks() == []
+
+
+def test_scheduler_cancels_running_tasks():
+    scheduler = Scheduler()
+    task = scheduler.submit("a", PRIORITY_BACKGROUND, "key")
+    seen = []
+
+    def work():
+        assert scheduler.find_task("key") == None and scheduler.find_task("key", True) == task
+        seen.append(scheduler.is_cancelled())
+        scheduler.cancel(task)
+        seen.append(scheduler.is_cancelled())
+    scheduler.run(task, work)
+    assert seen == [False, True] and scheduler.get_tasks() == []
+
+
+def test_background_task_pauses_for_interactive_work():
+    scheduler = Scheduler()
+    task = scheduler.submit("background", PRIORITY_BACKGROUND)
+    paused = Event()
+    resumed = Event()
+
+    def work():
+        while not scheduler.should_yield():
+            pass
+        paused.set()
+        scheduler.checkpoint()
+        resumed.set()
+    with scheduler.interactive("interactive"):
+        thread = Thread(target=scheduler.run, args=(task, work))
+        thread.start()
+        assert paused.wait(5)
+        assert not resumed.wait(0.2)
+    assert resumed.wait(5)
+    thread.join()
+    assert task.state == STATE_RUNNING and scheduler.get_tasks() == []
+
+
+def test_task_manager_coalesces_identical_tasks():
+    task_manager = create_task_manager()
+    calls = []
+    task = task_manager.start(lambda: calls.append(1), "a", key="coalesce")
+    assert task != None
+    assert task_manager.start(lambda: calls.append(2), "a", key="coalesce") == None
+    assert len(task_manager.threadpool.runnables) == 1
+    task_manager.threadpool.run_next()
+    assert calls == [1]
+    # the task is done, an identical task is started again
+    assert task_manager.start(lambda: calls.append(3), "a", key="coalesce") != None
+    task_manager.threadpool.run_next()
+    assert calls == [1, 3]
+
+
+def test_task_manager_exclusive_tasks_do_not_run_twice():
+    task_manager = create_task_manager()
+    started = []
+
+    def work():
+        started.append(task_manager.start(lambda: None, "b", key="exclusive", exclusive=True))
+        started.append(task_manager.start(lambda: None, "b", key="exclusive"))
+    task_manager.start(work, "b", PRIORITY_INTERACTIVE, key="exclusive", exclusive=True)
+    task_manager.threadpool.run_next()
+    # an exclusive task is not started while an identical task runs, a non-exclusive one is
+    assert started[0] == None and started[1] != None
+    task_manager.cancel(started[1])
+    task_manager.threadpool.run_next()
+    assert task_manager.get_tasks() == []
+
+
+def test_task_manager_cancels_queued_tasks():
+    task_manager = create_task_manager()
+    calls = []
+    task_manager.start(lambda: calls.append(1), "c", PRIORITY_BACKGROUND, key="cancel-1")
+    task_manager.start(lambda: calls.append(2), "c", PRIORITY_BACKGROUND, key="cancel-2")
+    task_manager.cancel_all(PRIORITY_BACKGROUND)
+    task_manager.threadpool.run_next()
+    task_manager.threadpool.run_next()
+    assert calls == [] and task_manager.get_tasks() == []
@@ -0,0 +1,65 @@
+""" tests of chessapp.controller.timebudget. run from the root folder of the repository, e.g.
+    python -m pytest tests
+"""
+from chessapp.controller.timebudget import AdaptiveTimeBudget, TimeToDepthModel
+from chessapp.controller.engine import Engine
+from chessapp.model.chesstree import ChessTree
+from chessapp.model.move import Move
+from chessapp.model.sourcetype import SourceType
+from chessapp.util.fen import get_reduced_fen_from_board
+from chess import Board
+
+
+class UnfinishedEngine(Engine):
+    """ an engine whose streamed searches end before the first iteration is completed
+    """
+
+    def __init__(self):
+        super().__init__(engine_path="none", lazy=True)
+        self.tablebase = None
+
+    def analyse_streaming(self, board: Board, time: int, depth: int, should_stop, method: str):
+        return {"depth": 0}
+
+
+def create_budget(session_seconds: float) -> AdaptiveTimeBudget:
+    model = TimeToDepthModel()
+    # doubles the time per depth, 1 second at depth 10
+    model.record([(depth, 2 ** (depth - 10)) for depth in range(8, 20)])
+    return AdaptiveTimeBudget(session_seconds, min_seconds=1, max_seconds=100000, model=model)
+
+
+def test_cost_shrinks_with_the_current_depth():
+    budget = create_budget(3600)
+    assert budget.estimate_cost(20, 19) < budget.estimate_cost(20, 10) < budget.estimate_cost(20)
+    assert budget.estimate_cost(20, 20) == budget.min_seconds
+    assert budget.estimate_cost(20, 25) == budget.min_seconds
+
+
+def test_plan_prefers_positions_lacking_fewer_depths():
+    tree = ChessTree("")
+    board = Board()
+    start = tree.get(get_reduced_fen_from_board(board))
+    fens = []
+    for san, eval_depth in (("e4", -1), ("d4", 19), ("c4", 10)):
+        board.push_san(san)
+        fens.append(get_reduced_fen_from_board(board))
+        board.pop()
+        start.add(Move(tree, san, fens[-1], source=SourceType.MANUAL))
+        if eval_depth >= 0:
+            tree.get(fens[-1]).update(0, eval_depth, False)
+    budget = create_budget(100000)
+    assert budget.plan(tree, fens) == [fens[1], fens[2], fens[0]]
+    # the position missing fewest depths fits into a smaller budget
+    assert create_budget(12000).plan(tree, fens) == [fens[1]]
+
+
+def test_allocate_never_returns_zero():
+    budget = create_budget(10)
+    budget.spent_seconds = 20
+    assert budget.is_exhausted()
+    assert budget.allocate(20) == budget.min_seconds > 0
+
+
+def test_score_streaming_without_completed_iteration():
+    assert UnfinishedEngine().score_streaming(Board(), 1, 20) == (0.0, 0, False)
@@ -0,0 +1,85 @@
+""" tests of chessapp.controller.workunits: export, claim, process and merge of work units. no engine process is started. run from the
+root folder of the repository, e.g.
+    python -m pytest tests
+"""
+from chessapp.controller.workunits import export_work_units, claim_work_unit, release_claim, process_work_units, merge_results, \
+    read_json, s_pending_folder_name
+from chessapp.controller.analysispolicy import find_candidates, get_target_depth
+from chessapp.controller.engine import Engine
+from chessapp.model.chesstree import ChessTree
+from chessapp.model.move import Move
+from chessapp.model.sourcetype import SourceType
+from chessapp.util.fen import get_reduced_fen_from_board
+from chess import Board
+from os import listdir
+from os.path import join
+
+
+class FixedEngine(Engine):
+    """ an engine that scores every position with 0.5 at the requested depth
+    """
+
+    def __init__(self):
+        super().__init__(engine_path="none", lazy=True)
+        self.tablebase = None
+
+    def score(self, board: Board, time: int, depth: int):
+        return 0.5, depth, False
+
+
+def create_tree() -> tuple[ChessTree, dict[str, str]]:
+    """
+    Returns:
+        tuple[ChessTree, dict[str, str]]: a tree with the moves 1. e4, 1. d4 and 1. c4 of different sources and the fens of their positions
+    """
+    tree = ChessTree("")
+    board = Board()
+    start = tree.get(get_reduced_fen_from_board(board))
+    fens = {}
+    for san, source in (("e4", SourceType.BOOK), ("d4", SourceType.MANUAL), ("c4", SourceType.GM_GAME)):
+        board.push_san(san)
+        fens[san] = get_reduced_fen_from_board(board)
+        board.pop()
+        start.add(Move(tree, san, fens[san], source=source))
+    return tree, fens
+
+
+def test_round_trip(tmp_path):
+    folder = str(tmp_path)
+    tree, fens = create_tree()
+    assert export_work_units(tree, folder, 10) == len(find_candidates(tree, 10))
+    # a second export skips the positions that already have a unit
+    assert export_work_units(tree, folder, 10) == 0
+    assert process_work_units(folder, FixedEngine(), 1, log=lambda message: None) == 3
+    assert listdir(join(folder, s_pending_folder_name)) == []
+    assert merge_results(tree, folder, log=lambda message: None) == 3
+    for fen in fens.values():
+        node = tree.nodes[fen]
+        assert node.eval == 0.5 and node.eval_depth == get_target_depth(node.source())
+
+
+def test_units_are_claimed_in_the_order_of_the_analyser(tmp_path):
+    folder = str(tmp_path)
+    tree, fens = create_tree()
+    export_work_units(tree, folder, 10)
+    claimed = []
+    while True:
+        path = claim_work_unit(folder, "worker")
+        if path == None:
+            break
+        claimed.append(read_json(path)["fen"])
+    assert claimed == find_candidates(tree, 10)
+    assert claimed.index(fens["d4"]) < claimed.index(fens["c4"]) < claimed.index(fens["e4"])
+
+
+def test_exported_positions_do_not_count_towards_the_cap(tmp_path):
+    folder = str(tmp_path)
+    tree, fens = create_tree()
+    assert export_work_units(tree, folder, 1) == 1
+    path = claim_work_unit(folder, "worker")
+    # the claimed and the pending positions are skipped before the cap is applied
+    assert export_work_units(tree, folder, 1) == 1
+    assert export_work_units(tree, folder, 1) == 1
+    assert export_work_units(tree, folder, 1) == 0
+    release_claim(folder, path)
+    assert len(listdir(join(folder, s_pending_folder_name))) == len(fens)